@@ -1,14 +1,24 @@
 import os
+import copy
 import random
 import json
-import pandas as pd
-import numpy as np
-import google.generativeai as genai
-from pydantic import BaseModel
-import matplotlib.pyplot as plt
-import seaborn as sns
+import logging
+import threading
+from typing import List, Optional, Union
+from pydantic import BaseModel, Field
 from ai_models.irt_model import IRTModel
 from ai_models.bkt_model import BKTModel
+from question_bank import QuestionBank
+from item_selection import ItemSelector
+from question_prefetch import QuestionPrefetcher
+from hint_cache import HintCache
+from llm_gateway import LLMGateway, LLMUnavailable, LLMTimeout
+from report_renderer import ReportRenderer, RendererBusy
+import report_data
+from logs import get_logger, log_event
+import metrics
+
+logger = get_logger("agents")
 
 # --- Pydantic Models for API Request Bodies ---
 class SubmissionRequest(BaseModel):
@@ -16,6 +26,20 @@ class SubmissionRequest(BaseModel):
     correct_answer: str
     time_taken: float
     difficulty_level: int
+    # Id of the answered question, recorded in the history; optional for older clients.
+    question_id: Optional[Union[str, int]] = None
+
+    @property
+    def item_id(self) -> Optional[str]:
+        return str(self.question_id) if self.question_id is not None else None
+
+class BatchSubmissionRequest(BaseModel):
+    # Answers recorded offline, oldest first; they are applied in this order.
+    submissions: List[SubmissionRequest] = Field(min_length=1, max_length=int(os.getenv("SUBMIT_BATCH_MAX_SIZE", "200")))
+
+class QuizStartMessage(BaseModel):
+    # Starting level of a /ws/quiz session; without it the learner's ability decides.
+    difficulty: Optional[int] = Field(default=None, ge=1, le=4)
 
 class HintRequest(BaseModel):
     question_text: str
@@ -33,73 +57,135 @@ class QuestionDatabase:
         return cls._instance
 
     def __init__(self, csv_path='data/percentages_dataset_full_with_levels.csv'):
-        if not hasattr(self, 'df'):
-            try:
-                self.df = pd.read_csv(csv_path)
-                self.df = self.df.replace({np.nan: None})
-                self.questions = self.df.to_dict(orient='records')
-                print(f"✅ Fallback DB: Loaded {len(self.questions)} questions.")
-            except FileNotFoundError:
-                print(f"❌ Fallback DB: Could not find file at {csv_path}")
-                self.questions = []
-
-    def get_valid_question_by_difficulty(self, difficulty_level: int, max_retries=10):
-        if not self.questions: return None
+        if not hasattr(self, 'bank'):
+            self.bank = QuestionBank(csv_path)
+
+    @property
+    def questions(self):
+        return self.bank.snapshot.questions
+
+    def get_valid_question_by_difficulty(self, difficulty_level: int, tag: str = None, selector: ItemSelector = None, ability: float = None, sampler_state: dict = None):
+        """
+        A random question of the level (level 1 if the level has none). With a selector and a session's sampler_state,
+        the question is chosen by selector instead: no repeats within the session, most informative first.
+        """
         difficulty_level = max(1, min(4, difficulty_level))
-        for _ in range(max_retries):
-            filtered_questions = [q for q in self.questions if q.get('difficulty_level') == difficulty_level]
-            if not filtered_questions:
-                difficulty_level = 1
-                continue
-            question = random.choice(filtered_questions)
-            if all([question.get('id'), question.get('question_text'), question.get('option_a'), question.get('answer')]):
+        for level in dict.fromkeys((difficulty_level, 1)):
+            if selector is not None and sampler_state is not None:
+                question = selector.select(level, self.bank.candidates(level, tag), ability, sampler_state)
+            else:
+                question = self.bank.sample(level, tag=tag)
+            if question is not None:
                 return question
         return None
 
 # --- AI AGENTS ---
+class GeminiModel:
+    """
+    Gemini client that imports and configures google.generativeai on its first call instead of at start-up;
+    the import alone takes most of a second. The first call normally comes from a prefetch worker, off the request path.
+    """
+    def __init__(self, api_key: str, model_name: str = 'gemini-1.5-flash'):
+        self.api_key = api_key
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._model = genai.GenerativeModel(self.model_name)
+            return self._model
+
+    def generate_content(self, prompt, **kwargs):
+        return self._get_model().generate_content(prompt, **kwargs)
+
 class CurriculumAgent:
-    def __init__(self):
+    def __init__(self, model=None, load_hint=None, save_hint=None, item_selector: ItemSelector = None):
         self.fallback_db = QuestionDatabase()
-        try:
+        self.item_selector = item_selector
+        if model is None:
             API_KEY = os.getenv("GEMINI_API_KEY", "YOUR_GEMINI_API_KEY")
-            if API_KEY == "YOUR_GEMINI_API_KEY": raise ValueError("API Key not set")
-            genai.configure(api_key=API_KEY)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-            print("🤖 Curriculum-Agent: Gemini LLM configured successfully.")
-        except Exception:
-            self.model = None
-            print("🤖 Curriculum-Agent: No API key. Using CSV fallback mode.")
-
-    # CORRECTED: Added user_history to the function signature to match the call in main.py
-    def generate_content(self, difficulty_level: int, user_history: list = []):
+            if API_KEY != "YOUR_GEMINI_API_KEY":
+                model = GeminiModel(API_KEY)
+                log_event(logger, logging.INFO, "llm_configured", model="gemini")
+            else:
+                log_event(logger, logging.INFO, "llm_not_configured", detail="No API key. Using CSV fallback mode.")
+        # An injected model (any object with a Gemini-style generate_content(prompt)) lets tests and local runs skip Gemini.
+        # Every call goes through the gateway, which bounds concurrency, enforces deadlines and trips a circuit breaker.
+        self.model = None
+        if model is not None:
+            self.model = LLMGateway(
+                model,
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+                timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "10")),
+                acquire_timeout=float(os.getenv("LLM_ACQUIRE_TIMEOUT_SECONDS", "0.5")),
+                failure_threshold=int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30")),
+            )
+        self.prefetcher = None
         if self.model:
-            try:
-                difficulty_map = {1: "Very Easy", 2: "Easy", 3: "Medium", 4: "Difficult"}
-                difficulty_str = difficulty_map.get(difficulty_level, "Medium")
-                prompt = f"""
-                As an expert educator, create a new, unique, high-quality multiple-choice question on the topic of 'Percentages'.
-                The question should be of '{difficulty_str}' difficulty. Ensure the question is clear, concise, and solvable.
-                Provide the response ONLY in the following JSON format:
-                {{
-                  "id": "generated_{random.randint(1000, 9999)}", "question_text": "Your question here",
-                  "options": {{"a": "Option A", "b": "Option B", "c": "Option C", "d": "Option D"}},
-                  "correct_answer": "a", "difficulty_level": {difficulty_level}
-                }}
-                """
-                response = self.model.generate_content(prompt)
-                cleaned_response = response.text.strip().replace('```json', '').replace('```', '')
-                question_data = json.loads(cleaned_response)
-                print("✅ LLM Generation Successful.")
+            self.prefetcher = QuestionPrefetcher(
+                self.generate_llm_question,
+                buffer_size=int(os.getenv("QUESTION_PREFETCH_SIZE", "5")),
+                workers=int(os.getenv("QUESTION_PREFETCH_WORKERS", "2")),
+            )
+        # Hints depend only on the question, so they are generated once and shared by every learner.
+        # load_hint/save_hint optionally persist them (see HintCache).
+        self.hint_cache = HintCache(
+            self.generate_llm_hint,
+            maxsize=int(os.getenv("HINT_CACHE_SIZE", "5000")),
+            ttl=float(os.getenv("HINT_CACHE_TTL_HOURS", "168")) * 3600,
+            load_fn=load_hint, save_fn=save_hint,
+            prewarm_workers=int(os.getenv("HINT_PREWARM_WORKERS", "2")),
+        )
+
+    def generate_llm_question(self, difficulty_level: int):
+        """ Runs one LLM round trip and returns the parsed question. Raises on any failure. """
+        difficulty_map = {1: "Very Easy", 2: "Easy", 3: "Medium", 4: "Difficult"}
+        difficulty_str = difficulty_map.get(difficulty_level, "Medium")
+        prompt = f"""
+        As an expert educator, create a new, unique, high-quality multiple-choice question on the topic of 'Percentages'.
+        The question should be of '{difficulty_str}' difficulty. Ensure the question is clear, concise, and solvable.
+        Provide the response ONLY in the following JSON format:
+        {{
+          "id": "generated_{random.randint(1000, 9999)}", "question_text": "Your question here",
+          "options": {{"a": "Option A", "b": "Option B", "c": "Option C", "d": "Option D"}},
+          "correct_answer": "a", "difficulty_level": {difficulty_level}
+        }}
+        """
+        response = self.model.generate_content(prompt)
+        cleaned_response = response.text.strip().replace('```json', '').replace('```', '')
+        return json.loads(cleaned_response)
+
+    def generate_content(self, difficulty_level: int, ability: float = None, sampler_state: dict = None):
+        # LLM questions are generated ahead of time by the prefetcher; an empty buffer falls back to the CSV bank.
+        if self.prefetcher:
+            question_data = self.prefetcher.pop(difficulty_level)
+            if question_data:
+                metrics.QUESTIONS_SERVED.inc("llm_prefetched")
+                log_event(logger, logging.DEBUG, "question_served", source="llm_prefetched", difficulty_level=difficulty_level)
                 return question_data
-            except Exception as e:
-                print(f"❌ LLM Generation Failed: {e}. Using CSV fallback.")
-                return self.get_fallback_question(difficulty_level)
+            reason = "circuit_open" if not self.model.healthy else "buffer_empty"
         else:
-            return self.get_fallback_question(difficulty_level)
+            reason = "no_model"
+        metrics.QUESTION_FALLBACKS.inc(reason)
+        log_event(logger, logging.DEBUG, "question_fallback", reason=reason, difficulty_level=difficulty_level)
+        return self.get_fallback_question(difficulty_level, ability=ability, sampler_state=sampler_state)
 
-    def get_fallback_question(self, difficulty_level: int):
-        print("↪️ CurriculumAgent: Using CSV fallback.")
-        question = self.fallback_db.get_valid_question_by_difficulty(difficulty_level)
+    def next_question(self, difficulty_level: int, ability: float = None, sampler_state: dict = None):
+        """
+        generate_content for a learner's session. Returns (question, new sampler state); the caller stores the state
+        (UserProgress.item_sampler) with the rest of the answer. A missing state starts a new session.
+        """
+        state = copy.deepcopy(sampler_state) if sampler_state else ItemSelector.new_state()
+        return self.generate_content(difficulty_level, ability=ability, sampler_state=state), state
+
+    def get_fallback_question(self, difficulty_level: int, ability: float = None, sampler_state: dict = None):
+        metrics.QUESTIONS_SERVED.inc("csv_fallback")
+        question = self.fallback_db.get_valid_question_by_difficulty(difficulty_level, selector=self.item_selector, ability=ability, sampler_state=sampler_state)
         if question:
             return {
                 "id": question['id'], "question_text": question['question_text'],
@@ -108,16 +194,28 @@ class CurriculumAgent:
             }
         return {"error": "Could not retrieve any valid question."}
     
+    def generate_llm_hint(self, question_text: str):
+        """ Runs one LLM round trip for a hint. Raises on any failure. """
+        prompt = f"Provide a short, one-sentence hint for the following math question. Do not solve it. Question: {question_text}"
+        response = self.model.generate_content(prompt)
+        return response.text.strip()
+
     def generate_hint(self, question_text: str):
         if not self.model:
             return "Hint generation is unavailable in fallback mode."
         try:
-            prompt = f"Provide a short, one-sentence hint for the following math question. Do not solve it. Question: {question_text}"
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            return self.hint_cache.get(question_text)
+        except (LLMUnavailable, LLMTimeout):
+            return "Hints are temporarily unavailable. Please try again shortly."
         except Exception as e:
             return f"Could not generate hint: {e}"
 
+    def prewarm_hints(self) -> int:
+        """ Queues hint generation for every question in the CSV bank; returns how many were not cached yet. """
+        if not self.model:
+            return 0
+        return self.hint_cache.prewarm(question['question_text'] for question in self.fallback_db.questions)
+
 class DiagnosticAgent:
     def analyze_submission(self, was_correct: bool, time_taken: float):
         adjustments = {'concentration': 0, 'comprehension': 0, 'retention': 0, 'application': 0}
@@ -144,11 +242,18 @@ class AdaptiveEngine:
         self.irt_model = IRTModel()
         self.bkt_model = BKTModel()
 
-    def get_next_difficulty(self, user_history: list, latest_ability: float):
-        if not user_history: return 1
-        mastery_prob = self.bkt_model.get_mastery_probability(user_history)
+    def update_mastery(self, previous_mastery, was_correct: bool, load_history) -> float:
+        """
+        Advances the stored BKT mastery by one answer. If nothing is stored yet (e.g. rows written before
+        mastery was persisted), it is backfilled once by replaying the earlier answers returned by load_history().
+        """
+        if previous_mastery is None:
+            previous_mastery = self.bkt_model.get_mastery_probability(load_history())
+        return self.bkt_model.update(previous_mastery, was_correct)
+
+    def get_next_difficulty(self, mastery_prob: float, latest_ability: float):
         next_difficulty_irt = self.irt_model.get_next_item_difficulty(latest_ability)
-        print(f"🧠 BKT Mastery Prob: {mastery_prob:.2f} | IRT Suggested Level: {next_difficulty_irt}")
+        log_event(logger, logging.DEBUG, "next_difficulty", mastery=round(mastery_prob, 4), irt_level=next_difficulty_irt)
         
         if mastery_prob > 0.95:
             return min(4, int(round(next_difficulty_irt)) + 1)
@@ -156,29 +261,35 @@ class AdaptiveEngine:
             return max(1, int(round(next_difficulty_irt)))
 
 class ReportingAgent:
-    def generate_report(self, user_id: int, user_history: list, fingerprint_data: dict):
-        plt.style.use('dark_background')
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
-        
-        fp_keys = [k.capitalize() for k in fingerprint_data.keys()]
-        fp_values = list(fingerprint_data.values())
-        sns.barplot(x=fp_keys, y=fp_values, ax=ax1, palette="viridis_r")
-        ax1.set_title('Cognitive Fingerprint'); ax1.set_ylabel('Score'); ax1.set_ylim(0, 1)
-        
-        if user_history:
-            abilities = [h.ability for h in user_history]
-            ax2.plot(range(len(abilities)), abilities, marker='o', linestyle='-', color='#61dafb')
-            ax2.set_title('Learning Trajectory'); ax2.set_xlabel('Questions Answered'); ax2.set_ylabel('Estimated Ability'); ax2.set_ylim(0, 1)
-        else:
-            ax2.text(0.5, 0.5, 'Answer questions to see your trajectory.', ha='center', va='center', color='gray')
-        
-        plt.tight_layout()
-        os.makedirs("static/reports", exist_ok=True)
-        
-        filename = f"report_{user_id}_{random.randint(1000, 9999)}.png"
-        filepath = os.path.join("static/reports", filename)
-        
-        plt.savefig(filepath); plt.close()
-        
-        return {"fingerprint_chart_url": f"/{filepath}", "trajectory_chart_url": f"/{filepath}"}
+    def __init__(self, renderer: ReportRenderer = None):
+        self.renderer = renderer or ReportRenderer(
+            workers=int(os.getenv("REPORT_RENDER_WORKERS", "2")),
+            max_pending=int(os.getenv("REPORT_RENDER_QUEUE_SIZE", "16")),
+            max_files=int(os.getenv("REPORT_CACHE_MAX_FILES", "5000")),
+            max_bytes=int(os.getenv("REPORT_CACHE_MAX_MB", "500")) * 1024 * 1024,
+            max_age_seconds=float(os.getenv("REPORT_CACHE_MAX_AGE_HOURS", "168")) * 3600,
+        )
+        # REPORT_PNG_MODE: "always" renders PNGs after every answer (for clients that still show the images), "off"
+        # (default) never; charts are otherwise drawn by the client. Shared reports always carry data, never PNG URLs:
+        # their bodies are cached for a year, longer than a cached PNG is kept.
+        self.png_per_answer = os.getenv("REPORT_PNG_MODE", "off") == "always"
 
+    def generate_report(self, user_id: int, abilities: list, fingerprint_data: dict, render_png: bool = None):
+        """
+        Returns a handle to the learner's report right away. By default that is the report data for client-side
+        charts (data_url, with the ETag it will have); with render_png (or REPORT_PNG_MODE=always for every answer)
+        the PNG is queued and status_url can be polled until it is "done".
+        """
+        if not (self.png_per_answer if render_png is None else render_png):
+            metrics.REPORT_REQUESTS.inc("data")
+            key = report_data.report_key(fingerprint_data, abilities)
+            return {"status": "done", "format": "data", "data_url": "/reports/data", "report_id": key,
+                    "etag": report_data.etag(key, report_data.TRAJECTORY_POINTS, "json")}
+        try:
+            with metrics.span("report_queue"):
+                job_id = self.renderer.submit(fingerprint_data, abilities)
+        except RendererBusy as e:
+            metrics.REPORT_REQUESTS.inc("busy")
+            log_event(logger, logging.WARNING, "report_skipped", reason=str(e))
+            return {"status": "busy"}
+        return {**self.renderer.status(job_id), "status_url": f"/reports/status/{job_id}"}
@@ -1,3 +1,5 @@
+from ai_models.irt_model import ragged_layout
+
 class BKTModel:
     """
     Implements a simple Bayesian Knowledge Tracing (BKT) model.
@@ -9,28 +11,68 @@ class BKTModel:
         self.p_S = p_slip       # P(S): Probability of making a mistake when knowing the skill
         self.p_G = p_guess      # P(G): Probability of guessing correctly when not knowing
 
+    def update(self, p_L_prev: float, correct: bool) -> float:
+        """
+        Applies one answer to a running mastery probability and returns the new one.
+        This is the O(1) per-answer step used to keep mastery as persisted state.
+        """
+        # This check is to prevent division by zero in edge cases
+        denominator_correct = (p_L_prev * (1 - self.p_S) + (1 - p_L_prev) * self.p_G)
+        denominator_incorrect = (p_L_prev * self.p_S + (1 - p_L_prev) * (1 - self.p_G))
+
+        if correct:
+            if denominator_correct == 0: return p_L_prev
+            p_L_cond = (p_L_prev * (1 - self.p_S)) / denominator_correct
+        else:
+            if denominator_incorrect == 0: return p_L_prev
+            p_L_cond = (p_L_prev * self.p_S) / denominator_incorrect
+
+        # Update the probability for the next step
+        return p_L_cond + (1 - p_L_cond) * self.p_T
+
     def get_mastery_probability(self, history: list) -> float:
         """
         Calculates the probability of mastery given a history of answers.
+        Replays the whole history; used to verify and backfill the incrementally stored value.
         """
         p_L_prev = self.p_L
         for item in history:
-            correct = item.correct
-            
-            # This check is to prevent division by zero in edge cases
-            denominator_correct = (p_L_prev * (1 - self.p_S) + (1 - p_L_prev) * self.p_G)
-            denominator_incorrect = (p_L_prev * self.p_S + (1 - p_L_prev) * (1 - self.p_G))
-
-            if correct:
-                if denominator_correct == 0: continue
-                p_L_cond = (p_L_prev * (1 - self.p_S)) / denominator_correct
-            else:
-                if denominator_incorrect == 0: continue
-                p_L_cond = (p_L_prev * self.p_S) / denominator_incorrect
-            
-            # Update the probability for the next step
-            p_L_current = p_L_cond + (1 - p_L_cond) * self.p_T
-            p_L_prev = p_L_current
-        
+            p_L_prev = self.update(p_L_prev, item.correct)
         return p_L_prev
 
+    # --- Batch (vectorized) API: the same model applied to many learners at once ---
+    # numpy is imported inside these methods: the per-request scalar path above never needs it.
+
+    def update_batch(self, p_L_prev, correct):
+        """ Vectorized update: applies one answer to each learner's running mastery probability. """
+        import numpy as np
+        p_L_prev = np.asarray(p_L_prev, dtype=np.float64)
+        correct = np.asarray(correct, dtype=bool)
+        denominator_correct = (p_L_prev * (1 - self.p_S) + (1 - p_L_prev) * self.p_G)
+        denominator_incorrect = (p_L_prev * self.p_S + (1 - p_L_prev) * (1 - self.p_G))
+        denominator = np.where(correct, denominator_correct, denominator_incorrect)
+        numerator = np.where(correct, p_L_prev * (1 - self.p_S), p_L_prev * self.p_S)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p_L_cond = numerator / denominator
+        # Same edge case as the scalar update: a zero denominator leaves the probability unchanged.
+        return np.where(denominator == 0, p_L_prev, p_L_cond + (1 - p_L_cond) * self.p_T)
+
+    def get_mastery_probability_batch(self, correct, offsets):
+        """
+        Mastery probability for many learners from ragged histories in one call.
+        Learner i's answers are correct[offsets[i]:offsets[i + 1]], in order; offsets has n_learners + 1 entries.
+        """
+        import numpy as np
+        correct = np.asarray(correct, dtype=bool)
+        starts, lengths, order = ragged_layout(offsets)
+        sorted_starts = starts[order]
+        sorted_mastery = np.full(len(lengths), self.p_L, dtype=np.float64)
+        active = len(order)
+        for step in range(int(lengths.max(initial=0))):
+            # Learners are sorted by history length (longest first), so those still active form a prefix.
+            while active and lengths[order[active - 1]] <= step:
+                active -= 1
+            sorted_mastery[:active] = self.update_batch(sorted_mastery[:active], correct[sorted_starts[:active] + step])
+        mastery = np.empty_like(sorted_mastery)
+        mastery[order] = sorted_mastery
+        return mastery
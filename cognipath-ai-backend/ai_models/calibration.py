@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class RaschCalibrator:
+    """
+    Fits 1PL (Rasch) item difficulties from streamed responses with known learner abilities.
+
+    Responses are never kept. Each chunk is folded into per-item sufficient statistics over a fixed grid of
+    ability bins (responses, correct answers and summed ability per bin), so memory is O(items x bins)
+    no matter how many rows are streamed. fit() then runs a vectorized Newton solve for all items at once.
+    A weak Gaussian prior around each item's nominal difficulty keeps items with all-correct or
+    all-wrong responses finite.
+    """
+    def __init__(self, bins: int = 50, ability_range=(0.0, 1.0), prior_sd: float = 1.0, iterations: int = 25):
+        self.bins = bins
+        self.ability_range = ability_range
+        self.prior_sd = prior_sd
+        self.iterations = iterations
+        self.keys = []        # item index -> item key
+        self._index = {}      # item key -> item index
+        self.prior_means = []
+        self._responses = np.zeros((0, bins))
+        self._correct = np.zeros((0, bins))
+        self._ability_sum = np.zeros((0, bins))
+
+    def _item_indices(self, keys, prior_means) -> np.ndarray:
+        indices = np.empty(len(keys), dtype=np.int64)
+        for i, (key, prior_mean) in enumerate(zip(keys, prior_means)):
+            index = self._index.get(key)
+            if index is None:
+                index = self._index[key] = len(self.keys)
+                self.keys.append(key)
+                self.prior_means.append(float(prior_mean))
+            indices[i] = index
+        grow = len(self.keys) - self._responses.shape[0]
+        if grow > 0:
+            padding = np.zeros((grow, self.bins))
+            self._responses = np.vstack([self._responses, padding])
+            self._correct = np.vstack([self._correct, padding])
+            self._ability_sum = np.vstack([self._ability_sum, padding])
+        return indices
+
+    def add_responses(self, keys, prior_means, item_index, abilities, correct):
+        """
+        Folds one chunk of responses into the statistics. keys and prior_means (the nominal difficulty)
+        describe the distinct items in the chunk; item_index, abilities and correct have one entry per
+        response: which of those items was answered, the learner's ability at the time and the 0/1 outcome.
+        """
+        if len(item_index) == 0:
+            return
+        items = self._item_indices(keys, prior_means)[np.asarray(item_index, dtype=np.int64)]
+        abilities = np.asarray(abilities, dtype=np.float64)
+        correct = np.asarray(correct, dtype=np.float64)
+        low, high = self.ability_range
+        bins = np.clip(((abilities - low) / (high - low) * self.bins).astype(np.int64), 0, self.bins - 1)
+        cells = items * self.bins + bins
+        size = self._responses.size
+        self._responses += np.bincount(cells, minlength=size).reshape(self._responses.shape)
+        self._correct += np.bincount(cells, weights=correct, minlength=size).reshape(self._responses.shape)
+        self._ability_sum += np.bincount(cells, weights=abilities, minlength=size).reshape(self._responses.shape)
+
+    def response_counts(self) -> dict:
+        return dict(zip(self.keys, self._responses.sum(axis=1).astype(int).tolist()))
+
+    def fit(self) -> dict:
+        """ Returns {item key: difficulty} on the ability scale. """
+        if not self.keys:
+            return {}
+        n = self._responses
+        y = self._correct
+        # Bin means of the ability are more accurate than bin centres; empty bins have n = 0 and drop out.
+        theta = np.divide(self._ability_sum, n, out=np.zeros_like(n), where=n > 0)
+        prior_mean = np.asarray(self.prior_means, dtype=np.float64)
+        prior_precision = 1.0 / self.prior_sd ** 2
+        b = prior_mean.copy()
+        for _ in range(self.iterations):
+            p = 1 / (1 + np.exp(-(theta - b[:, None])))
+            # Newton step on the log-posterior: d/db = sum(n*p - y) - (b - mu)/sd^2, d2/db2 = -sum(n*p*(1-p)) - 1/sd^2
+            gradient = (n * p - y).sum(axis=1) - (b - prior_mean) * prior_precision
+            curvature = (n * p * (1 - p)).sum(axis=1) + prior_precision
+            step = gradient / curvature
+            b += step
+            if np.max(np.abs(step)) < 1e-8:
+                break
+        return dict(zip(self.keys, b.tolist()))
@@ -6,6 +6,34 @@ class IRTModel:
     """
     def __init__(self, learning_rate=0.1):
         self.learning_rate = learning_rate
+        # Calibrated difficulties keyed by level_key()/item keys; empty means the nominal level / 4 scale is used.
+        self.item_difficulties = {}
+        self._level_difficulties = None
+        self.version = 0  # Bumped by load_parameters so callers can cache anything derived from the difficulties.
+
+    @staticmethod
+    def level_key(difficulty: int) -> str:
+        return f"level:{int(difficulty)}"
+
+    @staticmethod
+    def item_key(item_id) -> str:
+        return f"item:{item_id}"
+
+    def load_parameters(self, item_difficulties: dict):
+        """ Swaps in a new map of calibrated difficulties (e.g. from the item_parameters table). """
+        self.item_difficulties = dict(item_difficulties)
+        self.version += 1
+        calibrated_levels = [self.level_key(level) in self.item_difficulties for level in range(1, 5)]
+        self._level_difficulties = None
+        if any(calibrated_levels):
+            # Index 0 is unused so the list can be indexed by level directly.
+            self._level_difficulties = [0.0] + [self.item_difficulties.get(self.level_key(level), level / 4.0) for level in range(1, 5)]
+
+    def item_difficulty(self, difficulty: int, item_key: str = None) -> float:
+        """ Difficulty on the ability scale: calibrated item, then calibrated level, then the nominal level / 4. """
+        if item_key is not None and item_key in self.item_difficulties:
+            return self.item_difficulties[item_key]
+        return self.item_difficulties.get(self.level_key(difficulty), difficulty / 4.0)
 
     def _sigmoid(self, x: float) -> float:
         """ The sigmoid function, which maps any value to a value between 0 and 1. """
@@ -14,12 +42,12 @@ class IRTModel:
             return 0
         return 1 / (1 + math.exp(-x))
 
-    def update_ability(self, ability: float, correct: bool, difficulty: int) -> float:
+    def update_ability(self, ability: float, correct: bool, difficulty: int, item_key: str = None) -> float:
         """
         Updates the user's ability based on their response to a single question.
         """
-        # Normalize difficulty to be on a similar scale to ability (0-1)
-        normalized_difficulty = difficulty / 4.0 
+        # Normalize difficulty to be on a similar scale to ability (0-1), or use its calibrated value
+        normalized_difficulty = self.item_difficulty(difficulty, item_key)
         
         prob_correct = self._sigmoid(ability - normalized_difficulty)
         
@@ -37,6 +65,94 @@ class IRTModel:
         """
         Suggests the optimal difficulty for the next question based on current ability.
         """
+        if self._level_difficulties is not None:
+            # With calibrated levels, the most informative level is the one whose difficulty is closest to the ability.
+            return min(range(1, 5), key=lambda level: abs(self._level_difficulties[level] - ability))
         suggested_difficulty = ability * 4.0
         return max(1, min(4, int(round(suggested_difficulty))))
 
+
+    # --- Batch (vectorized) API: the same model applied to many learners at once ---
+    # numpy is imported inside these methods: the per-request scalar path above never needs it.
+
+    def _sigmoid_batch(self, x):
+        """ Element-wise version of _sigmoid, including its cut-off for large negative x. """
+        import numpy as np
+        return np.where(x < -700, 0.0, 1 / (1 + np.exp(-np.maximum(x, -700))))
+
+    def item_difficulty_batch(self, difficulties, item_keys=None):
+        """
+        Vectorized item_difficulty. item_keys, if given, holds one item key (or None) per response; calibrated items
+        use their own difficulty exactly like the scalar path. That lookup is a dict access per response.
+        """
+        import numpy as np
+        if self._level_difficulties is not None:
+            normalized_difficulties = np.asarray(self._level_difficulties)[np.asarray(difficulties, dtype=np.int64)]
+        else:
+            normalized_difficulties = np.asarray(difficulties, dtype=np.float64) / 4.0
+        if item_keys is not None and self.item_difficulties:
+            calibrated = [(i, self.item_difficulties[key]) for i, key in enumerate(item_keys) if key is not None and key in self.item_difficulties]
+            if calibrated:
+                positions, values = zip(*calibrated)
+                normalized_difficulties[list(positions)] = values
+        return normalized_difficulties
+
+    def update_ability_batch(self, abilities, correct, difficulties, item_keys=None):
+        """
+        Vectorized update_ability: one response for each learner. All arguments are equal-length arrays
+        (item_keys a sequence of item keys or None, see item_difficulty_batch).
+        """
+        return self._update_ability_batch(abilities, correct, self.item_difficulty_batch(difficulties, item_keys))
+
+    def _update_ability_batch(self, abilities, correct, normalized_difficulties):
+        import numpy as np
+        abilities = np.asarray(abilities, dtype=np.float64)
+        correct = np.asarray(correct, dtype=bool)
+        prob_correct = self._sigmoid_batch(abilities - normalized_difficulties)
+        ability_update = np.where(correct, self.learning_rate * (1 - prob_correct), -self.learning_rate * prob_correct)
+        return np.clip(abilities + ability_update, 0.05, 0.95)
+
+    def replay_abilities_batch(self, correct, difficulties, offsets, initial_ability: float = 0.5, item_keys=None):
+        """
+        Replays ragged response histories for many learners and returns each learner's final ability.
+        Learner i's responses are correct[offsets[i]:offsets[i + 1]] (and the same slice of difficulties and item_keys).
+        """
+        import numpy as np
+        correct = np.asarray(correct, dtype=bool)
+        # Resolved once for all responses, so the per-step updates only do array arithmetic.
+        normalized_difficulties = self.item_difficulty_batch(difficulties, item_keys)
+        starts, lengths, order = ragged_layout(offsets)
+        abilities = np.full(len(lengths), initial_ability, dtype=np.float64)
+        sorted_starts = starts[order]
+        sorted_abilities = abilities[order]
+        active = len(order)
+        for step in range(int(lengths.max(initial=0))):
+            # Learners are sorted by history length (longest first), so those still active form a prefix.
+            while active and lengths[order[active - 1]] <= step:
+                active -= 1
+            idx = sorted_starts[:active] + step
+            sorted_abilities[:active] = self._update_ability_batch(sorted_abilities[:active], correct[idx], normalized_difficulties[idx])
+        abilities[order] = sorted_abilities
+        return abilities
+
+    def get_next_item_difficulty_batch(self, abilities):
+        """ Vectorized get_next_item_difficulty. np.rint rounds half to even, exactly like round(). """
+        import numpy as np
+        if self._level_difficulties is not None:
+            distances = np.abs(np.asarray(self._level_difficulties[1:])[None, :] - np.asarray(abilities, dtype=np.float64)[:, None])
+            return np.argmin(distances, axis=1).astype(np.int64) + 1
+        suggested_difficulties = np.asarray(abilities, dtype=np.float64) * 4.0
+        return np.clip(np.rint(suggested_difficulties), 1, 4).astype(np.int64)
+
+
+def ragged_layout(offsets):
+    """
+    Splits CSR-style offsets (length n_learners + 1) into per-learner starts and lengths,
+    plus the learner order sorted by descending history length.
+    """
+    import numpy as np
+    offsets = np.asarray(offsets, dtype=np.int64)
+    starts = offsets[:-1]
+    lengths = np.diff(offsets)
+    order = np.argsort(-lengths, kind="stable")
+    return starts, lengths, order
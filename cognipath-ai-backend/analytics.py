@@ -0,0 +1,316 @@
+"""
+Cohort analytics for teachers: distributions of ability, mastery, activity and the cognitive fingerprint, and
+accuracy per difficulty level, over all learners of an education level or of an explicit group (cohort_members).
+
+CohortAnalytics keeps a snapshot of every learner as NumPy arrays: one row per learner with their progress and
+fingerprint values, plus their answers and correct answers per level. A cohort's report is then a boolean mask and
+a handful of vectorized reductions, cached until the snapshot changes. The snapshot is built from SQL (one
+progress/fingerprint join, GROUP BY counts over the live history, the archive and the retention rollups) and
+refreshed incrementally at most every ANALYTICS_REFRESH_SECONDS: only history rows not counted yet are counted, and
+only learners who answered, started a session or registered since then are re-read. Ids are allocated before their
+rows commit, so a row can appear after a higher id; each refresh re-reads the last ANALYTICS_ID_LOOKBACK ids and skips
+those it has seen (IdWatermark). A full rebuild every ANALYTICS_FULL_REFRESH_SECONDS, on a background thread, picks
+up anything else (e.g. deleted accounts) while reports keep coming from the current snapshot.
+"""
+import os
+import logging
+import threading
+import time
+
+from sqlalchemy import func, select
+
+import crud, models
+from cache import LRUCache
+from database import SessionLocal
+from logs import get_logger, log_event
+from report_data import FINGERPRINT_KEYS
+
+REFRESH_SECONDS = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "5"))
+FULL_REFRESH_SECONDS = float(os.getenv("ANALYTICS_FULL_REFRESH_SECONDS", "900"))
+ID_LOOKBACK = int(os.getenv("ANALYTICS_ID_LOOKBACK", "1000"))
+HISTOGRAM_BINS = 10
+PERCENTILES = (10, 25, 50, 75, 90)
+RELOAD_CHUNK = 500  # Learners re-read per query; keeps IN (...) lists well below database parameter limits
+
+# Columns of the learner value matrix (crud.LEARNER_COLUMNS after user id and education level)
+ABILITY, MASTERY, ANSWERED, CORRECT, DIFFICULTY = range(5)
+FINGERPRINT = {key: 5 + i for i, key in enumerate(FINGERPRINT_KEYS)}
+logger = get_logger("analytics")
+
+# numpy is imported inside the functions that use it: main imports this module, and only the analytics routes need numpy.
+
+
+def _round(value) -> float:
+    return round(float(value), 4)
+
+
+def _distribution(values) -> dict:
+    """ Mean, standard deviation and percentiles of the non-missing values, or None if there are none. """
+    import numpy as np
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return None
+    percentiles = np.percentile(values, PERCENTILES)
+    return {
+        "mean": _round(values.mean()),
+        "std": _round(values.std()),
+        "percentiles": {f"p{pct}": _round(value) for pct, value in zip(PERCENTILES, percentiles)},
+    }
+
+
+def _histogram(values) -> dict:
+    """ Counts of the non-missing values in HISTOGRAM_BINS equal bins over [0, 1]. """
+    import numpy as np
+    counts, edges = np.histogram(values[~np.isnan(values)], bins=HISTOGRAM_BINS, range=(0.0, 1.0))
+    return {"edges": [round(float(edge), 2) for edge in edges], "counts": counts.tolist()}
+
+
+class IdWatermark:
+    """
+    The ids of a table seen so far: every id up to floor, plus those seen above it. The floor trails the highest
+    seen id by lookback, so a row committed late, after a higher id, is still found if it is within that window.
+    """
+    def __init__(self, floor: int = 0, lookback: int = ID_LOOKBACK):
+        self.floor = max(floor, 0)
+        self.lookback = lookback
+        self.recent = set()
+
+    @property
+    def latest(self) -> int:
+        return max(self.recent, default=self.floor)
+
+    def unseen(self, rows: list) -> list:
+        """ The rows (with the id first) of a query for ids above floor that were not seen yet. """
+        return [row for row in rows if row[0] not in self.recent]
+
+    def add(self, ids):
+        self.recent.update(ids)
+        self.floor = max(self.floor, self.latest - self.lookback)
+        self.recent = {id_ for id_ in self.recent if id_ > self.floor}
+
+
+class LearnerSnapshot:
+    """ Every learner's values as arrays sorted by user id, and the history/session ids they include. """
+    def __init__(self, rows: list, history: IdWatermark, sessions: IdWatermark):
+        import numpy as np
+        self.level_codes = {}
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.levels = np.empty(0, dtype=np.int32)
+        self.values = np.empty((0, 5 + len(FINGERPRINT_KEYS)), dtype=np.float64)
+        self.answers = np.zeros((0, 4), dtype=np.int64)
+        self.correct = np.zeros((0, 4), dtype=np.int64)
+        self.history = history
+        self.sessions = sessions
+        self.append(rows)
+
+    def _level_code(self, level) -> int:
+        return self.level_codes.setdefault(level, len(self.level_codes))
+
+    def append(self, rows: list):
+        """ Adds learners with ids above every known one (rows of crud.LEARNER_COLUMNS, ordered by id). """
+        import numpy as np
+        if not rows:
+            return
+        self.user_ids = np.concatenate([self.user_ids, np.array([row[0] for row in rows], dtype=np.int64)])
+        self.levels = np.concatenate([self.levels, np.array([self._level_code(row[1]) for row in rows], dtype=np.int32)])
+        self.values = np.vstack([self.values, np.array([row[2:] for row in rows], dtype=np.float64)])  # NULL -> nan
+        padding = np.zeros((len(rows), self.answers.shape[1]), dtype=np.int64)
+        self.answers = np.vstack([self.answers, padding])
+        self.correct = np.vstack([self.correct, padding])
+
+    def positions(self, user_ids) -> tuple:
+        """ (row positions, mask of the ids that are known) for an array of user ids. """
+        import numpy as np
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.user_ids, user_ids), max(len(self.user_ids) - 1, 0))
+        known = (self.user_ids[positions] == user_ids) if len(self.user_ids) else np.zeros(len(user_ids), dtype=bool)
+        return positions, known
+
+    def update(self, rows: list):
+        """ Overwrites the values of known learners with fresh rows of crud.LEARNER_COLUMNS. """
+        import numpy as np
+        if not rows:
+            return
+        positions, known = self.positions([row[0] for row in rows])
+        self.values[positions[known]] = np.array([row[2:] for row in rows], dtype=np.float64)[known]
+
+    def add_answer_counts(self, rows: list):
+        """ Adds (user_id, difficulty, answers, correct answers) rows; learners not in the snapshot are skipped. """
+        import numpy as np
+        if not rows:
+            return
+        counts = np.array(rows, dtype=np.int64)
+        positions, known = self.positions(counts[:, 0])
+        known &= counts[:, 1] >= 1
+        counts, positions = counts[known], positions[known]
+        if counts.size and counts[:, 1].max() > self.answers.shape[1]:
+            extra = np.zeros((len(self.user_ids), counts[:, 1].max() - self.answers.shape[1]), dtype=np.int64)
+            self.answers, self.correct = np.hstack([self.answers, extra]), np.hstack([self.correct, extra])
+        np.add.at(self.answers, (positions, counts[:, 1] - 1), counts[:, 2])
+        np.add.at(self.correct, (positions, counts[:, 1] - 1), counts[:, 3])
+
+    def add_answers(self, rows: list):
+        """ Counts (id, user_id, difficulty, correct) history rows. """
+        self.add_answer_counts([(user_id, difficulty, 1, int(bool(correct))) for _, user_id, difficulty, correct in rows])
+
+
+class CohortAnalytics:
+    def __init__(self, refresh_seconds: float = REFRESH_SECONDS, full_refresh_seconds: float = FULL_REFRESH_SECONDS, maxsize: int = 256,
+                 session_factory=SessionLocal, id_lookback: int = ID_LOOKBACK):
+        self.refresh_seconds = refresh_seconds
+        self.full_refresh_seconds = full_refresh_seconds
+        self.session_factory = session_factory  # The background rebuild's own database sessions
+        self.id_lookback = id_lookback
+        self._snapshot = None
+        self._built_at = 0.0
+        self._refreshed_at = 0.0
+        self._version = 0
+        self._results = LRUCache(maxsize=maxsize)  # (kind, name) -> (snapshot version, report)
+        self._lock = threading.Lock()
+        self._rebuilding = threading.Lock()
+        self._stats = {"full_refreshes": 0, "incremental_refreshes": 0, "learners_reloaded": 0, "failed_rebuilds": 0}
+
+    def _build(self, db) -> LearnerSnapshot:
+        # Sessions are read before the learners, so the learner rows already reflect every session seen.
+        sessions = IdWatermark((db.scalar(select(func.max(models.LearningSession.id))) or 0) - self.id_lookback, self.id_lookback)
+        sessions.add(row[0] for row in db.execute(crud.recent_sessions_query(after_id=sessions.floor)))
+        history = IdWatermark((db.scalar(select(func.max(models.UserHistory.id))) or 0) - self.id_lookback, self.id_lookback)
+        snapshot = LearnerSnapshot(db.execute(crud.cohort_learners_query()).all(), history, sessions)
+        for query in crud.answer_count_queries(up_to_id=history.floor):
+            snapshot.add_answer_counts(db.execute(query).all())
+        # The rows above the floor are counted one by one, so the next refreshes know which ones they have seen.
+        answers = db.execute(crud.recent_answers_query(after_id=history.floor)).all()
+        snapshot.add_answers(answers)
+        history.add(row[0] for row in answers)
+        return snapshot
+
+    def _install(self, snapshot: LearnerSnapshot):
+        self._snapshot = snapshot
+        self._built_at = self._refreshed_at = time.monotonic()
+        self._version += 1
+        self._stats["full_refreshes"] += 1
+
+    def _refresh(self, db):
+        snapshot = self._snapshot
+        last_user_id = int(snapshot.user_ids[-1]) if len(snapshot.user_ids) else None
+        new_learners = db.execute(crud.cohort_learners_query(after_user_id=last_user_id)).all()
+        snapshot.append(new_learners)
+        answers = snapshot.history.unseen(db.execute(crud.recent_answers_query(after_id=snapshot.history.floor)).all())
+        snapshot.add_answers(answers)
+        snapshot.history.add(row[0] for row in answers)
+        # /start resets mastery without writing history
+        sessions = snapshot.sessions.unseen(db.execute(crud.recent_sessions_query(after_id=snapshot.sessions.floor)).all())
+        snapshot.sessions.add(row[0] for row in sessions)
+        changed = {row[1] for row in answers} | {row[1] for row in sessions}
+        changed.difference_update(row[0] for row in new_learners)
+        changed = sorted(changed)
+        for start in range(0, len(changed), RELOAD_CHUNK):
+            snapshot.update(db.execute(crud.cohort_learners_query(user_ids=changed[start:start + RELOAD_CHUNK])).all())
+        self._refreshed_at = time.monotonic()
+        if new_learners or changed:
+            self._version += 1
+        self._stats["incremental_refreshes"] += 1
+        self._stats["learners_reloaded"] += len(changed)
+
+    def _rebuild_if_due(self):
+        """ Starts a periodic full rebuild on a background thread (one at a time); reports keep coming from the current snapshot. """
+        if self._snapshot is None or time.monotonic() - self._built_at < self.full_refresh_seconds:
+            return
+        if not self._rebuilding.acquire(blocking=False):
+            return
+        threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+
+    def _rebuild_in_background(self):
+        try:
+            db = self.session_factory()
+            try:
+                snapshot = self._build(db)
+            finally:
+                db.close()
+            with self._lock:
+                self._install(snapshot)
+        except Exception as e:
+            with self._lock:
+                self._built_at = time.monotonic()  # Retried after another full_refresh_seconds, not on every request
+                self._stats["failed_rebuilds"] += 1
+            log_event(logger, logging.ERROR, "analytics_rebuild_failed", error=str(e))
+        finally:
+            self._rebuilding.release()
+
+    def cohort_report(self, db, education_level: str = None, group: str = None) -> dict:
+        """ The report for one cohort (an education level or a group), or None if it has no learners. """
+        import numpy as np
+        key = ("group", group) if group is not None else ("education_level", education_level)
+        self._rebuild_if_due()
+        with self._lock:
+            if self._snapshot is None:
+                self._install(self._build(db))
+            elif time.monotonic() - self._refreshed_at >= self.refresh_seconds:
+                self._refresh(db)
+            cached = self._results.get(key)
+            if cached is not None and cached[0] == self._version:
+                return cached[1]
+            snapshot = self._snapshot
+            if group is not None:
+                positions, known = snapshot.positions(crud.get_cohort_member_ids(db, group))
+                mask = np.zeros(len(snapshot.user_ids), dtype=bool)
+                mask[positions[known]] = True
+            else:
+                code = snapshot.level_codes.get(education_level)
+                mask = snapshot.levels == code if code is not None else np.zeros(len(snapshot.user_ids), dtype=bool)
+            report = self._summarize(snapshot, mask) if mask.any() else None
+            if report is not None:
+                report["cohort"] = {key[0]: key[1]}
+                report["as_of_history_id"] = snapshot.history.latest
+            self._results.set(key, (self._version, report))
+            return report
+
+    def invalidate_group(self, group: str):
+        self._results.pop(("group", group))
+
+    @staticmethod
+    def _summarize(snapshot: LearnerSnapshot, mask) -> dict:
+        import numpy as np
+        values = snapshot.values[mask]
+        answered, correct = values[:, ANSWERED], values[:, CORRECT]
+        active = np.nan_to_num(answered) > 0
+        total_answered, total_correct = np.nansum(answered), np.nansum(correct)
+        level_answers, level_correct = snapshot.answers[mask].sum(axis=0), snapshot.correct[mask].sum(axis=0)
+        difficulties = values[:, DIFFICULTY]
+        difficulties = difficulties[~np.isnan(difficulties)].astype(np.int64)
+        level_counts = np.bincount(difficulties) if difficulties.size else np.zeros(0, dtype=np.int64)
+        return {
+            "learners": int(mask.sum()),
+            "active_learners": int(active.sum()),
+            "ability": {**(_distribution(values[:, ABILITY]) or {}), "histogram": _histogram(values[:, ABILITY])},
+            "mastery": {
+                **(_distribution(values[:, MASTERY]) or {}),
+                "histogram": _histogram(values[:, MASTERY]),
+                "not_yet_estimated": int(np.isnan(values[:, MASTERY]).sum()),
+            },
+            "questions_answered": {"total": int(total_answered), **(_distribution(answered) or {})},
+            "accuracy": {
+                "overall": _round(total_correct / total_answered) if total_answered else None,
+                "per_learner": _distribution(correct[active] / answered[active]),
+            },
+            "current_difficulty": {str(level): int(count) for level, count in enumerate(level_counts) if count},
+            "fingerprint": {
+                key: {**(_distribution(values[:, column]) or {}), "histogram": _histogram(values[:, column])}
+                for key, column in FINGERPRINT.items()
+            },
+            "accuracy_by_difficulty": [
+                {"difficulty": level + 1, "answers": int(answers), "correct": int(right), "accuracy": _round(right / answers)}
+                for level, (answers, right) in enumerate(zip(level_answers, level_correct)) if answers
+            ],
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            snapshot = self._snapshot
+            return {
+                **self._stats,
+                "learners": len(snapshot.user_ids) if snapshot else 0,
+                "history_id": snapshot.history.latest if snapshot else None,
+                "version": self._version,
+                "report_cache": self._results.stats(),
+            }
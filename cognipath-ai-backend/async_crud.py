@@ -0,0 +1,146 @@
+"""
+Async versions of the crud operations used by the learning flow. They run on the AsyncSession from
+database.AsyncSessionLocal, so a slow query yields the event loop instead of blocking it.
+Relationships are loaded eagerly because async sessions cannot lazy-load.
+"""
+from sqlalchemy import select, update, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+import crud, models, schemas, auth, metrics
+import asyncio
+import json
+import time
+
+# --- User Ops ---
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(
+        select(models.User)
+        .options(joinedload(models.User.progress), joinedload(models.User.fingerprint))
+        .filter(models.User.email == email)
+    )
+    return result.scalars().first()
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate, hashed_password: str):
+    # The password is hashed by the caller (auth.password_hasher) so bcrypt stays off the event loop.
+    db_user = models.User(
+        name=user.name, email=user.email, hashed_password=hashed_password, education_level=user.education_level,
+        progress=models.UserProgress(), fingerprint=models.CognitiveFingerprint(),
+    )
+    db.add(db_user)
+    await db.commit()
+    return await get_user_by_email(db, email=user.email)
+
+async def update_user(db: AsyncSession, user_email: str, updates: schemas.UserUpdate):
+    db_user = await get_user_by_email(db, email=user_email)
+    if not db_user: return None
+    if updates.name: db_user.name = updates.name
+    if updates.password: db_user.hashed_password = await auth.password_hasher.hash(updates.password)
+    await db.commit()
+    auth.invalidate_user_tokens(user_id=db_user.id, email=db_user.email)
+    return db_user
+
+async def update_password_hash(db: AsyncSession, user: models.User, hashed_password: str):
+    user.hashed_password = hashed_password
+    await db.commit()
+
+# --- Progress & History Ops ---
+async def get_user_progress(db: AsyncSession, user_id: int):
+    result = await db.execute(select(models.UserProgress).filter(models.UserProgress.user_id == user_id))
+    return result.scalars().first()
+
+async def open_session(db: AsyncSession, user_id: int, initial_mastery: float = None, item_sampler: dict = None) -> int:
+    """ Async crud.open_session: one insert and one update instead of deleting the learner's history. """
+    learning_session = models.LearningSession(user_id=user_id, started_at=time.time())
+    db.add(learning_session)
+    await db.flush()
+    await db.execute(update(models.UserProgress).filter(models.UserProgress.user_id == user_id).values(
+        session_id=learning_session.id, mastery=initial_mastery, item_sampler=item_sampler))
+    await db.commit()
+    return learning_session.id
+
+# --- Submission Service ---
+async def backfill_missing_mastery(db: AsyncSession, user_id: int, progress, bkt_model):
+    """ Async crud.backfill_missing_mastery: replays the session's complete history when no mastery is stored. """
+    if bkt_model is not None and progress is not None and progress.mastery is None:
+        progress.mastery = bkt_model.get_mastery_probability((await db.execute(crud.session_answers_query(user_id, progress.session_id))).all())
+
+async def record_submission(db: AsyncSession, email: str, was_correct: bool, difficulty: int, time_taken: float, adaptive_engine, diagnostic_agent, user_id: int = None, item_id: str = None, select_question=None):
+    """ Async crud.record_submission: two reads and one commit per answer. """
+    with metrics.span("db_read"):
+        row = (await db.execute(crud.submission_state_query(email=email, user_id=user_id))).first()
+        if row is None: return None
+        user_id, progress, fp = row
+        history = (await db.execute(crud.submission_history_query(user_id, progress))).all()
+        await backfill_missing_mastery(db, user_id, progress, adaptive_engine.bkt_model)
+    history_entry, result = crud.apply_submission(user_id, progress, fp, history, was_correct, difficulty, time_taken, adaptive_engine, diagnostic_agent, item_id)
+    # Picking the question can read the CSV bank (first use, reloads) and rank items, so it runs on a worker thread.
+    await asyncio.to_thread(crud.select_next_question, progress, result, select_question)
+    with metrics.span("db_write"):
+        db.add(history_entry)
+        await db.commit()
+    return result
+
+async def record_submissions(db: AsyncSession, email: str, answers: list, adaptive_engine, diagnostic_agent, user_id: int = None, select_question=None):
+    """ Async crud.record_submissions: two reads, one bulk insert and one commit for the whole batch. """
+    with metrics.span("db_read"):
+        row = (await db.execute(crud.submission_state_query(email=email, user_id=user_id))).first()
+        if row is None: return None
+        user_id, progress, fp = row
+        history = (await db.execute(crud.submission_history_query(user_id, progress))).all()
+        await backfill_missing_mastery(db, user_id, progress, adaptive_engine.bkt_model)
+    entries, result = crud.apply_submissions(user_id, progress, fp, history, answers, adaptive_engine, diagnostic_agent)
+    await asyncio.to_thread(crud.select_next_question, progress, result, select_question)
+    with metrics.span("db_write"):
+        await db.execute(insert(models.UserHistory), crud.history_rows(entries))
+        await db.commit()
+    return result
+
+# --- Quiz Session (WebSocket) Ops ---
+async def load_submission_state(db: AsyncSession, email: str, user_id: int = None, adaptive_engine=None):
+    """
+    (user_id, progress, fingerprint, history rows) for a quiz session to keep in memory, or None if the user does not exist.
+    With adaptive_engine, a missing stored mastery is backfilled from the session's complete history.
+    """
+    with metrics.span("db_read"):
+        row = (await db.execute(crud.submission_state_query(email=email, user_id=user_id))).first()
+        if row is None: return None
+        user_id, progress, fp = row
+        history = (await db.execute(crud.submission_history_query(user_id, progress))).all()
+        await backfill_missing_mastery(db, user_id, progress, adaptive_engine.bkt_model if adaptive_engine else None)
+    return user_id, progress, fp, history
+
+async def save_answer(db: AsyncSession, history_entry: models.UserHistory, progress: models.UserProgress, fp: models.CognitiveFingerprint):
+    """
+    Writes one answer of a quiz session without reading anything back: the history row plus the progress and
+    fingerprint values the session holds in memory, in one commit.
+    """
+    await db.execute(insert(models.UserHistory), crud.history_rows([history_entry]))
+    if progress is not None:
+        await db.execute(update(models.UserProgress).filter(models.UserProgress.id == progress.id).values(
+            current_difficulty=progress.current_difficulty, ability=progress.ability, mastery=progress.mastery,
+            questions_answered=progress.questions_answered, correct_answers=progress.correct_answers,
+            item_sampler=progress.item_sampler,
+        ))
+    if fp is not None:
+        await db.execute(update(models.CognitiveFingerprint).filter(models.CognitiveFingerprint.id == fp.id).values(
+            concentration=fp.concentration, comprehension=fp.comprehension, retention=fp.retention, application=fp.application,
+        ))
+    await db.commit()
+
+# --- Report Ops ---
+async def get_shareable_report(db: AsyncSession, report_id: str):
+    """
+    (etag, gzip-compressed body) of a shareable report, or None. Reports stored before bodies were precomputed
+    get theirs built and saved on their first view.
+    """
+    report = (await db.execute(select(models.ShareableReport).filter(models.ShareableReport.id == report_id))).scalar_one_or_none()
+    if report is None:
+        return None
+    if report.body is not None:
+        return report.etag, report.body
+    user_name = (await db.execute(select(models.User.name).filter(models.User.id == report.user_id))).scalar()
+    data = json.loads(report.report_data) if isinstance(report.report_data, str) else report.report_data
+    etag, body = crud.shareable_report_body(report.id, user_name, data)
+    report.etag, report.body = etag, body
+    await db.commit()
+    return etag, body
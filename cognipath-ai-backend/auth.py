@@ -4,21 +4,94 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import threading
 import schemas
+from cache import LRUCache
 
 SECRET_KEY = "a_very_secret_key_for_jwt_final_project_cognipath"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Raising BCRYPT_ROUNDS later makes older hashes "need update"; they are rehashed on the user's next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS, bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# Accounts allowed to use operator/admin routes (comma-separated emails). Empty means nobody is.
+ADMIN_EMAILS = frozenset(email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip())
+
+# Decoded token -> TokenData, so authenticated requests skip JWT verification while the entry is fresh.
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "60"))
+token_cache = LRUCache(maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "10000")), ttl=TOKEN_CACHE_TTL_SECONDS)
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, size-limited thread pool so hashing never blocks the event loop.
+    At most max_pending operations may be queued or running; beyond that callers get a 503 instead
+    of piling up behind a login spike.
+    """
+    def __init__(self, workers: int = 2, max_pending: int = 64):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._stats = {"completed": 0, "rejected": 0, "rehashed": 0, "max_queue_depth": 0}
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._queued + self._running >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many sign-ins in progress, please retry", headers={"Retry-After": "1"})
+            self._queued += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queued)
+
+        def job():
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._stats["completed"] += 1
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, job)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str):
+        """ Returns (is_valid, new_hash). new_hash is set when the stored hash uses outdated cost parameters. """
+        valid, new_hash = await self._run(pwd_context.verify_and_update, plain_password, hashed_password)
+        if new_hash:
+            with self._lock:
+                self._stats["rehashed"] += 1
+        return valid, new_hash
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workers": self.workers, "max_pending": self.max_pending, "queue_depth": self._queued, "running": self._running, **self._stats}
+
+password_hasher = PasswordHasher(
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", "2")),
+    max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64")),
+)
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -30,11 +103,23 @@ def verify_token(token: str, credentials_exception):
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None: raise credentials_exception
-        return schemas.TokenData(email=email)
+        token_data = schemas.TokenData(email=email, user_id=payload.get("uid"))
     except JWTError:
         raise credentials_exception
+    # Never cache a token past its own expiry.
+    ttl = min(TOKEN_CACHE_TTL_SECONDS, payload["exp"] - datetime.now(timezone.utc).timestamp()) if "exp" in payload else TOKEN_CACHE_TTL_SECONDS
+    if ttl > 0:
+        token_cache.set(token, token_data, ttl=ttl)
+    return token_data
+
+def invalidate_user_tokens(user_id: int = None, email: str = None):
+    """ Drops cached identities of a user; called whenever their account changes. """
+    token_cache.invalidate_where(lambda data: (user_id is not None and data.user_id == user_id) or (email is not None and data.email == email))
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -42,3 +127,9 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     )
     return verify_token(token, credentials_exception)
 
+
+async def get_current_admin(current_user: Annotated[schemas.TokenData, Depends(get_current_user)]):
+    """ get_current_user for operator/admin routes: the account must be listed in ADMIN_EMAILS. """
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed for this account")
+    return current_user
@@ -0,0 +1,102 @@
+"""
+Cohort analytics at scale: full snapshot build, incremental refresh and cached report latency.
+
+    python -m benchmarks.bench_cohort_analytics --learners 10000 --answers 30 --levels 8
+
+Run from the backend directory. Seeds a scratch SQLite database with --learners learners spread over --levels
+education levels, each with --answers history rows (a quarter of them already moved to the archive), then times
+CohortAnalytics: the first report (full build), a report for every level with the snapshot in memory, the
+same reports from the cache, and an incremental refresh after 1% of the learners answered one more question.
+Prints a JSON summary.
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks.harness import scratch_environment, latency_summary
+
+
+def seed(db, learners: int, answers: int, levels: int, rng: random.Random):
+    import models
+    from sqlalchemy import insert
+    db.execute(insert(models.User), [
+        {"id": i, "name": "Bench", "email": f"c{i}@example.com", "hashed_password": "-", "education_level": f"level-{i % levels}"}
+        for i in range(1, learners + 1)
+    ])
+    db.execute(insert(models.UserProgress), [
+        {"user_id": i, "ability": rng.random(), "mastery": rng.random(), "questions_answered": answers,
+         "correct_answers": rng.randint(0, answers), "current_difficulty": rng.randint(1, 4)}
+        for i in range(1, learners + 1)
+    ])
+    db.execute(insert(models.CognitiveFingerprint), [
+        {"user_id": i, "concentration": rng.random(), "comprehension": rng.random(), "retention": rng.random(), "application": rng.random()}
+        for i in range(1, learners + 1)
+    ])
+    rows = [
+        {"id": user * answers + n, "user_id": user, "correct": rng.random() < 0.6, "difficulty": rng.randint(1, 4), "ability": rng.random()}
+        for user in range(1, learners + 1) for n in range(answers)
+    ]
+    archived = len(rows) // 4
+    db.execute(insert(models.UserHistoryArchive), rows[:archived])
+    db.execute(insert(models.UserHistory), rows[archived:])
+    db.commit()
+    return len(rows)
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--learners", type=int, default=10000)
+    parser.add_argument("--answers", type=int, default=30, help="history rows per learner")
+    parser.add_argument("--levels", type=int, default=8, help="education levels (cohorts)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    scratch_environment()
+
+    import models
+    from analytics import CohortAnalytics
+    from database import SessionLocal, engine
+    from sqlalchemy import insert, func, select
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(args.seed)
+    db = SessionLocal()
+    history_rows = seed(db, args.learners, args.answers, args.levels, rng)
+    levels = [f"level-{i}" for i in range(args.levels)]
+    analytics = CohortAnalytics(refresh_seconds=3600, full_refresh_seconds=3600)
+
+    first = timed(lambda: analytics.cohort_report(db, education_level=levels[0]))
+    computed = [timed(lambda level=level: analytics.cohort_report(db, education_level=level)) for level in levels[1:]]
+    cached = [timed(lambda level=level: analytics.cohort_report(db, education_level=level)) for level in levels * 20]
+
+    # 1% of the learners answer one more question; the next report refreshes incrementally and recomputes.
+    next_id = db.scalar(select(func.max(models.UserHistory.id))) + 1
+    movers = rng.sample(range(1, args.learners + 1), max(1, args.learners // 100))
+    db.execute(insert(models.UserHistory), [
+        {"id": next_id + n, "user_id": user, "correct": True, "difficulty": 2, "ability": 0.5} for n, user in enumerate(movers)
+    ])
+    db.commit()
+    analytics.refresh_seconds = 0
+    refreshed = timed(lambda: analytics.cohort_report(db, education_level=levels[0]))
+    analytics.refresh_seconds = 3600
+    db.close()
+
+    print(json.dumps({
+        "learners": args.learners,
+        "history_rows": history_rows,
+        "cohorts": args.levels,
+        "full_build_and_report_ms": round(first * 1000, 3),
+        "report_from_snapshot": latency_summary(computed),
+        "report_cached": latency_summary(cached),
+        "incremental_refresh_and_report_ms": round(refreshed * 1000, 3),
+        "learners_reloaded": analytics.stats()["learners_reloaded"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Concurrent /submit throughput against the in-process app (httpx ASGI transport, scratch SQLite database).
+
+    python -m benchmarks.bench_concurrent_submit --users 20 --answers 10 --concurrency 1 8 32
+
+Run from the backend directory. While the submissions run, a probe keeps calling a cheap endpoint; its
+latency shows whether request handling blocks the event loop. Prints a JSON summary.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks.harness import scratch_environment, latency_summary
+
+
+async def _login(client, email: str) -> dict:
+    await client.post("/register", json={"email": email, "name": "Bench", "password": "bench", "education_level": "bench"})
+    response = await client.post("/login", data={"username": email, "password": "bench"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def _probe(client, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/reports/cache/stats")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.005)
+
+
+async def run_level(client, headers: list, answers: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+    rng = random.Random(concurrency)
+
+    async def submit(auth_headers):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/submit", headers=auth_headers, json={
+                "user_answer": rng.choice("abcd"), "correct_answer": "a",
+                "time_taken": rng.uniform(5, 60), "difficulty_level": rng.randint(1, 4),
+            })
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    for auth_headers in headers:
+        await client.get("/start", headers=auth_headers)
+    stop, probe_latencies = asyncio.Event(), []
+    probe = asyncio.create_task(_probe(client, stop, probe_latencies))
+    start = time.perf_counter()
+    await asyncio.gather(*(submit(auth_headers) for auth_headers in headers for _ in range(answers)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "submit": latency_summary(latencies),
+        "probe_while_loaded": latency_summary(probe_latencies),
+    }
+
+
+async def run(users: int, answers: int, levels: list) -> dict:
+    import httpx
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers = [await _login(client, f"user{i}@example.com") for i in range(users)]
+        results = [await run_level(client, headers, answers, concurrency) for concurrency in levels]
+    main.reporting_agent.renderer.shutdown()
+    return {"users": users, "answers_per_user": answers, "levels": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--answers", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+    scratch_environment()
+    print(json.dumps(asyncio.run(run(args.users, args.answers, args.concurrency)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Behaviour of the LLM gateway under a slow and failing model, using the local stub model.
+
+    python -m benchmarks.bench_llm_gateway --callers 32 --delay 0.2 --timeout 0.5
+
+Run from the backend directory. Three phases run against one gateway: a healthy model with some hanging
+calls (deadlines and the concurrency limit), an outage (the circuit opens and calls fail fast), and the
+recovery after reset_timeout. Prints a JSON summary with per-phase caller latencies and the gateway's histograms.
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import latency_summary
+from benchmarks.stub_llm import StubModel
+from llm_gateway import LLMGateway
+
+
+def run_phase(gateway, callers: int, calls_per_caller: int) -> dict:
+    outcomes = {}
+    latencies = []
+
+    def call(_):
+        for _ in range(calls_per_caller):
+            start = time.perf_counter()
+            try:
+                gateway.generate_content("Provide a short, one-sentence hint. Question: What is 10% of 50?")
+                outcome = "ok"
+            except Exception as e:
+                outcome = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        list(pool.map(call, range(callers)))
+    return {"outcomes": outcomes, "latency": latency_summary(latencies), "circuit_after": gateway.breaker.state}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--callers", type=int, default=32)
+    parser.add_argument("--calls", type=int, default=5, help="calls per caller and phase")
+    parser.add_argument("--delay", type=float, default=0.2)
+    parser.add_argument("--hang-rate", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--reset", type=float, default=1.0)
+    args = parser.parse_args()
+
+    model = StubModel(delay=args.delay, jitter=args.delay / 2, hang_rate=args.hang_rate, hang_seconds=args.timeout * 4, seed=1)
+    gateway = LLMGateway(model, max_concurrency=args.concurrency, timeout=args.timeout,
+                         acquire_timeout=args.timeout, failure_threshold=5, reset_timeout=args.reset)
+    results = {"healthy": run_phase(gateway, args.callers, args.calls)}
+    model.failing = True
+    results["outage"] = run_phase(gateway, args.callers, args.calls)
+    model.failing = False
+    time.sleep(args.reset)
+    results["recovered"] = run_phase(gateway, args.callers, args.calls)
+    results["model_calls"] = model.calls
+    results["gateway"] = gateway.stats()
+    gateway.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compares the scalar IRT/BKT code paths with the vectorized batch APIs on a synthetic cohort.
+
+    python -m benchmarks.bench_models --learners 5000 --max-history 60
+
+Run from the backend directory. Prints a JSON summary and fails if the results disagree.
+"""
+import argparse
+import json
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from ai_models.irt_model import IRTModel
+from ai_models.bkt_model import BKTModel
+
+
+def make_cohort(learners: int, max_history: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(0, max_history + 1, size=learners)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    correct = rng.random(offsets[-1]) < 0.6
+    difficulties = rng.integers(1, 5, size=offsets[-1])
+    abilities = rng.uniform(0.05, 0.95, size=learners)
+    # One extra response per learner for the single-step cases.
+    step_correct = rng.random(learners) < 0.6
+    step_difficulties = rng.integers(1, 5, size=learners)
+    return abilities, correct, difficulties, offsets, step_correct, step_difficulties
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(learners: int, max_history: int) -> dict:
+    irt, bkt = IRTModel(), BKTModel()
+    abilities, correct, difficulties, offsets, step_correct, step_difficulties = make_cohort(learners, max_history)
+    histories = [[SimpleNamespace(correct=bool(c)) for c in correct[offsets[i]:offsets[i + 1]]] for i in range(learners)]
+
+    def replay_abilities_scalar():
+        results = []
+        for i in range(learners):
+            ability = 0.5
+            for j in range(offsets[i], offsets[i + 1]):
+                ability = irt.update_ability(ability, bool(correct[j]), int(difficulties[j]))
+            results.append(ability)
+        return np.array(results)
+
+    cases = {
+        "irt.update_ability": (
+            lambda: np.array([irt.update_ability(float(a), bool(c), int(d)) for a, c, d in zip(abilities, step_correct, step_difficulties)]),
+            lambda: irt.update_ability_batch(abilities, step_correct, step_difficulties),
+        ),
+        "irt.get_next_item_difficulty": (
+            lambda: np.array([irt.get_next_item_difficulty(float(a)) for a in abilities]),
+            lambda: irt.get_next_item_difficulty_batch(abilities),
+        ),
+        "irt.replay_abilities": (
+            replay_abilities_scalar,
+            lambda: irt.replay_abilities_batch(correct, difficulties, offsets),
+        ),
+        "bkt.get_mastery_probability": (
+            lambda: np.array([bkt.get_mastery_probability(history) for history in histories]),
+            lambda: bkt.get_mastery_probability_batch(correct, offsets),
+        ),
+    }
+
+    results = {"learners": learners, "responses": int(offsets[-1]), "max_history": max_history, "cases": {}}
+    for name, (scalar_fn, batch_fn) in cases.items():
+        scalar, scalar_seconds = timed(scalar_fn)
+        batch, batch_seconds = timed(batch_fn)
+        results["cases"][name] = {
+            "scalar_seconds": round(scalar_seconds, 6),
+            "batch_seconds": round(batch_seconds, 6),
+            "speedup": round(scalar_seconds / batch_seconds, 1) if batch_seconds else None,
+            "max_abs_diff": float(np.max(np.abs(scalar - batch), initial=0.0)),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--learners", type=int, default=5000)
+    parser.add_argument("--max-history", type=int, default=60)
+    args = parser.parse_args()
+    results = run(args.learners, args.max_history)
+    print(json.dumps(results, indent=2))
+    mismatched = [name for name, case in results["cases"].items() if case["max_abs_diff"] > 1e-12]
+    if mismatched:
+        raise SystemExit(f"Batch results differ from the scalar code for: {', '.join(mismatched)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Cold-start cost of the backend: import time, app start-up (lifespan) and the latency of the first requests.
+
+    python -m benchmarks.bench_startup --runs 5
+
+Run from the backend directory. Every run is a fresh Python process with a scratch database, so nothing is
+warm except the OS file cache. Each child reports how long `import main` took, which heavy libraries that
+import pulled in, how long the lifespan start-up took, and the latency of the first /register, /login, /start
+and /submit. The parent also times the whole process. Prints a JSON summary (median and max per metric).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("numpy", "pandas", "matplotlib", "seaborn", "google.generativeai")
+
+
+def child():
+    from benchmarks.harness import scratch_environment
+    scratch_environment()
+    timings = {}
+    start = time.perf_counter()
+    import main
+    timings["import_main_ms"] = (time.perf_counter() - start) * 1000
+    loaded = [module for module in HEAVY_MODULES if module in sys.modules]
+
+    from fastapi.testclient import TestClient
+    start = time.perf_counter()
+    with TestClient(main.app) as client:
+        timings["lifespan_startup_ms"] = (time.perf_counter() - start) * 1000
+
+        def timed(name, method, url, **kwargs):
+            request_start = time.perf_counter()
+            response = client.request(method, url, **kwargs)
+            timings[name] = (time.perf_counter() - request_start) * 1000
+            response.raise_for_status()
+            return response.json()
+
+        timed("first_register_ms", "POST", "/register", json={"email": "startup@example.com", "name": "Startup", "password": "startup", "education_level": "bench"})
+        token = timed("first_login_ms", "POST", "/login", data={"username": "startup@example.com", "password": "startup"})["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        question = timed("first_start_ms", "GET", "/start", headers=headers)["first_question"]
+        timed("first_submit_ms", "POST", "/submit", headers=headers, json={
+            "user_answer": "a", "correct_answer": question["correct_answer"], "time_taken": 10, "difficulty_level": question["difficulty_level"],
+        })
+        timings["import_to_first_start_ms"] = (time.perf_counter() - start) * 1000 + timings["import_main_ms"]
+    print(json.dumps({"timings": timings, "heavy_modules_after_import": loaded}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    # Cheap password hashing keeps /register and /login about start-up rather than bcrypt cost.
+    env = dict(os.environ, BCRYPT_ROUNDS=os.environ.get("BCRYPT_ROUNDS", "4"), PYTHONDONTWRITEBYTECODE="1")
+    env.pop("GEMINI_API_KEY", None)
+    runs = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child"], env=env,
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result["timings"]["process_total_ms"] = (time.perf_counter() - start) * 1000
+        runs.append(result)
+
+    summary = {}
+    for metric in runs[0]["timings"]:
+        values = [run["timings"][metric] for run in runs]
+        summary[metric] = {"median": round(statistics.median(values), 1), "max": round(max(values), 1)}
+    print(json.dumps({"runs": args.runs, "timings_ms": summary, "heavy_modules_after_import": runs[0]["heavy_modules_after_import"]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
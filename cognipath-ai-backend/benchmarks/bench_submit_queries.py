@@ -0,0 +1,94 @@
+"""
+Counts SQL statements and commits per answer for the old multi-call /submit sequence and for
+crud.record_submission, against a throwaway SQLite database.
+
+    python -m benchmarks.bench_submit_queries --submissions 200
+
+Run from the backend directory. Prints a JSON summary.
+"""
+import argparse
+import json
+import random
+import time
+
+from sqlalchemy import event
+
+from benchmarks.harness import scratch_environment
+
+# The database module reads DATABASE_URL at import time, so switch to a scratch database first.
+scratch_environment()
+
+import crud, models, schemas
+from agents import AdaptiveEngine, DiagnosticAgent
+from database import SessionLocal, engine
+
+
+class StatementCounter:
+    def __init__(self, bind):
+        self.statements = 0
+        self.commits = 0
+        event.listen(bind, "before_cursor_execute", self._on_execute)
+        event.listen(bind, "commit", self._on_commit)
+
+    def _on_execute(self, *args):
+        self.statements += 1
+
+    def _on_commit(self, *args):
+        self.commits += 1
+
+    def reset(self):
+        self.statements = self.commits = 0
+
+
+def legacy_submit(db, email, was_correct, difficulty, time_taken, adaptive_engine, diagnostic_agent):
+    """ The /submit sequence before the consolidated service: one call (and usually one commit) per step. """
+    user = crud.get_user_by_email(db, email=email)
+    user_progress = crud.get_user_progress(db, user_id=user.id)
+    new_ability = adaptive_engine.irt_model.update_ability(user_progress.ability, was_correct, difficulty)
+    db.add(models.UserHistory(user_id=user.id, correct=was_correct, difficulty=difficulty, ability=new_ability))
+    db.commit()
+    history = crud.get_user_history(db, user_id=user.id)
+    next_difficulty = adaptive_engine.get_next_difficulty(adaptive_engine.bkt_model.get_mastery_probability(history), new_ability)
+    crud.update_user_progress(db, user_id=user.id, new_difficulty=next_difficulty, new_ability=new_ability, was_correct=was_correct)
+    adjustments = diagnostic_agent.analyze_submission(was_correct=was_correct, time_taken=time_taken)
+    crud.update_cognitive_fingerprint(db, user_id=user.id, adjustments=adjustments)
+
+
+def consolidated_submit(db, email, was_correct, difficulty, time_taken, adaptive_engine, diagnostic_agent):
+    crud.record_submission(db, email=email, was_correct=was_correct, difficulty=difficulty, time_taken=time_taken,
+                           adaptive_engine=adaptive_engine, diagnostic_agent=diagnostic_agent)
+
+
+def run(submissions: int) -> dict:
+    models.Base.metadata.create_all(bind=engine)
+    adaptive_engine, diagnostic_agent = AdaptiveEngine(), DiagnosticAgent()
+    counter = StatementCounter(engine)
+    results = {"submissions": submissions, "database": "sqlite", "variants": {}}
+    for name, submit in (("legacy", legacy_submit), ("consolidated", consolidated_submit)):
+        db = SessionLocal()
+        email = f"{name}@example.com"
+        crud.create_user(db, schemas.UserCreate(email=email, name=name, password="bench", education_level="bench"))
+        rng = random.Random(0)
+        counter.reset()
+        start = time.perf_counter()
+        for _ in range(submissions):
+            submit(db, email, rng.random() < 0.6, rng.randint(1, 4), rng.uniform(5, 60), adaptive_engine, diagnostic_agent)
+        elapsed = time.perf_counter() - start
+        db.close()
+        results["variants"][name] = {
+            "statements_per_submission": round(counter.statements / submissions, 2),
+            "commits_per_submission": round(counter.commits / submissions, 2),
+            "mean_ms": round(elapsed / submissions * 1000, 3),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(run(args.submissions), indent=2))
+
+
+if __name__ == "__main__":
+    main()
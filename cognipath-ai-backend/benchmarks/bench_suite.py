@@ -0,0 +1,247 @@
+"""
+Reproducible benchmark suite: endpoint load test plus micro-benchmarks, in one JSON document.
+
+    python -m benchmarks.bench_suite --users 20 --answers 10 --concurrency 1 8 32 --output results.json
+
+Run from the backend directory. The app runs in-process (httpx ASGI transport, with its lifespan) against a
+scratch SQLite database, or against the empty throwaway database given by --database-url. Gemini is replaced
+by the local stub model (benchmarks/stub_llm.py) with a fixed seed and --llm-delay, so runs need no network
+and are comparable between releases.
+
+For every concurrency level, fresh learners go through /register, /login, /start, --answers /submit calls,
+/reports/data (then again with its ETag, for the 304), /hint and the shareable report routes; each route gets a throughput, error count and latency percentiles.
+The micro-benchmarks then time IRTModel, BKTModel, QuestionDatabase sampling and
+ReportingAgent.generate_report (report data and PNG renders) on their own. Metadata (git commit, Python, settings) is included so results
+can be compared over time.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+from benchmarks.harness import BACKEND_DIR, scratch_environment, latency_summary, micro_benchmark
+
+HINT_QUESTIONS = [f"What is {pct}% of {base}?" for pct, base in ((10, 50), (25, 80), (50, 120), (75, 400), (5, 60))]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class RouteStats:
+    """ Latencies and status codes of one route, across all requests of a concurrency level. """
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.started = None
+        self.finished = None
+
+    async def call(self, request):
+        start = time.perf_counter()
+        self.started = start if self.started is None else min(self.started, start)
+        response = await request
+        end = time.perf_counter()
+        self.finished = end if self.finished is None else max(self.finished, end)
+        self.latencies.append(end - start)
+        if response.status_code >= 400:
+            self.errors += 1
+        return response
+
+    def summary(self) -> dict:
+        elapsed = (self.finished - self.started) if self.latencies else 0
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "throughput_rps": round(len(self.latencies) / elapsed, 1) if elapsed else None,
+            "latency": latency_summary(self.latencies),
+        }
+
+
+async def run_level(client, concurrency: int, users: int, answers: int, seed: int) -> dict:
+    """ One full learner journey per user, with at most `concurrency` requests in flight. """
+    semaphore = asyncio.Semaphore(concurrency)
+    rng = random.Random(seed * 1000 + concurrency)
+    routes = {name: RouteStats() for name in ("register", "login", "start", "submit", "report_data", "report_data_304", "hint", "share_create", "share_get")}
+
+    async def limited(name: str, request):
+        async with semaphore:
+            return await routes[name].call(request)
+
+    async def journey(index: int):
+        email = f"c{concurrency}-u{index}@example.com"
+        await limited("register", client.post("/register", json={"email": email, "name": "Bench", "password": "bench", "education_level": "bench"}))
+        token = (await limited("login", client.post("/login", data={"username": email, "password": "bench"}))).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        question = (await limited("start", client.get("/start", headers=headers))).json()["first_question"]
+        for _ in range(answers):
+            correct = rng.random() < 0.6
+            response = await limited("submit", client.post("/submit", headers=headers, json={
+                "user_answer": question["correct_answer"] if correct else "z", "correct_answer": question["correct_answer"],
+                "time_taken": rng.uniform(5, 60), "difficulty_level": question["difficulty_level"], "question_id": question.get("id"),
+            }))
+            question = response.json()["next_question"]
+        etag = (await limited("report_data", client.get("/reports/data", headers=headers))).headers.get("etag", "")
+        await limited("report_data_304", client.get("/reports/data", headers={**headers, "If-None-Match": etag}))
+        await limited("hint", client.post("/hint", headers=headers, json={"question_text": rng.choice(HINT_QUESTIONS)}))
+        share = await limited("share_create", client.post("/reports/share", headers=headers))
+        if share.status_code == 200:
+            report_id = share.json()["report_url"].rsplit("/", 1)[-1]
+            await limited("share_get", client.get(f"/reports/share/{report_id}"))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(journey(i) for i in range(users)))
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": round(time.perf_counter() - start, 3),
+        "routes": {name: stats.summary() for name, stats in routes.items()},
+    }
+
+
+def micro_models(seed: int) -> dict:
+    from ai_models.irt_model import IRTModel
+    from ai_models.bkt_model import BKTModel
+    rng = random.Random(seed)
+    irt, bkt = IRTModel(), BKTModel()
+    answers = [(rng.random() < 0.6, rng.randint(1, 4), rng.random()) for _ in range(1024)]
+    history = [SimpleNamespace(correct=correct) for correct, _, _ in answers[:50]]
+    cursor = iter(range(10 ** 9))
+
+    def next_answer():
+        return answers[next(cursor) & 1023]
+
+    def irt_update():
+        correct, difficulty, ability = next_answer()
+        irt.update_ability(ability, correct, difficulty)
+
+    def irt_next_level():
+        irt.get_next_item_difficulty(next_answer()[2])
+
+    def bkt_update():
+        correct, _, ability = next_answer()
+        bkt.update(ability, correct)
+
+    return {
+        "irt_update_ability": micro_benchmark(irt_update, number=10000),
+        "irt_next_item_difficulty": micro_benchmark(irt_next_level, number=10000),
+        "bkt_update": micro_benchmark(bkt_update, number=10000),
+        "bkt_mastery_from_50_answers": micro_benchmark(lambda: bkt.get_mastery_probability(history), number=1000),
+    }
+
+
+def micro_question_sampling(curriculum_agent) -> dict:
+    from item_selection import ItemSelector
+    database = curriculum_agent.fallback_db
+    database.bank.load()
+    levels = iter(range(10 ** 9))
+    state = ItemSelector.new_state(seed=0)
+
+    def random_question():
+        database.get_valid_question_by_difficulty(next(levels) % 4 + 1)
+
+    def session_question():
+        database.get_valid_question_by_difficulty(next(levels) % 4 + 1, selector=curriculum_agent.item_selector, ability=0.5, sampler_state=state)
+
+    return {
+        "random_question": micro_benchmark(random_question, number=5000),
+        "session_question_no_repeats": micro_benchmark(session_question, number=5000),
+    }
+
+
+def micro_reports(reporting_agent, renders: int, seed: int) -> dict:
+    """ The per-answer report data handle, then PNG queue admission, end-to-end render latency for new inputs and a cached PNG. """
+    rng = random.Random(seed)
+    queue_latencies, render_latencies = [], []
+    fingerprint = {"concentration": 0.7, "comprehension": 0.8, "retention": 0.6, "application": 0.75}
+    abilities = [round(rng.uniform(0.05, 0.95), 4) for _ in range(30)]
+    data = micro_benchmark(lambda: reporting_agent.generate_report(user_id=0, abilities=abilities, fingerprint_data=fingerprint, render_png=False), number=2000)
+    while reporting_agent.renderer.stats()["pending_jobs"]:  # Renders queued by the load test would skew admission times.
+        time.sleep(0.05)
+    for _ in range(renders):
+        abilities = [round(rng.uniform(0.05, 0.95), 4) for _ in range(30)]
+        start = time.perf_counter()
+        report = reporting_agent.generate_report(user_id=0, abilities=abilities, fingerprint_data=fingerprint, render_png=True)
+        queue_latencies.append(time.perf_counter() - start)
+        future = reporting_agent.renderer.job_future(report.get("job_id")) if report.get("job_id") else None
+        if future is not None:
+            future.result()
+        render_latencies.append(time.perf_counter() - start)
+    cached = micro_benchmark(lambda: reporting_agent.generate_report(user_id=0, abilities=abilities, fingerprint_data=fingerprint, render_png=True), number=200)
+    return {"data": data, "queue": latency_summary(queue_latencies), "render_end_to_end": latency_summary(render_latencies), "cached": cached}
+
+
+async def run(args) -> dict:
+    import httpx
+    import agents
+    import main
+    from benchmarks.stub_llm import StubModel
+    from item_selection import ItemSelector
+
+    random.seed(args.seed)
+    # Routes and the lifespan look the agent up at call time, so swapping it in before start-up is enough.
+    main.curriculum_agent = agents.CurriculumAgent(
+        model=StubModel(delay=args.llm_delay, jitter=args.llm_delay / 4, seed=args.seed),
+        item_selector=ItemSelector(main.adaptive_engine.irt_model),
+    )
+    results = {"endpoints": [], "micro": {}}
+    async with main.app.router.lifespan_context(main.app):
+        # Server errors come back as 500 responses and count as errors instead of aborting the run.
+        transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for concurrency in args.concurrency:
+                results["endpoints"].append(await run_level(client, concurrency, args.users, args.answers, args.seed))
+        results["micro"]["models"] = micro_models(args.seed)
+        results["micro"]["question_database"] = micro_question_sampling(main.curriculum_agent)
+        results["micro"]["reporting_agent"] = await asyncio.to_thread(micro_reports, main.reporting_agent, args.renders, args.seed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="learners per concurrency level")
+    parser.add_argument("--answers", type=int, default=10, help="/submit calls per learner")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--llm-delay", type=float, default=0.05, help="stub model latency in seconds")
+    parser.add_argument("--renders", type=int, default=10, help="uncached reports rendered by the micro-benchmark")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="cheap hashing keeps /register and /login about the app, not bcrypt")
+    parser.add_argument("--database-url", default=None, help="an empty throwaway database to use instead of scratch SQLite")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="also write the JSON here")
+    args = parser.parse_args()
+
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    os.environ.pop("GEMINI_API_KEY", None)
+    output = os.path.abspath(args.output) if args.output else None
+    scratch_environment(args.database_url)
+
+    started = time.time()
+    results = asyncio.run(run(args))
+    document = {
+        "meta": {
+            "started_at": started,
+            "duration_s": round(time.time() - started, 3),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "database": "sqlite (scratch)" if not args.database_url else args.database_url.split("://", 1)[0],
+            "settings": {key: value for key, value in vars(args).items() if key not in ("output", "database_url")},
+        },
+        **results,
+    }
+    text = json.dumps(document, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
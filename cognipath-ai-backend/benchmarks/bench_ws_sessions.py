@@ -0,0 +1,151 @@
+"""
+Load test for WebSocket quiz sessions (/ws/quiz) against the HTTP /submit flow.
+
+    python -m benchmarks.bench_ws_sessions --sessions 50 --answers 10
+
+Run from the backend directory. Starts the app under uvicorn on a local port (scratch SQLite database), opens
+--sessions concurrent simulated learners, and has each answer --answers questions, first over HTTP (/start and
+one /submit per answer) and then over one WebSocket per learner. Reports per-answer latency (answer sent until
+the next question arrives), throughput, and the SQL statements executed per answer, split into reads and writes.
+Prints a JSON summary.
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+
+from benchmarks.harness import scratch_environment, latency_summary
+
+
+class StatementCounter:
+    """ Counts SQL statements on an engine, split into reads (SELECT) and everything else. """
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.reads = 0
+        self.writes = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.reads += 1
+        else:
+            self.writes += 1
+
+    def snapshot(self) -> tuple:
+        return self.reads, self.writes
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _answer_for(question: dict, rng: random.Random) -> dict:
+    correct = rng.random() < 0.6
+    return {
+        "user_answer": question["correct_answer"] if correct else "z",
+        "correct_answer": question["correct_answer"],
+        "time_taken": rng.uniform(5, 60),
+        "difficulty_level": question["difficulty_level"],
+    }
+
+
+async def http_session(client, token: str, answers: int, latencies: list, rng: random.Random):
+    headers = {"Authorization": f"Bearer {token}"}
+    question = (await client.get("/start", headers=headers)).json()["first_question"]
+    for _ in range(answers):
+        start = time.perf_counter()
+        response = await client.post("/submit", headers=headers, json=_answer_for(question, rng))
+        latencies.append(time.perf_counter() - start)
+        question = response.json()["next_question"]
+
+
+async def ws_session(url: str, token: str, answers: int, latencies: list, rng: random.Random):
+    import websockets
+    async with websockets.connect(url) as ws:
+        await ws.send(json.dumps({"type": "auth", "token": token}))
+        await ws.recv()  # ready
+        await ws.send(json.dumps({"type": "start"}))
+        question = json.loads(await ws.recv())["question"]
+        for _ in range(answers):
+            start = time.perf_counter()
+            await ws.send(json.dumps({"type": "answer", **_answer_for(question, rng)}))
+            while True:
+                message = json.loads(await ws.recv())
+                if message["type"] == "result":  # "report" pushes can arrive in between
+                    break
+            latencies.append(time.perf_counter() - start)
+            question = message["next_question"]
+
+
+async def run_flow(name: str, sessions, counter: StatementCounter, total_answers: int) -> dict:
+    latencies = []
+    reads_before, writes_before = counter.snapshot()
+    start = time.perf_counter()
+    await asyncio.gather(*(session(latencies) for session in sessions))
+    elapsed = time.perf_counter() - start
+    reads, writes = counter.snapshot()
+    return {
+        "flow": name,
+        "answers": len(latencies),
+        "throughput_answers_per_s": round(len(latencies) / elapsed, 1),
+        "answer_latency": latency_summary(latencies),
+        # Includes the per-session /start (or "start" message) and the one-off state load of each WebSocket session.
+        "sql_reads_per_answer": round((reads - reads_before) / total_answers, 2),
+        "sql_writes_per_answer": round((writes - writes_before) / total_answers, 2),
+    }
+
+
+async def run(port: int, sessions: int, answers: int) -> dict:
+    import httpx
+    import main
+
+    counter = StatementCounter(main.async_engine.sync_engine)
+    base_url = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        tokens = []
+        for i in range(sessions):
+            email = f"ws{i}@example.com"
+            await client.post("/register", json={"email": email, "name": "Bench", "password": "bench", "education_level": "bench"})
+            tokens.append((await client.post("/login", data={"username": email, "password": "bench"})).json()["access_token"])
+        total = sessions * answers
+        http = await run_flow("http", [
+            (lambda latencies, token=token, i=i: http_session(client, token, answers, latencies, random.Random(i)))
+            for i, token in enumerate(tokens)
+        ], counter, total)
+    ws = await run_flow("websocket", [
+        (lambda latencies, token=token, i=i: ws_session(f"ws://127.0.0.1:{port}/ws/quiz", token, answers, latencies, random.Random(i)))
+        for i, token in enumerate(tokens)
+    ], counter, total)
+    return {"sessions": sessions, "answers_per_session": answers, "results": [http, ws]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--answers", type=int, default=10)
+    args = parser.parse_args()
+    scratch_environment()
+
+    import uvicorn
+    import main as app_module
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    try:
+        result = asyncio.run(run(port, args.sessions, args.answers))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Shared helpers for the benchmark scripts.
+
+The app uses paths relative to the working directory (data/, static/) and reads DATABASE_URL at import
+time, so benchmarks call scratch_environment() before importing any backend module. It points the app at
+a throwaway SQLite database and working directory, leaving cognipath.db and static/reports untouched.
+"""
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def scratch_environment(database_url: str = None) -> str:
+    """
+    Creates a scratch working directory with its own database and static/ folder and switches to it.
+    database_url points the app at another (empty, throwaway) database instead, e.g. a Postgres one.
+    """
+    scratch_dir = tempfile.mkdtemp(prefix="cognipath-bench-")
+    os.symlink(os.path.join(BACKEND_DIR, "data"), os.path.join(scratch_dir, "data"))
+    os.makedirs(os.path.join(scratch_dir, "static", "reports"))
+    os.environ["DATABASE_URL"] = database_url or f"sqlite:///{os.path.join(scratch_dir, 'bench.db')}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    os.chdir(scratch_dir)
+    return scratch_dir
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def latency_summary(seconds: list) -> dict:
+    """ Count and p50/p95/p99/max latency in milliseconds. """
+    values = sorted(seconds)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def micro_benchmark(fn, number: int = 1000, repeat: int = 5) -> dict:
+    """ Times `repeat` batches of `number` calls of fn(); per-call cost of the best and the median batch. """
+    batches = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        batches.append((time.perf_counter() - start) / number)
+    batches.sort()
+    return {
+        "calls": number * repeat,
+        "best_us": round(batches[0] * 1e6, 3),
+        "median_us": round(batches[len(batches) // 2] * 1e6, 3),
+        "ops_per_s": round(1 / batches[len(batches) // 2]) if batches[len(batches) // 2] else None,
+    }
@@ -0,0 +1,53 @@
+"""
+A local stand-in for the Gemini model, for benchmarks and manual testing without network access.
+
+    agents.CurriculumAgent(model=StubModel(delay=0.2, error_rate=0.1))
+
+It answers question prompts with a valid question JSON and anything else with a one-line hint, after an
+injected delay. Errors and hangs can be injected at a fixed rate or switched on and off while it runs.
+"""
+import json
+import random
+import re
+import threading
+import time
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubModel:
+    def __init__(self, delay: float = 0.05, jitter: float = 0.0, error_rate: float = 0.0, hang_rate: float = 0.0,
+                 hang_seconds: float = 60.0, seed: int = None):
+        self.delay = delay
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.failing = False  # Set to make every call fail, e.g. to trip the circuit breaker.
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str, **kwargs) -> StubResponse:
+        with self._lock:
+            self.calls += 1
+            roll = self._rng.random()
+            delay = max(0.0, self.delay + self._rng.uniform(-self.jitter, self.jitter))
+            question_id = self._rng.randint(1000, 9999)
+        if roll < self.hang_rate:
+            time.sleep(self.hang_seconds)
+        time.sleep(delay)
+        if self.failing or roll < self.hang_rate + self.error_rate:
+            raise RuntimeError("stub model: injected error")
+        match = re.search(r'"difficulty_level": (\d+)', prompt)
+        if match is None:
+            return StubResponse("Think about what one percent of the number is first.")
+        level = int(match.group(1))
+        return StubResponse(json.dumps({
+            "id": f"generated_{question_id}", "question_text": f"What is {level * 10}% of {question_id}?",
+            "options": {"a": str(level * question_id / 10), "b": str(question_id), "c": str(level), "d": "0"},
+            "correct_answer": "a", "difficulty_level": level,
+        }))
@@ -0,0 +1,75 @@
+"""
+Offline IRT calibration job.
+
+Streams user_history (including sessions moved to user_history_archive) in chunks, fits Rasch (1PL) difficulties per difficulty level and, for answers recorded with
+the question's id, per bank item, and stores them in the item_parameters table, where IRTModel picks them up. Run from the backend directory:
+
+    python calibrate.py --chunk-size 50000 --min-responses 30
+"""
+import argparse
+import numpy as np
+from sqlalchemy import select, union_all
+
+import crud, models
+from ai_models.calibration import RaschCalibrator
+from ai_models.irt_model import IRTModel
+from database import SessionLocal, engine, add_missing_columns
+
+
+def stream_responses(db, chunk_size: int):
+    """
+    Yields (difficulty, ability_before, correct, item_id) arrays chunk by chunk, without loading the table.
+    History rows store the ability *after* each answer, so the ability a learner answered with is the
+    one stored on their previous row; each learner's first row has none and is skipped.
+    """
+    columns = ("id", "user_id", "difficulty", "ability", "correct", "item_id")
+    answers = union_all(*(select(*(getattr(table, column) for column in columns)) for table in (models.UserHistoryArchive, models.UserHistory))).subquery()
+    query = (
+        select(answers.c.user_id, answers.c.difficulty, answers.c.ability, answers.c.correct, answers.c.item_id)
+        .order_by(answers.c.user_id, answers.c.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    last_user, last_ability = None, None
+    for rows in db.execute(query).partitions():
+        user_ids, difficulties, abilities, correct, item_ids = (np.array(column) for column in zip(*rows))
+        abilities = abilities.astype(np.float64)
+        previous_user = np.concatenate([[last_user if last_user is not None else -1], user_ids[:-1]])
+        previous_ability = np.concatenate([[last_ability if last_ability is not None else np.nan], abilities[:-1]])
+        keep = (previous_user == user_ids) & ~np.isnan(previous_ability)
+        last_user, last_ability = user_ids[-1], abilities[-1]
+        yield difficulties[keep].astype(np.int64), previous_ability[keep], correct[keep].astype(np.float64), item_ids[keep]
+
+
+def run_calibration(db, chunk_size: int = 50000, min_responses: int = 30) -> dict:
+    calibrator = RaschCalibrator()
+    for difficulties, abilities, correct, item_ids in stream_responses(db, chunk_size):
+        levels, level_index = np.unique(difficulties, return_inverse=True)
+        calibrator.add_responses([IRTModel.level_key(level) for level in levels], levels / 4.0, level_index, abilities, correct)
+        # Items start from their level's nominal difficulty; answers without an item id only inform the level.
+        has_item = np.array([item_id is not None for item_id in item_ids], dtype=bool)
+        if has_item.any():
+            items, first, item_index = np.unique(item_ids[has_item].astype(str), return_index=True, return_inverse=True)
+            calibrator.add_responses([IRTModel.item_key(item) for item in items], difficulties[has_item][first] / 4.0,
+                                     item_index, abilities[has_item], correct[has_item])
+    responses = calibrator.response_counts()
+    difficulties = {key: b for key, b in calibrator.fit().items() if responses[key] >= min_responses}
+    crud.save_item_parameters(db, difficulties, responses)
+    return {key: {"difficulty": b, "responses": responses[key]} for key, b in difficulties.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit IRT difficulties from user_history.")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--min-responses", type=int, default=30)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine, models.Base.metadata)
+    db = SessionLocal()
+    try:
+        fitted = run_calibration(db, chunk_size=args.chunk_size, min_responses=args.min_responses)
+    finally:
+        db.close()
+    for key, params in sorted(fitted.items()):
+        print(f"📐 {key}: difficulty={params['difficulty']:.3f} from {params['responses']} responses")
+    print(f"✅ Calibration: Stored {len(fitted)} parameters.")
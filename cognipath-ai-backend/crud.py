@@ -1,7 +1,18 @@
+from sqlalchemy import select, insert, func, union_all
 from sqlalchemy.orm import Session
-import crud, models, schemas, auth
+import crud, models, schemas, auth, metrics, report_data
+import gzip
+import hashlib
 import json
 import uuid
+import time
+import os
+
+# Newest history rows read per answer (ability trajectory). Older rows stay stored but are never
+# read on the request path, so per-answer reads do not grow with the history.
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "500"))
+HISTORY_COLUMNS = (models.UserHistory.id, models.UserHistory.correct, models.UserHistory.difficulty, models.UserHistory.ability, models.UserHistory.item_id)
+ARCHIVE_COLUMNS = ("id", "correct", "difficulty", "ability", "item_id", "session_id", "user_id")
 
 # --- User Ops ---
 def get_user_by_email(db: Session, email: str):
@@ -26,71 +37,416 @@ def update_user(db: Session, user_email: str, updates: schemas.UserUpdate):
     if updates.password: db_user.hashed_password = auth.get_password_hash(updates.password)
     db.commit()
     db.refresh(db_user)
+    auth.invalidate_user_tokens(user_id=db_user.id, email=db_user.email)
     return db_user
 
 # --- Progress & History Ops ---
 def get_user_progress(db: Session, user_id: int):
     return db.query(models.UserProgress).filter(models.UserProgress.user_id == user_id).first()
 
-def update_user_progress(db: Session, user_id: int, new_difficulty: int, new_ability: float, was_correct: bool):
+def update_user_progress(db: Session, user_id: int, new_difficulty: int, new_ability: float, was_correct: bool, new_mastery: float = None):
     progress = get_user_progress(db, user_id)
     if progress:
         progress.current_difficulty = new_difficulty
         # FIX: Update the 'ability' field in the database
         progress.ability = new_ability
+        if new_mastery is not None: progress.mastery = new_mastery
         progress.questions_answered += 1
         if was_correct: progress.correct_answers += 1
         db.commit()
         db.refresh(progress)
     return progress
 
-def get_user_history(db: Session, user_id: int):
-    return db.query(models.UserHistory).filter(models.UserHistory.user_id == user_id).all()
+def recent_history_query(user_id: int, session_id: int, columns: tuple, limit: int = None):
+    """
+    The newest `limit` history rows of one of a user's sessions (all of them if None) as plain tuples of `columns`,
+    oldest first. A session_id of None selects the rows written before sessions were recorded. With the
+    (user_id, session_id, id) index this reads `limit` index entries backwards, however long the history is.
+    """
+    in_session = (models.UserHistory.user_id == user_id, models.UserHistory.session_id == session_id)
+    if limit is None:
+        return select(*columns).filter(*in_session).order_by(models.UserHistory.id)
+    recent = (
+        select(models.UserHistory.id.label("history_id"), *columns)
+        .filter(*in_session)
+        .order_by(models.UserHistory.id.desc())
+        .limit(limit)
+        .subquery()
+    )
+    return select(*(recent.c[column.key] for column in columns)).order_by(recent.c.history_id)
+
+def get_user_history(db: Session, user_id: int, session_id: int = None, limit: int = HISTORY_WINDOW):
+    """ The newest history rows of a session as (id, correct, difficulty, ability, item_id) tuples, oldest first. """
+    return db.execute(recent_history_query(user_id, session_id, HISTORY_COLUMNS, limit)).all()
+
+def session_answers_query(user_id: int, session_id: int):
+    """
+    The correct column of every answer of a session, live and archived, oldest first: the input of a full BKT replay.
+    Rows the retention job rolled up are gone; it backfills a missing mastery before removing them.
+    """
+    live = select(models.UserHistory.id, models.UserHistory.correct).filter(
+        models.UserHistory.user_id == user_id, models.UserHistory.session_id == session_id)
+    archived = select(models.UserHistoryArchive.id, models.UserHistoryArchive.correct).filter(
+        models.UserHistoryArchive.user_id == user_id, models.UserHistoryArchive.session_id == session_id)
+    answers = union_all(live, archived).subquery()
+    return select(answers.c.correct).order_by(answers.c.id)
+
+def backfill_missing_mastery(db: Session, user_id: int, progress, bkt_model):
+    """ Sets a missing stored mastery by replaying the session's complete history (not just the recent window). """
+    if progress is not None and progress.mastery is None:
+        progress.mastery = bkt_model.get_mastery_probability(db.execute(session_answers_query(user_id, progress.session_id)).all())
+
+def open_session(db: Session, user_id: int, initial_mastery: float = None, item_sampler: dict = None) -> int:
+    """
+    Starts a new learning session: one insert and one update, however much history the learner has. Earlier
+    sessions stay stored; per-answer reads only see the current one. Mastery and the item sampler are per session.
+    """
+    learning_session = models.LearningSession(user_id=user_id, started_at=time.time())
+    db.add(learning_session)
+    db.flush()
+    db.query(models.UserProgress).filter(models.UserProgress.user_id == user_id).update({
+        models.UserProgress.session_id: learning_session.id, models.UserProgress.mastery: initial_mastery, models.UserProgress.item_sampler: item_sampler,
+    })
+    db.commit()
+    return learning_session.id
+
+def backfill_user_mastery(db: Session, bkt_model, only_missing: bool = True):
+    """
+    Recomputes the stored mastery from the current session's full history for every user (or only those without one).
+    Returns the (user_id, stored, recomputed) values that disagreed, which is empty when the incremental state is consistent.
+    """
+    query = db.query(models.UserProgress)
+    if only_missing: query = query.filter(models.UserProgress.mastery.is_(None))
+    mismatches = []
+    for progress in query.all():
+        history = db.execute(session_answers_query(progress.user_id, progress.session_id)).all()
+        recomputed = bkt_model.get_mastery_probability(history)
+        if progress.mastery is None or abs(progress.mastery - recomputed) > 1e-9:
+            mismatches.append((progress.user_id, progress.mastery, recomputed))
+            progress.mastery = recomputed
+    db.commit()
+    return mismatches
+
+def users_over_history_limit(db: Session, keep_last: int) -> list:
+    return db.scalars(select(models.UserHistory.user_id).group_by(models.UserHistory.user_id).having(func.count() > keep_last)).all()
 
-def add_user_history(db: Session, user_id: int, correct: bool, difficulty: int, ability: float):
-    history_entry = models.UserHistory(user_id=user_id, correct=correct, difficulty=difficulty, ability=ability)
-    db.add(history_entry)
+def compact_user_history(db: Session, user_id: int, keep_last: int, bkt_model) -> int:
+    """
+    Retention: rolls a user's history rows older than the newest keep_last into user_history_rollups (answers and
+    correct answers per level) and deletes them, in one transaction. A missing mastery is backfilled from the full
+    session history first, since later backfills only see the kept rows. Returns the number of rows removed.
+    """
+    cutoff = db.scalar(
+        select(models.UserHistory.id).filter(models.UserHistory.user_id == user_id)
+        .order_by(models.UserHistory.id.desc()).offset(keep_last).limit(1)
+    )
+    if cutoff is None:
+        return 0
+    backfill_missing_mastery(db, user_id, get_user_progress(db, user_id), bkt_model)
+    old_rows = (models.UserHistory.user_id == user_id, models.UserHistory.id <= cutoff)
+    counts = db.execute(
+        select(models.UserHistory.difficulty, func.count(), func.sum(models.UserHistory.correct))
+        .filter(*old_rows).group_by(models.UserHistory.difficulty)
+    ).all()
+    for difficulty, responses, correct in counts:
+        rollup = db.get(models.UserHistoryRollup, (user_id, difficulty))
+        if rollup is None:
+            rollup = models.UserHistoryRollup(user_id=user_id, difficulty=difficulty, responses=0, correct=0)
+            db.add(rollup)
+        rollup.responses += responses
+        rollup.correct += correct or 0
+        rollup.last_history_id = cutoff
+    removed = db.query(models.UserHistory).filter(*old_rows).delete(synchronize_session=False)
     db.commit()
+    return removed
 
-def clear_user_history(db: Session, user_id: int):
-    db.query(models.UserHistory).filter(models.UserHistory.user_id == user_id).delete()
+def archive_sessions(db: Session, started_before: float, batch_size: int = 100) -> int:
+    """
+    Moves the history rows of up to batch_size sessions started before `started_before` (Unix time) from
+    user_history to user_history_archive, in one transaction. A learner's current session is never archived, and
+    a session claimed by a concurrent run is skipped. Returns the number of sessions archived; call it until it returns 0.
+    """
+    sessions = db.execute(
+        select(models.LearningSession.id, models.LearningSession.user_id)
+        .filter(models.LearningSession.archived_at.is_(None), models.LearningSession.started_at < started_before)
+        .filter(~select(models.UserProgress.id).filter(models.UserProgress.session_id == models.LearningSession.id).exists())
+        .order_by(models.LearningSession.started_at)
+        .limit(batch_size)
+    ).all()
+    history_columns = [getattr(models.UserHistory, column) for column in ARCHIVE_COLUMNS]
+    archived_at, archived = time.time(), 0
+    for session_id, user_id in sessions:
+        # Every worker runs this job. Claiming the session first means a concurrent run's claim matches no row (Postgres
+        # re-checks the condition once the other transaction commits; SQLite fails this one), so rows are never copied twice.
+        claimed = db.query(models.LearningSession).filter(models.LearningSession.id == session_id, models.LearningSession.archived_at.is_(None)).update(
+            {models.LearningSession.archived_at: archived_at}, synchronize_session=False)
+        if not claimed:
+            continue
+        in_session = (models.UserHistory.user_id == user_id, models.UserHistory.session_id == session_id)
+        db.execute(insert(models.UserHistoryArchive).from_select(ARCHIVE_COLUMNS, select(*history_columns).filter(*in_session)))
+        db.query(models.UserHistory).filter(*in_session).delete(synchronize_session=False)
+        archived += 1
     db.commit()
+    return archived
 
 # --- Fingerprint Ops ---
 def get_cognitive_fingerprint(db: Session, user_id: int):
     return db.query(models.CognitiveFingerprint).filter(models.CognitiveFingerprint.user_id == user_id).first()
 
+def _apply_fingerprint_adjustments(fp: models.CognitiveFingerprint, adjustments: dict):
+    for key, value in adjustments.items():
+        current_value = getattr(fp, key.replace('_score', ''))
+        setattr(fp, key.replace('_score', ''), max(0, min(1, current_value + value)))
+
 def update_cognitive_fingerprint(db: Session, user_id: int, adjustments: dict):
     fp = get_cognitive_fingerprint(db, user_id)
     if fp:
-        for key, value in adjustments.items():
-            current_value = getattr(fp, key.replace('_score', ''))
-            setattr(fp, key.replace('_score', ''), max(0, min(1, current_value + value)))
+        _apply_fingerprint_adjustments(fp, adjustments)
         db.commit()
         db.refresh(fp)
     return fp
 
+# --- Submission Service ---
+def apply_answer(user_id: int, progress, fp, history: list, was_correct: bool, difficulty: int, time_taken: float, adaptive_engine, diagnostic_agent, item_id: str = None):
+    """
+    One answer's in-memory update, without the ability trajectory; see apply_submission. A missing stored mastery
+    must already be backfilled (backfill_missing_mastery); history is only replayed when there is no progress row.
+    """
+    current_ability = progress.ability if progress else 0.5
+    item_key = adaptive_engine.irt_model.item_key(item_id) if item_id is not None else None
+    with metrics.span("irt_update"):
+        new_ability = adaptive_engine.irt_model.update_ability(current_ability, was_correct, difficulty, item_key=item_key)
+    with metrics.span("bkt_update"):
+        mastery = adaptive_engine.update_mastery(progress.mastery if progress else None, was_correct, load_history=lambda: history)
+    with metrics.span("next_difficulty"):
+        next_difficulty = adaptive_engine.get_next_difficulty(mastery_prob=mastery, latest_ability=new_ability)
+
+    history_entry = models.UserHistory(user_id=user_id, correct=was_correct, difficulty=difficulty, ability=new_ability, item_id=item_id,
+                                       session_id=progress.session_id if progress else None)
+    if progress:
+        progress.current_difficulty = next_difficulty
+        progress.ability = new_ability
+        progress.mastery = mastery
+        progress.questions_answered += 1
+        if was_correct: progress.correct_answers += 1
+    fingerprint = None
+    if fp:
+        with metrics.span("fingerprint"):
+            _apply_fingerprint_adjustments(fp, diagnostic_agent.analyze_submission(was_correct=was_correct, time_taken=time_taken))
+        fingerprint = {"concentration": fp.concentration, "comprehension": fp.comprehension, "retention": fp.retention, "application": fp.application}
+    result = {
+        "user_id": user_id,
+        "ability": new_ability,
+        "mastery": mastery,
+        "next_difficulty": next_difficulty,
+        "fingerprint": fingerprint,
+    }
+    return history_entry, result
+
+def apply_submission(user_id: int, progress, fp, history: list, was_correct: bool, difficulty: int, time_taken: float, adaptive_engine, diagnostic_agent, item_id: str = None):
+    """
+    The in-memory part of a submission, shared by the sync and async services: updates the loaded progress and
+    fingerprint objects and returns (new history row, result dict). history holds the earlier (correct, ability) rows.
+    """
+    history_entry, result = apply_answer(user_id, progress, fp, history, was_correct, difficulty, time_taken, adaptive_engine, diagnostic_agent, item_id)
+    result["abilities"] = ([h.ability for h in history] + [history_entry.ability])[-HISTORY_WINDOW:]
+    return history_entry, result
+
+def apply_submissions(user_id: int, progress, fp, history: list, answers: list, adaptive_engine, diagnostic_agent):
+    """
+    apply_submission for an ordered batch of (was_correct, difficulty, time_taken, item_id) answers. Each answer sees the state
+    left by the previous one, exactly as if they had been submitted one by one. Returns (new history rows, final result).
+    """
+    history = list(history)
+    entries = []
+    for was_correct, difficulty, time_taken, item_id in answers:
+        history_entry, result = apply_answer(user_id, progress, fp, history, was_correct, difficulty, time_taken, adaptive_engine, diagnostic_agent, item_id)
+        history.append(history_entry)
+        entries.append(history_entry)
+    result["abilities"] = [h.ability for h in history[-HISTORY_WINDOW:]]
+    return entries, result
+
+def submission_state_query(email: str = None, user_id: int = None):
+    """
+    The user's id with their progress and fingerprint, in one round trip. When the id is known (from the token),
+    the users table is skipped entirely; the email lookup remains for tokens issued without it.
+    """
+    if user_id is not None:
+        return (
+            select(models.UserProgress.user_id, models.UserProgress, models.CognitiveFingerprint)
+            .outerjoin(models.CognitiveFingerprint, models.CognitiveFingerprint.user_id == models.UserProgress.user_id)
+            .filter(models.UserProgress.user_id == user_id)
+        )
+    return (
+        select(models.User.id, models.UserProgress, models.CognitiveFingerprint)
+        .outerjoin(models.UserProgress, models.UserProgress.user_id == models.User.id)
+        .outerjoin(models.CognitiveFingerprint, models.CognitiveFingerprint.user_id == models.User.id)
+        .filter(models.User.email == email)
+    )
+
+def submission_history_query(user_id: int, progress):
+    """ The current session's recent (correct, ability) rows. """
+    session_id = progress.session_id if progress else None
+    return recent_history_query(user_id, session_id, (models.UserHistory.correct, models.UserHistory.ability), HISTORY_WINDOW)
+
+def select_next_question(progress, result: dict, select_question):
+    """
+    Picks the next question with select_question(difficulty, ability, sampler_state) -> (question, new state) and
+    keeps the advanced sampler state on progress, so it is committed together with the answer.
+    """
+    if select_question is None: return
+    sampler_state = progress.item_sampler if progress else None
+    with metrics.span("next_question"):
+        result["next_question"], sampler_state = select_question(result["next_difficulty"], result["ability"], sampler_state)
+    if progress: progress.item_sampler = sampler_state
+
+def record_submission(db: Session, email: str, was_correct: bool, difficulty: int, time_taken: float, adaptive_engine, diagnostic_agent, user_id: int = None, item_id: str = None, select_question=None):
+    """
+    Applies one answer in a single transaction: one query loads the user with their progress and fingerprint,
+    one query reads the history columns needed for the trajectory, and one commit writes the new history row,
+    progress and fingerprint together. Returns everything /submit needs, or None if the user does not exist.
+    With select_question, the result also carries the next question (see select_next_question).
+    """
+    with metrics.span("db_read"):
+        row = db.execute(submission_state_query(email=email, user_id=user_id)).first()
+        if row is None: return None
+        user_id, progress, fp = row
+        history = db.execute(submission_history_query(user_id, progress)).all()
+        backfill_missing_mastery(db, user_id, progress, adaptive_engine.bkt_model)
+    history_entry, result = apply_submission(user_id, progress, fp, history, was_correct, difficulty, time_taken, adaptive_engine, diagnostic_agent, item_id)
+    select_next_question(progress, result, select_question)
+    with metrics.span("db_write"):
+        db.add(history_entry)
+        db.commit()
+    return result
+
+def history_rows(entries: list) -> list:
+    """ Plain column dicts for one executemany INSERT of new history rows. """
+    return [{"user_id": e.user_id, "correct": e.correct, "difficulty": e.difficulty, "ability": e.ability, "item_id": e.item_id, "session_id": e.session_id} for e in entries]
+
+def record_submissions(db: Session, email: str, answers: list, adaptive_engine, diagnostic_agent, user_id: int = None, select_question=None):
+    """
+    Applies an ordered batch of answers in one transaction: the same two reads as record_submission, one bulk
+    INSERT for all history rows and one commit. Returns the state after the last answer, or None if the user does not exist.
+    """
+    with metrics.span("db_read"):
+        row = db.execute(submission_state_query(email=email, user_id=user_id)).first()
+        if row is None: return None
+        user_id, progress, fp = row
+        history = db.execute(submission_history_query(user_id, progress)).all()
+        backfill_missing_mastery(db, user_id, progress, adaptive_engine.bkt_model)
+    entries, result = apply_submissions(user_id, progress, fp, history, answers, adaptive_engine, diagnostic_agent)
+    select_next_question(progress, result, select_question)
+    with metrics.span("db_write"):
+        db.execute(insert(models.UserHistory), history_rows(entries))
+        db.commit()
+    return result
+
 # --- Report Ops ---
+def shareable_report_body(report_id: str, user_name: str, data: dict) -> tuple:
+    """ (strong ETag, gzip-compressed body) of a shareable report's public JSON response. """
+    body = json.dumps({"id": report_id, "user_name": user_name, "report_data": data}, separators=(",", ":")).encode()
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"', gzip.compress(body, compresslevel=9, mtime=0)
+
 def create_shareable_report(db: Session, user_id: int):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    fingerprint = get_cognitive_fingerprint(db, user_id)
-    history = get_user_history(db, user_id)
-    
-    report_data = {
-        "fingerprint": fingerprint.to_dict(),
-        "history": [h.to_dict() for h in history]
-    }
-    
-    report = models.ShareableReport(user_id=user_id, report_data=json.dumps(report_data))
+    """
+    Snapshots the learner's current report data (fingerprint scores, downsampled trajectory and a summary, see
+    report_data) together with their name as the finished response body; the viewer draws the charts from it.
+    """
+    user_name = db.query(models.User.name).filter(models.User.id == user_id).scalar()
+    fingerprint = report_data.fingerprint_values(get_cognitive_fingerprint(db, user_id))
+    progress = get_user_progress(db, user_id)
+    abilities = [h.ability for h in get_user_history(db, user_id, session_id=progress.session_id if progress else None)]
+
+    data = report_data.build_report_data(fingerprint, abilities)
+    if progress and progress.questions_answered:
+        accuracy = 100 * progress.correct_answers / progress.questions_answered
+        data["dashboard_summary"] = f"{progress.questions_answered} questions answered with {accuracy:.0f}% accuracy, now at level {progress.current_difficulty}."
+
+    report_id = str(uuid.uuid4())
+    etag, body = shareable_report_body(report_id, user_name, data)
+    report = models.ShareableReport(id=report_id, user_id=user_id, body=body, etag=etag, created_at=time.time())
     db.add(report)
     db.commit()
-    db.refresh(report)
     return report
 
-def get_shareable_report(db: Session, report_id: uuid.UUID):
-    report = db.query(models.ShareableReport).filter(models.ShareableReport.id == str(report_id)).first()
-    if report:
-        user = db.query(models.User).filter(models.User.id == report.user_id).first()
-        return schemas.ShareableReport(id=report.id, user_name=user.name, report_data=json.loads(report.report_data))
-    return None
 
+# --- Cohort Analytics Ops ---
+# Per-learner values kept by analytics.CohortAnalytics, in this column order
+LEARNER_COLUMNS = (
+    models.User.id, models.User.education_level,
+    models.UserProgress.ability, models.UserProgress.mastery, models.UserProgress.questions_answered,
+    models.UserProgress.correct_answers, models.UserProgress.current_difficulty,
+    models.CognitiveFingerprint.concentration, models.CognitiveFingerprint.comprehension,
+    models.CognitiveFingerprint.retention, models.CognitiveFingerprint.application,
+)
+
+def cohort_learners_query(user_ids: list = None, after_user_id: int = None):
+    """ One row of LEARNER_COLUMNS per learner, ordered by user id: all learners, the given ones, or those after an id. """
+    query = (
+        select(*LEARNER_COLUMNS)
+        .outerjoin(models.UserProgress, models.UserProgress.user_id == models.User.id)
+        .outerjoin(models.CognitiveFingerprint, models.CognitiveFingerprint.user_id == models.User.id)
+        .order_by(models.User.id)
+    )
+    if user_ids is not None:
+        query = query.filter(models.User.id.in_(user_ids))
+    if after_user_id is not None:
+        query = query.filter(models.User.id > after_user_id)
+    return query
+
+def _answer_counts(table, *conditions):
+    return (
+        select(table.user_id, table.difficulty, func.count(), func.coalesce(func.sum(table.correct), 0))
+        .filter(*conditions).group_by(table.user_id, table.difficulty)
+    )
+
+def answer_count_queries(up_to_id: int) -> list:
+    """
+    (user_id, difficulty, answers, correct answers) per learner and level, as GROUP BY queries over every answer: the
+    live history rows up to up_to_id, the archive and the rows the retention job rolled up.
+    """
+    rollups = select(models.UserHistoryRollup.user_id, models.UserHistoryRollup.difficulty, models.UserHistoryRollup.responses, models.UserHistoryRollup.correct)
+    return [_answer_counts(models.UserHistory, models.UserHistory.id <= up_to_id), _answer_counts(models.UserHistoryArchive), rollups]
+
+def recent_answers_query(after_id: int):
+    """ (id, user_id, difficulty, correct) of the live history rows after an id. """
+    return select(models.UserHistory.id, models.UserHistory.user_id, models.UserHistory.difficulty, models.UserHistory.correct).filter(models.UserHistory.id > after_id)
+
+def recent_sessions_query(after_id: int):
+    """ (id, user_id) of the sessions after an id. """
+    return select(models.LearningSession.id, models.LearningSession.user_id).filter(models.LearningSession.id > after_id)
+
+def get_cohort_member_ids(db: Session, cohort: str) -> list:
+    return db.scalars(select(models.CohortMember.user_id).filter(models.CohortMember.cohort == cohort)).all()
+
+def set_cohort_members(db: Session, cohort: str, emails: list) -> tuple:
+    """ Replaces a group's members by the learners with these emails. Returns (member count, emails without an account). """
+    users = db.execute(select(models.User.id, models.User.email).filter(models.User.email.in_(emails))).all()
+    db.query(models.CohortMember).filter(models.CohortMember.cohort == cohort).delete(synchronize_session=False)
+    if users:
+        db.execute(insert(models.CohortMember), [{"cohort": cohort, "user_id": user_id} for user_id, _ in users])
+    db.commit()
+    known = {email for _, email in users}
+    return len(users), [email for email in emails if email not in known]
+
+# --- IRT Calibration Ops ---
+def get_item_parameters(db: Session):
+    return {p.item_key: p.difficulty for p in db.query(models.ItemParameter).all()}
+
+def save_item_parameters(db: Session, difficulties: dict, responses: dict):
+    for item_key, difficulty in difficulties.items():
+        db.merge(models.ItemParameter(item_key=item_key, difficulty=difficulty, responses=responses.get(item_key, 0)))
+    db.commit()
+
+# --- Hint Cache Ops ---
+def get_persisted_hint(db: Session, question_hash: str, max_age_seconds: float = None):
+    query = db.query(models.HintCacheEntry.hint).filter(models.HintCacheEntry.question_hash == question_hash)
+    if max_age_seconds is not None:
+        query = query.filter(models.HintCacheEntry.created_at >= time.time() - max_age_seconds)
+    row = query.first()
+    return row.hint if row else None
+
+def save_persisted_hint(db: Session, question_hash: str, question_text: str, hint: str):
+    db.merge(models.HintCacheEntry(question_hash=question_hash, question_text=question_text, hint=hint, created_at=time.time()))
+    db.commit()
@@ -1,7 +1,10 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc, inspect, text
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import time
 
 # --- Production-Ready Logic ---
 # 1. Look for a "DATABASE_URL" in the server's environment variables (Render will provide this).
@@ -12,11 +15,136 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./cognipath.db")
 # The `check_same_thread` argument is only for SQLite.
 connect_args = {"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
 
+# --- Connection Pool Settings ---
+# Size the pool per process, e.g. DB_POOL_SIZE * gunicorn workers must stay below Postgres' max_connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; -1 never recycles
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# SQLite tuning applied to every new connection: WAL lets readers run alongside the writer,
+# and busy_timeout makes writers wait for the lock instead of failing with "database is locked".
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+class _CheckoutWaitMixin:
+    """ Records how long callers wait to check a connection out of the pool. """
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.checkout_timeouts = getattr(self, "checkout_timeouts", 0) + 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts = getattr(self, "checkouts", 0) + 1
+            self.checkout_wait_total = getattr(self, "checkout_wait_total", 0.0) + waited
+            self.checkout_wait_max = max(getattr(self, "checkout_wait_max", 0.0), waited)
+
+
+class TimedQueuePool(_CheckoutWaitMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_CheckoutWaitMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_kwargs(url: str, pool_class) -> dict:
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        return {}  # In-memory SQLite keeps SQLAlchemy's single-connection pool.
+    return {
+        "poolclass": pool_class,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args=connect_args
+    SQLALCHEMY_DATABASE_URL, connect_args=connect_args, **_pool_kwargs(SQLALCHEMY_DATABASE_URL, TimedQueuePool)
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# --- Async engine for the request path ---
+# The same database through an asyncio driver (aiosqlite / asyncpg). ASYNC_DATABASE_URL overrides the derived URL.
+def to_async_database_url(url: str) -> str:
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgres://", "postgresql://", "postgresql+psycopg2://"):
+        if url.startswith(prefix):
+            # asyncpg spells libpq's sslmode as ssl
+            return "postgresql+asyncpg://" + url[len(prefix):].replace("sslmode=", "ssl=")
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_database_url(SQLALCHEMY_DATABASE_URL))
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_kwargs(ASYNC_DATABASE_URL, TimedAsyncAdaptedQueuePool))
+
+# expire_on_commit=False: attributes stay readable after commit without another (async) round trip.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+if ASYNC_DATABASE_URL.startswith("sqlite"):
+    event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+
+
+def get_pool_stats() -> dict:
+    """ Current occupancy and cumulative checkout waits of both connection pools. """
+    stats = {}
+    for name, pool in (("sync", engine.pool), ("async", async_engine.pool)):
+        checkouts = getattr(pool, "checkouts", 0)
+        entry = {"pool_class": type(pool).__name__, "status": pool.status()}
+        if isinstance(pool, QueuePool):
+            entry.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "checked_in": pool.checkedin(),
+                "checkouts": checkouts,
+                "checkout_timeouts": getattr(pool, "checkout_timeouts", 0),
+                "checkout_wait_avg_ms": round(getattr(pool, "checkout_wait_total", 0.0) / checkouts * 1000, 3) if checkouts else 0.0,
+                "checkout_wait_max_ms": round(getattr(pool, "checkout_wait_max", 0.0) * 1000, 3),
+            })
+        stats[name] = entry
+    return stats
+
 Base = declarative_base()
 
+
+def add_missing_columns(bind, metadata):
+    """
+    create_all() only creates missing tables. This adds columns (and indexes) that were introduced
+    after a table was first created, so existing databases keep working without a migration tool.
+    New columns must be nullable or have a server default.
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    with bind.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import threading
+import unicodedata
+from concurrent.futures import Future, ThreadPoolExecutor
+from cache import LRUCache
+from logs import get_logger, log_event
+
+logger = get_logger("hint_cache")
+
+
+def normalize_question(question_text: str) -> str:
+    """ Folds case, Unicode forms and whitespace, so trivially different copies of a question share a hint. """
+    return " ".join(unicodedata.normalize("NFKC", question_text).casefold().split())
+
+
+def hint_key(question_text: str) -> str:
+    return hashlib.sha256(normalize_question(question_text).encode()).hexdigest()
+
+
+class HintCache:
+    """
+    Bounded LRU/TTL cache of generated hints, keyed by the hash of the normalized question text.
+    A miss first consults the optional persistent store (load_fn/save_fn), then calls generate_fn.
+    Concurrent misses for the same question are coalesced: one caller generates, the others wait for its result.
+    Failures are never cached, so the next request retries.
+    """
+    def __init__(self, generate_fn, maxsize: int = 5000, ttl: float = 7 * 24 * 3600, load_fn=None, save_fn=None, prewarm_workers: int = 2):
+        self.generate_fn = generate_fn  # generate_fn(question_text) -> hint, raises on failure
+        self.load_fn = load_fn          # load_fn(key) -> hint or None
+        self.save_fn = save_fn          # save_fn(key, question_text, hint)
+        self.prewarm_workers = prewarm_workers
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._inflight = {}  # key -> Future of the one call currently producing that hint
+        self._lock = threading.Lock()
+        self._executor = None
+        self._stats = {"coalesced": 0, "store_hits": 0, "generated": 0, "failures": 0, "prewarm_scheduled": 0}
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def get(self, question_text: str) -> str:
+        """ Returns the hint for a question, generating it at most once across concurrent callers. Raises on failure. """
+        key = hint_key(question_text)
+        hint = self._cache.get(key)
+        if hint is not None:
+            return hint
+        with self._lock:
+            # A leader may have finished since the lookup above; it caches the hint before leaving _inflight.
+            hint = self._cache.get(key) if key in self._cache else None
+            future = self._inflight.get(key)
+            leader = hint is None and future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            elif hint is None:
+                self._stats["coalesced"] += 1
+        if hint is not None:
+            return hint
+        if not leader:
+            return future.result()
+        try:
+            hint = self._load_or_generate(key, question_text)
+            future.set_result(hint)
+            return hint
+        except Exception as e:
+            self._count("failures")
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _load_or_generate(self, key: str, question_text: str) -> str:
+        if self.load_fn:
+            try:
+                hint = self.load_fn(key)
+            except Exception as e:
+                hint = None
+                log_event(logger, logging.ERROR, "hint_load_failed", error=str(e))
+            if hint:
+                self._count("store_hits")
+                self._cache.set(key, hint)
+                return hint
+        hint = self.generate_fn(question_text)
+        self._count("generated")
+        self._cache.set(key, hint)
+        if self.save_fn:
+            try:
+                self.save_fn(key, question_text, hint)
+            except Exception as e:
+                log_event(logger, logging.ERROR, "hint_persist_failed", error=str(e))
+        return hint
+
+    def prewarm(self, question_texts) -> int:
+        """
+        Generates hints for the given questions in the background on prewarm_workers threads.
+        Questions already cached (or duplicates of each other) are skipped. Returns how many were scheduled.
+        """
+        keys = set()
+        pending = []
+        for question_text in question_texts:
+            if not question_text:
+                continue
+            key = hint_key(question_text)
+            if key in keys or key in self._cache:
+                continue
+            keys.add(key)
+            pending.append(question_text)
+        if not pending:
+            return 0
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.prewarm_workers, thread_name_prefix="hint-prewarm")
+            executor = self._executor
+            self._stats["prewarm_scheduled"] += len(pending)
+        for question_text in pending:
+            executor.submit(self._prewarm_one, question_text)
+        return len(pending)
+
+    def _prewarm_one(self, question_text: str):
+        try:
+            self.get(question_text)
+        except Exception as e:
+            log_event(logger, logging.ERROR, "hint_prewarm_failed", error=str(e))
+
+    def stop(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        with self._lock:
+            stats.update(self._stats, inflight=len(self._inflight))
+        return stats
@@ -0,0 +1,40 @@
+"""
+History retention job.
+
+Keeps the newest --keep-last answers of every learner in user_history and rolls older ones up into
+user_history_rollups (answers and correct answers per level), deleting them one learner per transaction.
+Requests only ever read the newest HISTORY_WINDOW rows, so this bounds the table's size, not request cost.
+Run calibrate.py first if the removed answers should still inform the item parameters. From the backend directory:
+
+    python history_retention.py --keep-last 5000
+"""
+import argparse
+import os
+
+import crud, models
+from ai_models.bkt_model import BKTModel
+from database import SessionLocal, engine, add_missing_columns
+
+
+def run_retention(db, keep_last: int, bkt_model) -> dict:
+    # Never drop rows that requests still read.
+    keep_last = max(keep_last, crud.HISTORY_WINDOW)
+    removed = {}
+    for user_id in crud.users_over_history_limit(db, keep_last):
+        removed[user_id] = crud.compact_user_history(db, user_id, keep_last, bkt_model)
+    return removed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll up and remove old user_history rows.")
+    parser.add_argument("--keep-last", type=int, default=int(os.getenv("HISTORY_RETENTION_ROWS", "5000")))
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine, models.Base.metadata)
+    db = SessionLocal()
+    try:
+        removed = run_retention(db, keep_last=args.keep_last, bkt_model=BKTModel())
+    finally:
+        db.close()
+    print(f"✅ History retention: Rolled up {sum(removed.values())} rows of {len(removed)} learners.")
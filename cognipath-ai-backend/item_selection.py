@@ -0,0 +1,161 @@
+import base64
+import bisect
+import random
+import threading
+
+
+class SeededPermutation:
+    """
+    A pseudo-random bijection of range(n) that is computed, not stored: permutation[i] for any i in O(1) expected
+    time and O(1) memory. A balanced Feistel network over the smallest even number of bits covering n is a
+    bijection of [0, 2**bits); cycle-walking (re-applying it until the value is < n) restricts it to range(n), and
+    since 2**bits < 4n that takes under four steps on average. The round keys come from a string seed, which
+    random.Random hashes with SHA-512, so every seed gives an unrelated order, reproducible across processes.
+    """
+    ROUNDS = 6
+
+    def __init__(self, n: int, seed: str):
+        self.n = n
+        bits = max(2, (max(n, 1) - 1).bit_length())
+        self.half_bits = (bits + 1) // 2
+        self.half_mask = (1 << self.half_bits) - 1
+        rng = random.Random(seed)
+        self.keys = [rng.getrandbits(64) for _ in range(self.ROUNDS)]
+
+    def _round(self, value: int, key: int) -> int:
+        # A 64-bit multiply-xorshift mix of the half block and the round key.
+        x = ((value ^ key) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        x ^= x >> 31
+        x = (x * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        return (x ^ (x >> 29)) & self.half_mask
+
+    def _encrypt(self, value: int) -> int:
+        left, right = value >> self.half_bits, value & self.half_mask
+        for key in self.keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self.half_bits) | right
+
+    def __getitem__(self, index: int) -> int:
+        value = self._encrypt(index)
+        while value >= self.n:
+            value = self._encrypt(value)
+        return value
+
+
+class ServedSet:
+    """ Bitset of the positions (within one level) already served in a session; 1 bit per item. """
+    def __init__(self, n: int, encoded: str = None):
+        self.n = n
+        self.bits = bytearray(base64.b64decode(encoded)) if encoded else bytearray((n + 7) // 8)
+        self.count = sum(bin(byte).count("1") for byte in self.bits)
+
+    def __contains__(self, index: int) -> bool:
+        return bool(self.bits[index >> 3] & (1 << (index & 7)))
+
+    def add(self, index: int):
+        if index not in self:
+            self.bits[index >> 3] |= 1 << (index & 7)
+            self.count += 1
+
+    def full(self) -> bool:
+        return self.count >= self.n
+
+    def encode(self) -> str:
+        return base64.b64encode(bytes(self.bits)).decode()
+
+
+class ItemSelector:
+    """
+    Chooses the next bank question for a learner without repeats within a session.
+
+    The per-session state is a small JSON-able dict (kept on UserProgress.item_sampler) holding, per level, a
+    round number, a position in that round's SeededPermutation and a bitset of served items: a few integers plus
+    n/8 bytes, however large the bank. Within a level:
+    - if no item has its own calibrated difficulty, all items are equally informative and the next unserved item of
+      the session's permutation is served (O(1) amortized per draw);
+    - otherwise items are ranked by Fisher information at the learner's ability, which for the Rasch model means
+      by |difficulty - ability|. The nearest unserved items are found by bisecting a per-level sorted difficulty
+      array (O(log n) plus the served items skipped), and one of the top_k is picked at random, so learners at the
+      same ability do not all get the same item (exposure control).
+    When every item of a level has been served, the level starts over with the next round's permutation.
+    """
+    def __init__(self, irt_model, top_k: int = 3):
+        self.irt_model = irt_model
+        self.top_k = top_k
+        self._sorted = {}  # (id(level items), IRT parameters version) -> (level items, (difficulties, positions) or None)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_state(seed: int = None) -> dict:
+        return {"seed": random.getrandbits(32) if seed is None else seed, "levels": {}}
+
+    def _ranking(self, level: int, items: list):
+        """ Items sorted by calibrated difficulty, or None when no item of the level is calibrated on its own. """
+        key = (id(items), self.irt_model.version)
+        with self._lock:
+            cached = self._sorted.get(key)
+        # The list itself is kept in the entry, so its id cannot be reused by a newer snapshot's list.
+        if cached is not None and cached[0] is items:
+            return cached[1]
+        keys = [self.irt_model.item_key(item['id']) for item in items]
+        ranking = None
+        if any(item_key in self.irt_model.item_difficulties for item_key in keys):
+            pairs = sorted((self.irt_model.item_difficulty(level, item_key), position) for position, item_key in enumerate(keys))
+            ranking = ([difficulty for difficulty, _ in pairs], [position for _, position in pairs])
+        with self._lock:
+            if len(self._sorted) > 64:  # Old snapshots/parameter versions are never looked up again.
+                self._sorted.clear()
+            self._sorted[key] = (items, ranking)
+        return ranking
+
+    @staticmethod
+    def _permutation(state: dict, level: int, level_state: dict) -> SeededPermutation:
+        return SeededPermutation(level_state["n"], f"{state.get('seed', 0)}:{level}:{level_state['round']}")
+
+    def _next_in_permutation(self, permutation: SeededPermutation, level_state: dict, served: ServedSet) -> int:
+        # Every item before the position has been served, so an unserved one is always found before the end.
+        position = level_state["position"]
+        while permutation[position] in served:
+            position += 1
+        level_state["position"] = position + 1
+        return permutation[position]
+
+    def _most_informative(self, ranking, ability: float, served: ServedSet) -> int:
+        difficulties, positions = ranking
+        right = bisect.bisect_left(difficulties, ability)
+        left = right - 1
+        candidates = []
+        while len(candidates) < self.top_k and (left >= 0 or right < len(difficulties)):
+            if right >= len(difficulties) or (left >= 0 and ability - difficulties[left] <= difficulties[right] - ability):
+                index, left = left, left - 1
+            else:
+                index, right = right, right + 1
+            if positions[index] not in served:
+                candidates.append(positions[index])
+        return random.choice(candidates)
+
+    def select(self, level: int, items: list, ability: float, state: dict):
+        """ Picks the next item of the level's items for this session and records it in state. Returns the item. """
+        if not items:
+            return None
+        n = len(items)
+        level_states = state.setdefault("levels", {})
+        level_state = level_states.get(str(level))
+        if level_state is None or level_state.get("n") != n:
+            # First draw at this level, or the bank changed size: start a fresh permutation.
+            level_state = {"n": n, "round": 0, "position": 0, "served": None}
+        served = ServedSet(n, level_state["served"])
+        if served.full():
+            level_state["round"] += 1
+            level_state["position"] = 0
+            served = ServedSet(n)
+
+        ranking = self._ranking(level, items)
+        if ranking is None or ability is None:
+            position = self._next_in_permutation(self._permutation(state, level, level_state), level_state, served)
+        else:
+            position = self._most_informative(ranking, ability, served)
+        served.add(position)
+        level_state["served"] = served.encode()
+        level_states[str(level)] = level_state
+        return items[position]
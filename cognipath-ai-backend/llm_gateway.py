@@ -0,0 +1,163 @@
+import bisect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is unbounded.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class LLMUnavailable(Exception):
+    """ Raised without calling the model: the circuit is open or every concurrency slot is taken. """
+
+
+class LLMTimeout(Exception):
+    """ Raised when a call misses its deadline. The call itself may still finish in the background. """
+
+
+class LatencyHistogram:
+    """ Fixed-bucket latency histogram with Prometheus-style cumulative counts. """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, buckets = 0, {}
+        for bound, count in zip([str(b) for b in self.buckets] + ["+Inf"], counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {"buckets": buckets, "count": cumulative, "sum": round(total, 6)}
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures. While open every call is refused; after
+    reset_timeout seconds a single trial call is let through ("half_open"), and its outcome closes
+    the circuit again or re-opens it for another reset_timeout.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def cancel_trial(self):
+        """ Gives back a half-open trial that never reached the model. """
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class LLMGateway:
+    """
+    Wraps a Gemini-style model (anything with generate_content(prompt)) and exposes the same method, so
+    callers are unchanged. Every call gets:
+    - a concurrency limit: at most max_concurrency calls run at once; a caller waits up to acquire_timeout
+      for a slot, then gets LLMUnavailable instead of queueing behind a slow model;
+    - a deadline: the caller gets LLMTimeout after timeout seconds (the slot is held until the call really ends);
+    - a circuit breaker: after repeated failures or timeouts calls fail immediately with LLMUnavailable
+      until a trial call succeeds, so callers go straight to their fallback.
+    Latencies are recorded per outcome (success/error/timeout) in histograms.
+    """
+    def __init__(self, model, max_concurrency: int = 4, timeout: float = 10.0, acquire_timeout: float = 0.5,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.acquire_timeout = acquire_timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-call")
+        self._histograms = {outcome: LatencyHistogram() for outcome in ("success", "error", "timeout")}
+        self._stats = {"calls": 0, "short_circuited": 0, "rejected_busy": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    @property
+    def healthy(self) -> bool:
+        return self.breaker.state != "open"
+
+    def generate_content(self, prompt, timeout: float = None):
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise LLMUnavailable("LLM circuit is open")
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            # Not the model's fault, so this does not count as a failure.
+            self.breaker.cancel_trial()
+            self._count("rejected_busy")
+            raise LLMUnavailable(f"all {self.max_concurrency} LLM slots are busy")
+        self._count("calls")
+        deadline = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        try:
+            future = self._executor.submit(self.model.generate_content, prompt)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            response = future.result(timeout=deadline)
+        except FutureTimeout:
+            self._histograms["timeout"].observe(time.perf_counter() - start)
+            self.breaker.record_failure()
+            raise LLMTimeout(f"LLM call exceeded its {deadline}s deadline")
+        except Exception:
+            self._histograms["error"].observe(time.perf_counter() - start)
+            self.breaker.record_failure()
+            raise
+        self._histograms["success"].observe(time.perf_counter() - start)
+        self.breaker.record_success()
+        return response
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["circuit"] = self.breaker.state
+        stats["latency_seconds"] = {outcome: histogram.snapshot() for outcome, histogram in self._histograms.items()}
+        return stats
@@ -0,0 +1,53 @@
+"""
+Structured logging for the backend. Every record is one event name plus key/value fields, written to stderr
+as one JSON object per line (LOG_FORMAT=json, the default) or as "LEVEL logger event key=value ..." text
+(LOG_FORMAT=text). LOG_LEVEL sets the threshold; per-answer events are DEBUG, so they cost one level check
+unless enabled.
+
+    logger = get_logger("agents")
+    log_event(logger, logging.INFO, "question_bank_loaded", questions=75)
+"""
+import json
+import logging
+import os
+import sys
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": round(record.created, 3), "level": record.levelname, "logger": record.name, "event": record.getMessage()}
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(f"{key}={value}" for key, value in getattr(record, "fields", {}).items())
+        line = f"{record.levelname} {record.name} {record.getMessage()} {fields}".rstrip()
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging():
+    """ Installs the handler on the "cognipath" logger once; uvicorn's own loggers are left alone. """
+    root = logging.getLogger("cognipath")
+    if root.handlers:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(TextFormatter() if os.getenv("LOG_FORMAT", "json") == "text" else JSONFormatter())
+    root.addHandler(handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    root.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    configure_logging()
+    return logging.getLogger(f"cognipath.{name}")
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields):
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
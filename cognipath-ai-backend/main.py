@@ -1,22 +1,126 @@
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
-from typing import Annotated, List, Optional
+from typing import Annotated, List, Literal, Optional
 from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
+import asyncio
+import gzip
+import json
+import logging
+import time
 import uuid
 import os
+from pydantic import ValidationError
 
-import crud, models, schemas, auth, agents
-from database import SessionLocal, engine
+import crud, async_crud, models, schemas, auth, agents, metrics, report_data, analytics
+from logs import get_logger, log_event
+from quiz_session import QuizSession
+from item_selection import ItemSelector
+from cache import LRUCache
+from database import SessionLocal, AsyncSessionLocal, engine, async_engine, add_missing_columns, get_pool_stats
 
-# Create tables if they don't exist
+logger = get_logger("main")
+
+# Create tables if they don't exist, and add columns introduced since they were created
 models.Base.metadata.create_all(bind=engine)
+add_missing_columns(engine, models.Base.metadata)
 
 # Ensure the directory for static reports exists
 os.makedirs("static/reports", exist_ok=True)
 
-app = FastAPI(title="CogniPath AI Backend")
+def load_item_parameters():
+    db = SessionLocal()
+    try:
+        adaptive_engine.irt_model.load_parameters(crud.get_item_parameters(db))
+    finally:
+        db.close()
+
+async def refresh_item_parameters(interval: float):
+    # Picks up new results of the offline calibration job (calibrate.py) without a restart.
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(load_item_parameters)
+        except Exception as e:
+            log_event(logger, logging.ERROR, "irt_parameters_refresh_failed", error=str(e))
+
+def archive_old_sessions(started_before: float, batch_size: int) -> int:
+    db = SessionLocal()
+    try:
+        archived = 0
+        while True:
+            batch = crud.archive_sessions(db, started_before=started_before, batch_size=batch_size)
+            archived += batch
+            if batch < batch_size:
+                return archived
+    finally:
+        db.close()
+
+async def run_session_archive(interval: float, max_age: float, batch_size: int):
+    # Moves the history of finished sessions older than max_age out of the hot table, one batch per transaction.
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            archived = await asyncio.to_thread(archive_old_sessions, time.time() - max_age, batch_size)
+            if archived:
+                log_event(logger, logging.INFO, "sessions_archived", sessions=archived)
+        except Exception as e:
+            log_event(logger, logging.ERROR, "session_archive_failed", error=str(e))
+
+HINT_CACHE_TTL_SECONDS = float(os.getenv("HINT_CACHE_TTL_HOURS", "168")) * 3600
+
+def load_persisted_hint(question_hash: str):
+    db = SessionLocal()
+    try:
+        return crud.get_persisted_hint(db, question_hash, max_age_seconds=HINT_CACHE_TTL_SECONDS)
+    finally:
+        db.close()
+
+def persist_hint(question_hash: str, question_text: str, hint: str):
+    db = SessionLocal()
+    try:
+        crud.save_persisted_hint(db, question_hash, question_text, hint)
+    finally:
+        db.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start filling the LLM question buffers before the first request arrives.
+    if curriculum_agent.prefetcher:
+        curriculum_agent.prefetcher.start()
+    # PNG worker processes are only spawned up front with REPORT_PNG_MODE=always; otherwise on first use, if ever.
+    if reporting_agent.png_per_answer:
+        reporting_agent.renderer.start()
+    # Agents are cheap to construct; the question bank is read here, in the background, so start-up does not wait for it.
+    # A request arriving before it finishes loads it (once) itself, on the worker thread that selects its question.
+    bank_warmup = asyncio.create_task(asyncio.to_thread(curriculum_agent.fallback_db.bank.load))
+    if os.getenv("HINT_PREWARM", "0") == "1":
+        log_event(logger, logging.INFO, "hint_prewarm_scheduled", hints=curriculum_agent.prewarm_hints())
+    load_item_parameters()
+    refresh_task = asyncio.create_task(refresh_item_parameters(float(os.getenv("IRT_PARAMS_REFRESH_SECONDS", "600"))))
+    archive_task = asyncio.create_task(run_session_archive(
+        interval=float(os.getenv("SESSION_ARCHIVE_INTERVAL_SECONDS", "3600")),
+        max_age=float(os.getenv("SESSION_ARCHIVE_AFTER_DAYS", "30")) * 86400,
+        batch_size=int(os.getenv("SESSION_ARCHIVE_BATCH_SIZE", "100")),
+    ))
+    yield
+    refresh_task.cancel()
+    archive_task.cancel()
+    bank_warmup.cancel()
+    if curriculum_agent.prefetcher:
+        curriculum_agent.prefetcher.stop()
+    curriculum_agent.hint_cache.stop()
+    if curriculum_agent.model:
+        curriculum_agent.model.shutdown()
+    reporting_agent.renderer.shutdown()
+    await async_engine.dispose()
+
+app = FastAPI(title="CogniPath AI Backend", lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # --- Middleware ---
@@ -28,6 +132,11 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Per-route latency, status codes and SQL statements per request, for /metrics (METRICS_ENABLED=0 skips all of it)
+if metrics.ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.instrument_engine(engine)
+    metrics.instrument_engine(async_engine.sync_engine)
 
 # --- Dependency to get a database session ---
 def get_db():
@@ -37,96 +146,149 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # --- Initialize AI Agents ---
 diagnostic_agent = agents.DiagnosticAgent()
 adaptive_engine = agents.AdaptiveEngine()
-curriculum_agent = agents.CurriculumAgent()
+# HINT_CACHE_PERSIST=0 keeps hints in memory only; otherwise they survive restarts in the hint_cache table.
+persist_hints = os.getenv("HINT_CACHE_PERSIST", "1") == "1"
+curriculum_agent = agents.CurriculumAgent(
+    load_hint=load_persisted_hint if persist_hints else None, save_hint=persist_hint if persist_hints else None,
+    item_selector=ItemSelector(adaptive_engine.irt_model),
+)
 motivational_agent = agents.MotivationalAgent()
 reporting_agent = agents.ReportingAgent()
+# Shareable reports by id, as (etag, gzip body); they are immutable, so entries never go stale
+shared_reports = LRUCache(maxsize=int(os.getenv("SHARED_REPORT_CACHE_SIZE", "1024")))
+SHARED_REPORT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+cohort_analytics = analytics.CohortAnalytics()
+
+def collect_llm_metrics() -> list:
+    """ The LLM gateway keeps its own call-latency histograms; /metrics exposes them as they are. """
+    if not curriculum_agent.model:
+        return []
+    name = "cognipath_llm_call_seconds"
+    lines = [f"# HELP {name} LLM gateway call latency by outcome.", f"# TYPE {name} histogram"]
+    for outcome, snapshot in sorted(curriculum_agent.model.stats()["latency_seconds"].items()):
+        lines += metrics.histogram_lines(name, ("outcome",), (outcome,), snapshot)
+    return lines
+
+metrics.register_collector(collect_llm_metrics)
+
+# --- Operations Routes ---
+# /metrics stays unauthenticated so a Prometheus scraper can read it without a token (METRICS_ENABLED=0 turns it off);
+# the JSON stats routes below are limited to ADMIN_EMAILS accounts (auth.get_current_admin).
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Operations"])
+def read_metrics():
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/db/pool/stats", tags=["Operations"])
+def read_pool_stats(current_user: Annotated[schemas.TokenData, Depends(auth.get_current_admin)]):
+    return get_pool_stats()
+
+@app.get("/auth/password-hasher/stats", tags=["Operations"])
+def read_password_hasher_stats(current_user: Annotated[schemas.TokenData, Depends(auth.get_current_admin)]):
+    return auth.password_hasher.stats()
+
+@app.get("/auth/token-cache/stats", tags=["Operations"])
+def read_token_cache_stats(current_user: Annotated[schemas.TokenData, Depends(auth.get_current_admin)]):
+    return auth.token_cache.stats()
+
+@app.get("/llm/stats", tags=["Operations"])
+def read_llm_stats(current_user: Annotated[schemas.TokenData, Depends(auth.get_current_admin)]):
+    if not curriculum_agent.model:
+        return {"enabled": False}
+    return {"enabled": True, **curriculum_agent.model.stats()}
+
+@app.get("/hints/cache/stats", tags=["Operations"])
+def read_hint_cache_stats(current_user: Annotated[schemas.TokenData, Depends(auth.get_current_admin)]):
+    return curriculum_agent.hint_cache.stats()
+
+@app.post("/hints/cache/prewarm", tags=["Operations"])
+def prewarm_hint_cache(current_user: Annotated[schemas.TokenData, Depends(auth.get_current_admin)]):
+    """ Queues an LLM call for every uncached question in the bank, so it is limited to ADMIN_EMAILS accounts. """
+    return {"scheduled": curriculum_agent.prewarm_hints()}
 
 # --- Authentication Routes ---
 @app.post("/register", response_model=schemas.UserResponse, tags=["Authentication"])
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    if crud.get_user_by_email(db, email=user.email):
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await async_crud.get_user_by_email(db, email=user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    hashed_password = await auth.password_hasher.hash(user.password)
+    return await async_crud.create_user(db=db, user=user, hashed_password=hashed_password)
 
 @app.post("/login", response_model=schemas.Token, tags=["Authentication"])
-async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: AsyncSession = Depends(get_async_db)):
+    user = await async_crud.get_user_by_email(db, email=form_data.username)
+    is_valid, new_hash = await auth.password_hasher.verify_and_update(form_data.password, user.hashed_password) if user else (False, None)
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
-    access_token = auth.create_access_token(data={"sub": user.email})
+    if new_hash:
+        # The stored hash was made with older cost parameters; replace it while we have the plain password.
+        await async_crud.update_password_hash(db, user, new_hash)
+    access_token = auth.create_access_token(data={"sub": user.email, "uid": user.id})
     return {"access_token": access_token, "token_type": "bearer"}
 
 # --- User Profile Routes ---
 @app.get("/users/me", response_model=schemas.UserResponse, tags=["Users"])
-async def read_users_me(current_user: Annotated[schemas.TokenData, Depends(auth.get_current_user)], db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=current_user.email)
+async def read_users_me(current_user: Annotated[schemas.TokenData, Depends(auth.get_current_user)], db: AsyncSession = Depends(get_async_db)):
+    user = await async_crud.get_user_by_email(db, email=current_user.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 @app.put("/users/me", response_model=schemas.UserResponse, tags=["Users"])
-async def update_user_profile(user_update: schemas.UserUpdate, current_user: Annotated[schemas.TokenData, Depends(auth.get_current_user)], db: Session = Depends(get_db)):
-    return crud.update_user(db=db, user_email=current_user.email, updates=user_update)
+async def update_user_profile(user_update: schemas.UserUpdate, current_user: Annotated[schemas.TokenData, Depends(auth.get_current_user)], db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.update_user(db=db, user_email=current_user.email, updates=user_update)
 
 # --- Learning Flow Routes ---
 @app.get("/start", tags=["Learning"])
-def start_session(current_user: Annotated[schemas.TokenData, Depends(auth.get_current_user)], db: Session = Depends(get_db), difficulty: Optional[int] = None):
-    user = crud.get_user_by_email(db, email=current_user.email)
-    crud.clear_user_history(db, user_id=user.id)  # Clear history for a fresh session
-    
-    user_progress = crud.get_user_progress(db, user_id=user.id)
+async def start_session(current_user: Annotated[schemas.TokenData, Depends(auth.get_current_user)], db: AsyncSession = Depends(get_async_db), difficulty: Optional[int] = None):
+    if current_user.user_id is not None:
+        user_id, user_progress = current_user.user_id, await async_crud.get_user_progress(db, user_id=current_user.user_id)
+        if not user_progress:
+            raise HTTPException(status_code=404, detail="User not found")
+    else:
+        user = await async_crud.get_user_by_email(db, email=current_user.email)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        user_id, user_progress = user.id, user.progress
     # Use specified difficulty, or user's last ability, or default to 1
     start_difficulty = difficulty if difficulty is not None else int(round(user_progress.ability * 4)) if user_progress and user_progress.ability > 0 else 1
+    # A fresh session: new item sampler state, so questions do not repeat until the level's bank is exhausted.
+    # Selection may read the CSV bank, so it stays off the event loop.
+    first_question, item_sampler = await run_in_threadpool(curriculum_agent.next_question, max(1, start_difficulty), ability=user_progress.ability if user_progress else None)
+    await async_crud.open_session(db, user_id=user_id, initial_mastery=adaptive_engine.bkt_model.p_L, item_sampler=item_sampler)  # Earlier sessions stay stored
     
-    first_question = curriculum_agent.generate_content(difficulty_level=max(1, start_difficulty))
     return {"first_question": first_question}
 
 @app.post("/submit", tags=["Learning"])
-def submit_answer(request: agents.SubmissionRequest, current_user: Annotated[schemas.TokenData, Depends(auth.get_current_user)], db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=current_user.email)
+async def submit_answer(request: agents.SubmissionRequest, current_user: Annotated[schemas.TokenData, Depends(auth.get_current_user)], db: AsyncSession = Depends(get_async_db)):
     is_correct = request.user_answer.lower() == request.correct_answer.lower()
     
-    # --- The Correct Logical Flow ---
-    # 1. Get current state from DB
-    user_progress = crud.get_user_progress(db, user_id=user.id)
-    current_ability = user_progress.ability if user_progress else 0.5
-
-    # 2. Calculate new ability based on the answer using the IRT model
-    new_ability = adaptive_engine.irt_model.update_ability(current_ability, is_correct, request.difficulty_level)
-    
-    # 3. Save this most recent result to the user's history
-    crud.add_user_history(db, user_id=user.id, correct=is_correct, difficulty=request.difficulty_level, ability=new_ability)
-    
-    # 4. Get the user's complete history to predict the next step
-    history = crud.get_user_history(db, user_id=user.id)
-    
-    # 5. Get the next optimal difficulty from the Adaptive Engine (using BKT and IRT)
-    next_difficulty = adaptive_engine.get_next_difficulty(user_history=history, latest_ability=new_ability)
-    
-    # 6. Update the user's overall progress in the database with the new ability and difficulty
-    crud.update_user_progress(db, user_id=user.id, new_difficulty=next_difficulty, new_ability=new_ability, was_correct=is_correct)
-
-    # 7. Analyze performance and update the cognitive fingerprint
-    cognitive_adjustments = diagnostic_agent.analyze_submission(was_correct=is_correct, time_taken=request.time_taken)
-    fingerprint = crud.update_cognitive_fingerprint(db, user_id=user.id, adjustments=cognitive_adjustments)
-    
-    # 8. Get the next question from the Curriculum Agent
-    next_question = curriculum_agent.generate_content(difficulty_level=next_difficulty, user_history=history)
+    # 1. Load state, update IRT ability, BKT mastery and the cognitive fingerprint, pick the next question from the
+    #    Curriculum Agent (a prefetched LLM question or an unseen CSV bank item; no LLM call here), and save it all in one transaction
+    result = await async_crud.record_submission(
+        db, email=current_user.email, user_id=current_user.user_id, was_correct=is_correct, difficulty=request.difficulty_level,
+        time_taken=request.time_taken, adaptive_engine=adaptive_engine, diagnostic_agent=diagnostic_agent,
+        item_id=request.item_id, select_question=curriculum_agent.next_question,
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    next_question = result["next_question"]
     
-    # 9. Generate the visual report
-    fingerprint_dict = {
-        "concentration": fingerprint.concentration, "comprehension": fingerprint.comprehension,
-        "retention": fingerprint.retention, "application": fingerprint.application
-    }
-    report = reporting_agent.generate_report(user_id=user.id, user_history=history, fingerprint_data=fingerprint_dict)
+    # 2. Queue the visual report (may wait briefly for a queue slot, so keep it off the event loop)
+    report = await run_in_threadpool(reporting_agent.generate_report, user_id=result["user_id"], abilities=result["abilities"], fingerprint_data=result["fingerprint"])
     
-    # 10. Return the complete response to the frontend
+    # 3. Return the complete response to the frontend
     return {
         "feedback": motivational_agent.get_feedback(is_correct),
         "next_question": next_question,
@@ -134,6 +296,152 @@ def submit_answer(request: agents.SubmissionRequest, current_user: Annotated[sch
         "is_correct": is_correct,
     }
 
+@app.post("/submit/batch", tags=["Learning"])
+async def submit_answers_batch(request: agents.BatchSubmissionRequest, current_user: Annotated[schemas.TokenData, Depends(auth.get_current_user)], db: AsyncSession = Depends(get_async_db)):
+    """ Replays answers queued by an offline client: one transaction, one report and one next question for the whole batch. """
+    results = [submission.user_answer.lower() == submission.correct_answer.lower() for submission in request.submissions]
+    answers = [(is_correct, submission.difficulty_level, submission.time_taken, submission.item_id) for is_correct, submission in zip(results, request.submissions)]
+
+    # 1. Apply every answer in order in memory, then write all history rows with one insert
+    result = await async_crud.record_submissions(
+        db, email=current_user.email, user_id=current_user.user_id, answers=answers,
+        adaptive_engine=adaptive_engine, diagnostic_agent=diagnostic_agent, select_question=curriculum_agent.next_question,
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # 2. One next question and one report, for the state after the last answer
+    next_question = result["next_question"]
+    report = await run_in_threadpool(reporting_agent.generate_report, user_id=result["user_id"], abilities=result["abilities"], fingerprint_data=result["fingerprint"])
+
+    return {
+        "results": [{"is_correct": is_correct} for is_correct in results],
+        "correct_answers": sum(results),
+        "feedback": motivational_agent.get_feedback(results[-1]),
+        "state": {key: result[key] for key in ("ability", "mastery", "next_difficulty", "fingerprint")},
+        "next_question": next_question,
+        "report": report,
+    }
+
+# --- WebSocket Quiz Session ---
+WS_AUTH_TIMEOUT_SECONDS = float(os.getenv("WS_AUTH_TIMEOUT_SECONDS", "10"))
+
+async def push_report_when_ready(send, result: dict):
+    # Queuing can wait for a renderer slot, so it happens here rather than in the session's receive loop.
+    report = await run_in_threadpool(reporting_agent.generate_report, user_id=result["user_id"], abilities=result["abilities"], fingerprint_data=result["fingerprint"])
+    job_id = report.get("job_id")
+    if job_id is not None:
+        future = reporting_agent.renderer.job_future(job_id)
+        if future is not None:
+            try:
+                # shield: cancelling this task (a newer report superseded it) must not cancel a render other learners may share.
+                await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+        report = reporting_agent.renderer.status(job_id)
+    elif report.get("status") != "done":
+        return  # The renderer was busy; the next answer brings a new report.
+    try:
+        await send({"type": "report", "report": report})
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # The client went away while the report was rendering.
+
+@app.websocket("/ws/quiz")
+async def quiz_websocket(websocket: WebSocket):
+    """
+    A quiz session over one WebSocket. The client authenticates once with {"type": "auth", "token": ...}, then sends
+    {"type": "start", "difficulty": optional}, {"type": "answer", ...SubmissionRequest fields} or {"type": "hint", "question_text": ...}.
+    The server replies with "ready", "question", "result" (including the next question) and "hint" messages, and pushes
+    a "report" message once the latest report is ready (right away for report data, after rendering for PNGs). Learner
+    state is read once and kept in a QuizSession; each answer costs one write transaction and no reads. A message that
+    is invalid or fails gets an "error" reply and the session stays open.
+    """
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+    async def send(message: dict):
+        async with send_lock:
+            await websocket.send_json(message)
+
+    try:
+        message = await asyncio.wait_for(websocket.receive_json(), timeout=WS_AUTH_TIMEOUT_SECONDS)
+        token = message.get("token") if isinstance(message, dict) and message.get("type") == "auth" else None
+        if not token:
+            raise ValueError("The first message must be {\"type\": \"auth\", \"token\": ...}")
+        current_user = await auth.get_current_user(token)
+    except WebSocketDisconnect:
+        return
+    except (asyncio.TimeoutError, HTTPException, ValueError):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    async with AsyncSessionLocal() as db:
+        state = await async_crud.load_submission_state(db, email=current_user.email, user_id=current_user.user_id, adaptive_engine=adaptive_engine)
+    if state is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    session = QuizSession(*state)
+    await send({"type": "ready", "state": session.state()})
+
+    report_task = None
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                kind = message.get("type")
+            except (ValueError, AttributeError):
+                await send({"type": "error", "detail": "Messages must be JSON objects with a type."})
+                continue
+
+            try:
+                if kind == "start":
+                    start = agents.QuizStartMessage.model_validate(message)
+                    initial_mastery = adaptive_engine.bkt_model.p_L
+                    first_question, item_sampler = await run_in_threadpool(curriculum_agent.next_question, session.start_difficulty(start.difficulty), ability=session.state()["ability"])
+                    async with AsyncSessionLocal() as db:
+                        session_id = await async_crud.open_session(db, user_id=session.user_id, initial_mastery=initial_mastery, item_sampler=item_sampler)
+                    session.reset(initial_mastery, item_sampler, session_id)
+                    await send({"type": "question", "question": first_question})
+
+                elif kind == "answer":
+                    request = agents.SubmissionRequest.model_validate(message)
+                    is_correct = request.user_answer.lower() == request.correct_answer.lower()
+                    history_entry, result = session.apply_answer(is_correct, request.difficulty_level, request.time_taken, adaptive_engine, diagnostic_agent, request.item_id)
+                    await run_in_threadpool(crud.select_next_question, session.progress, result, curriculum_agent.next_question)
+                    with metrics.span("db_write"):
+                        async with AsyncSessionLocal() as db:
+                            await async_crud.save_answer(db, history_entry, session.progress, session.fp)
+                    # The next question goes out now; the report follows in its own message when it is ready.
+                    next_question = result["next_question"]
+                    await send({
+                        "type": "result", "is_correct": is_correct, "feedback": motivational_agent.get_feedback(is_correct),
+                        "state": session.state(), "next_question": next_question,
+                    })
+                    if report_task:
+                        report_task.cancel()  # Only the latest report is pushed.
+                    report_task = asyncio.create_task(push_report_when_ready(send, result))
+
+                elif kind == "hint":
+                    request = agents.HintRequest.model_validate(message)
+                    hint = await run_in_threadpool(curriculum_agent.generate_hint, request.question_text)
+                    await send({"type": "hint", "hint": hint})
+
+                else:
+                    await send({"type": "error", "detail": f"Unknown message type: {kind}"})
+            except ValidationError as e:
+                await send({"type": "error", "detail": e.errors(include_url=False, include_context=False)})
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                # One bad message must not end the learner's session.
+                log_event(logger, logging.ERROR, "quiz_message_failed", user=current_user.email, type=kind, error=repr(e))
+                await send({"type": "error", "detail": "The message could not be processed."})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if report_task:
+            report_task.cancel()
+
 # --- Quiz Feature Routes ---
 @app.post("/hint", tags=["Learning"])
 def get_hint(request: agents.HintRequest, current_user: Annotated[schemas.TokenData, Depends(auth.get_current_user)]):
@@ -141,22 +449,98 @@ def get_hint(request: agents.HintRequest, current_user: Annotated[schemas.TokenD
 
 @app.post("/report-issue", tags=["Learning"])
 def report_issue(request: agents.IssueReportRequest, current_user: Annotated[schemas.TokenData, Depends(auth.get_current_user)]):
-    print(f"--- ISSUE REPORT from {current_user.email} ---")
-    print(f"Question: {request.question_text}")
-    print(f"Comment: {request.comment}")
+    log_event(logger, logging.WARNING, "issue_reported", user=current_user.email, question=request.question_text, comment=request.comment)
     return {"message": "Issue reported successfully. Thank you!"}
 
 # --- Report Routes ---
+@app.get("/reports/cache/stats", tags=["Reports"])
+def get_report_cache_stats():
+    return {**reporting_agent.renderer.stats(), "shared_reports": shared_reports.stats()}
+
+@app.get("/reports/status/{job_id}", tags=["Reports"])
+def get_report_status(job_id: str):
+    status_info = reporting_agent.renderer.status(job_id)
+    if status_info["status"] == "unknown":
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return status_info
+
+@app.get("/reports/data", tags=["Reports"])
+async def get_report_data(
+    request: Request, current_user: Annotated[schemas.TokenData, Depends(auth.get_current_user)], db: AsyncSession = Depends(get_async_db),
+    format: Literal["json", "f32"] = "json", points: int = Query(report_data.TRAJECTORY_POINTS, ge=2, le=report_data.MAX_TRAJECTORY_POINTS),
+):
+    """
+    The learner's fingerprint scores and downsampled ability trajectory, for charts drawn by the client. format=f32
+    returns little-endian float32 values instead (4 fingerprint scores, then the trajectory; X-Trajectory-Length holds
+    the full trajectory's length). Send the ETag back in If-None-Match to get a 304 while the report is unchanged.
+    """
+    state = await async_crud.load_submission_state(db, email=current_user.email, user_id=current_user.user_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    _, _, fp, history = state
+    fingerprint, abilities = report_data.fingerprint_values(fp), [h.ability for h in history]
+    etag = report_data.etag(report_data.report_key(fingerprint, abilities), points, format)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if report_data.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if format == "f32":
+        headers["X-Trajectory-Length"] = str(len(abilities))
+        body = report_data.pack_report_data(fingerprint, abilities, points)
+    else:
+        body = json.dumps(report_data.build_report_data(fingerprint, abilities, points), separators=(",", ":"))
+    return Response(content=body, media_type=report_data.FORMATS[format], headers=headers)
+
 @app.post("/reports/share", response_model=schemas.ShareableReportResponse, tags=["Reports"])
 def create_shareable_report(current_user: Annotated[schemas.TokenData, Depends(auth.get_current_user)], db: Session = Depends(get_db)):
     user = crud.get_user_by_email(db, email=current_user.email)
     report = crud.create_shareable_report(db=db, user_id=user.id)
+    shared_reports.set(report.id, (report.etag, report.body))
     return {"report_url": f"/report/{report.id}"}
 
 @app.get("/reports/share/{report_id}", response_model=schemas.ShareableReport, tags=["Reports"])
-def get_shareable_report(report_id: uuid.UUID, db: Session = Depends(get_db)):
-    report = crud.get_shareable_report(db=db, report_id=report_id)
-    if not report:
-        raise HTTPException(status_code=404, detail="Report not found")
+async def get_shareable_report(report_id: uuid.UUID, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Shared reports never change, so the stored gzip body is sent as it is (decompressed only for clients that do
+    not accept gzip), with a strong ETag and a year-long Cache-Control. Served from memory it costs no query.
+    """
+    snapshot = shared_reports.get(str(report_id))
+    if snapshot is None:
+        snapshot = await async_crud.get_shareable_report(db, report_id=str(report_id))
+        if snapshot is None:
+            raise HTTPException(status_code=404, detail="Report not found")
+        shared_reports.set(str(report_id), snapshot)
+    etag, body = snapshot
+    gzipped = "gzip" in request.headers.get("accept-encoding", "")
+    if gzipped:
+        etag = f'{etag[:-1]}-gzip"'  # A different representation needs its own strong ETag
+    headers = {"ETag": etag, "Cache-Control": SHARED_REPORT_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if report_data.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body if gzipped else gzip.decompress(body), media_type="application/json", headers=headers)
+
+# --- Cohort Analytics Routes ---
+# Cohort data spans many learners, so every analytics route is limited to ADMIN_EMAILS accounts (auth.get_current_admin).
+@app.get("/analytics/cohorts", tags=["Analytics"])
+def get_cohort_analytics(current_user: Annotated[schemas.TokenData, Depends(auth.get_current_admin)], db: Session = Depends(get_db),
+                         education_level: Optional[str] = None, group: Optional[str] = None):
+    """ Distributions, accuracy per difficulty and mastery histograms for every learner of an education level or of a group. """
+    if (education_level is None) == (group is None):
+        raise HTTPException(status_code=400, detail="Give exactly one of education_level or group")
+    report = cohort_analytics.cohort_report(db, education_level=education_level, group=group)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Cohort has no learners")
     return report
 
+@app.put("/analytics/groups/{group}", response_model=schemas.CohortGroupResponse, tags=["Analytics"])
+def set_cohort_group(group: str, request: schemas.CohortGroupUpdate, current_user: Annotated[schemas.TokenData, Depends(auth.get_current_admin)], db: Session = Depends(get_db)):
+    """ Replaces the group's members by the learners with these emails. """
+    members, unknown_emails = crud.set_cohort_members(db, group, request.emails)
+    cohort_analytics.invalidate_group(group)
+    return {"group": group, "members": members, "unknown_emails": unknown_emails}
+
+@app.get("/analytics/stats", tags=["Analytics"])
+def get_cohort_analytics_stats(current_user: Annotated[schemas.TokenData, Depends(auth.get_current_admin)]):
+    return cohort_analytics.stats()
+
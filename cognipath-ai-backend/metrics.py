@@ -0,0 +1,214 @@
+"""
+In-process metrics, served in the Prometheus text format on /metrics.
+
+Counters and histograms live in this module and are shared by all requests; histograms reuse
+llm_gateway.LatencyHistogram. span(stage) times one stage of answer processing, and MetricsMiddleware
+records per-route latency and the number of SQL statements each request executed (counted through a
+context variable, so concurrent requests do not mix). With METRICS_ENABLED=0 every recording call returns
+at once, span() hands back a shared no-op context manager and the middleware and engine listeners are not
+installed.
+"""
+import contextvars
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+from llm_gateway import LatencyHistogram, LATENCY_BUCKETS
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Stages of answer processing take from microseconds (model updates) to tens of milliseconds (database).
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50)
+
+_registry = []
+_collectors = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labels, amount: float = 1.0):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def collect(self) -> list:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in values]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *labels):
+        if not ENABLED:
+            return
+        histogram = self._children.get(labels)
+        if histogram is None:
+            with self._lock:
+                histogram = self._children.setdefault(labels, LatencyHistogram(self.buckets))
+        histogram.observe(value)
+
+    def snapshot(self, *labels) -> dict:
+        histogram = self._children.get(labels)
+        return histogram.snapshot() if histogram else None
+
+    def collect(self) -> list:
+        with self._lock:
+            children = sorted(self._children.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, histogram in children:
+            lines += histogram_lines(self.name, self.labelnames, labels, histogram.snapshot())
+        return lines
+
+
+def histogram_lines(name: str, labelnames: tuple, labels: tuple, snapshot: dict) -> list:
+    """ Exposition lines for one LatencyHistogram.snapshot() (cumulative bucket counts, sum and count). """
+    lines = []
+    for bound, count in snapshot["buckets"].items():
+        le = f'le="{bound}"'
+        lines.append(f"{name}_bucket{_labels(labelnames, labels, le)} {count}")
+    lines.append(f"{name}_sum{_labels(labelnames, labels)} {snapshot['sum']}")
+    lines.append(f"{name}_count{_labels(labelnames, labels)} {snapshot['count']}")
+    return lines
+
+
+def register_collector(collect):
+    """ Adds a callable returning exposition lines, for values that already live elsewhere (e.g. the LLM gateway). """
+    _collectors.append(collect)
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines += metric.collect()
+    for collect in _collectors:
+        try:
+            lines += collect()
+        except Exception:
+            pass  # A broken collector must not take /metrics down.
+    return "\n".join(lines) + "\n"
+
+
+# --- Metrics ---
+STAGE_SECONDS = Histogram("cognipath_stage_seconds", "Duration of one stage of answer processing.", ("stage",), STAGE_BUCKETS)
+REQUEST_SECONDS = Histogram("cognipath_http_request_seconds", "HTTP request latency by route.", ("method", "route"))
+REQUESTS = Counter("cognipath_http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status"))
+REQUEST_DB_QUERIES = Histogram("cognipath_http_request_db_queries", "SQL statements executed per HTTP request.", ("method", "route"), QUERY_COUNT_BUCKETS)
+QUESTIONS_SERVED = Counter("cognipath_questions_served_total", "Questions served, by source (llm_prefetched or csv_fallback).", ("source",))
+QUESTION_FALLBACKS = Counter("cognipath_question_fallbacks_total", "Questions served from the CSV bank, by reason.", ("reason",))
+REPORT_REQUESTS = Counter("cognipath_report_requests_total", "Report requests by outcome (data, hit, inflight_hit, render, busy).", ("outcome",))
+REPORT_RENDER_SECONDS = Histogram("cognipath_report_render_seconds", "Time from queueing a report render until the PNG is written.", ())
+
+
+# --- Spans ---
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, self.stage)
+        return False
+
+
+_NO_SPAN = nullcontext()
+
+
+def span(stage: str):
+    """ with span("db_read"): ... records the block's duration in cognipath_stage_seconds{stage="db_read"}. """
+    return _Span(stage) if ENABLED else _NO_SPAN
+
+
+# --- Per-request database statement counts ---
+class _RequestState:
+    __slots__ = ("db_queries",)
+
+    def __init__(self):
+        self.db_queries = 0
+
+
+_current_request = contextvars.ContextVar("metrics_request", default=None)
+
+
+def _count_statement(*_):
+    request = _current_request.get()
+    if request is not None:
+        request.db_queries += 1
+
+
+def instrument_engine(engine):
+    """ Counts the engine's SQL statements towards the request they run in (works for async engines' sync_engine too). """
+    if ENABLED:
+        from sqlalchemy import event
+        event.listen(engine, "before_cursor_execute", _count_statement)
+
+
+class MetricsMiddleware:
+    """ ASGI middleware: latency, status and SQL statement count per HTTP request, labelled by route template. """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = _RequestState()
+        token = _current_request.set(request)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current_request.reset(token)
+            route = getattr(scope.get("route"), "path", "other")
+            method = scope["method"]
+            REQUEST_SECONDS.observe(time.perf_counter() - start, method, route)
+            REQUESTS.inc(method, route, str(status_code))
+            REQUEST_DB_QUERIES.observe(request.db_queries, method, route)
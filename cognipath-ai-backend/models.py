@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, JSON, Text, Index, LargeBinary
 from sqlalchemy.orm import relationship
 import uuid
 from database import Base
@@ -23,6 +23,12 @@ class UserProgress(Base):
     correct_answers = Column(Integer, default=0)
     # FIX: Add the missing 'ability' column
     ability = Column(Float, default=0.5) # Start users at an average ability
+    # Running BKT mastery probability, updated once per answer. NULL means it has to be backfilled from history.
+    mastery = Column(Float, nullable=True)
+    # Per-session item sampler state (see item_selection.ItemSelector); reset by /start.
+    item_sampler = Column(JSON, nullable=True)
+    # The learner's current learning session; NULL until their first /start since sessions were introduced.
+    session_id = Column(Integer, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     user = relationship("User", back_populates="progress")
 
@@ -39,17 +45,83 @@ class CognitiveFingerprint(Base):
 # FIX: Add the missing UserHistory table model
 class UserHistory(Base):
     __tablename__ = "user_history"
+    # Per-answer reads are "newest N rows of this user's current session", a short backwards scan of the session
+    # index; (user_id, id) serves the per-learner jobs (retention, calibration).
+    __table_args__ = (
+        Index("ix_user_history_user_id_id", "user_id", "id"),
+        Index("ix_user_history_user_id_session_id_id", "user_id", "session_id", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     correct = Column(Integer)
     difficulty = Column(Integer)
     ability = Column(Float)
+    # Id of the question that was answered (CSV bank id or generated_<n>); NULL for rows written before it was recorded
+    item_id = Column(String, nullable=True)
+    # Learning session the answer belongs to; NULL for rows written before sessions were recorded
+    session_id = Column(Integer, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     user = relationship("User", back_populates="history")
 
+# One row per /start. Starting a session is an insert here instead of deleting the learner's history.
+class LearningSession(Base):
+    __tablename__ = "learning_sessions"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    started_at = Column(Float, nullable=False, index=True)  # Unix time
+    archived_at = Column(Float, nullable=True)  # Set once its history rows have moved to user_history_archive
+
+# History rows of finished, old sessions, moved out of user_history by the archive job (same columns and ids)
+class UserHistoryArchive(Base):
+    __tablename__ = "user_history_archive"
+    __table_args__ = (Index("ix_user_history_archive_user_id_id", "user_id", "id"),)
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    correct = Column(Integer)
+    difficulty = Column(Integer)
+    ability = Column(Float)
+    item_id = Column(String, nullable=True)
+    session_id = Column(Integer, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+
+# Answer counts per learner and level for history rows removed by the retention job (history_retention.py)
+class UserHistoryRollup(Base):
+    __tablename__ = "user_history_rollups"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    difficulty = Column(Integer, primary_key=True)
+    responses = Column(Integer, default=0)
+    correct = Column(Integer, default=0)
+    last_history_id = Column(Integer)  # Newest user_history.id included in the counts
+
+# Explicitly defined learner groups (e.g. a teacher's class), for cohort analytics
+class CohortMember(Base):
+    __tablename__ = "cohort_members"
+    cohort = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
 class ShareableReport(Base):
     __tablename__ = "shareable_reports"
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(Integer, ForeignKey("users.id"))
-    report_data = Column(JSON)
+    report_data = Column(JSON)  # Only set on reports created before bodies were precomputed
+    # Reports are snapshots: the complete public response (id, user name, report data) is written once, as gzip-compressed
+    # JSON, and served as-is. etag is the strong ETag of the uncompressed body.
+    body = Column(LargeBinary)
+    etag = Column(String)
+    created_at = Column(Float)
     user = relationship("User", back_populates="reports")
 
+
+class ItemParameter(Base):
+    __tablename__ = "item_parameters"
+    # "level:<n>" for a whole difficulty level; individual items get their own keys
+    item_key = Column(String, primary_key=True)
+    difficulty = Column(Float, nullable=False)
+    responses = Column(Integer, default=0)
+
+
+class HintCacheEntry(Base):
+    __tablename__ = "hint_cache"
+    # sha256 of the normalized question text (see hint_cache.hint_key)
+    question_hash = Column(String(64), primary_key=True)
+    question_text = Column(Text)
+    hint = Column(Text, nullable=False)
+    created_at = Column(Float, nullable=False)  # Unix time, compared against the hint TTL
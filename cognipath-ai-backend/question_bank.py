@@ -0,0 +1,160 @@
+import csv
+import logging
+import os
+import random
+import threading
+import time
+
+from logs import get_logger, log_event
+
+logger = get_logger("question_bank")
+
+# A row is only usable as a question if all of these fields are present.
+REQUIRED_FIELDS = ('id', 'question_text', 'option_a', 'answer')
+
+
+def _is_number(value: str, number_type):
+    try:
+        number_type(value)
+        return True
+    except ValueError:
+        return False
+
+
+def read_question_csv(csv_path: str) -> list:
+    """
+    Reads the question CSV into a list of dicts with the csv module. Columns are typed the way pandas would
+    type them (all-integer columns become int, all-numeric ones float, the rest stay str) and empty cells become None.
+    """
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = [{key: (value if value != '' else None) for key, value in row.items()} for row in csv.DictReader(f)]
+    if not rows:
+        return rows
+    for column in rows[0]:
+        values = [row[column] for row in rows if row[column] is not None]
+        for number_type in (int, float):
+            if values and all(_is_number(value, number_type) for value in values):
+                for row in rows:
+                    if row[column] is not None:
+                        row[column] = number_type(row[column])
+                break
+    return rows
+
+
+def _split_tags(raw_tags) -> list:
+    if not raw_tags:
+        return []
+    return [tag.strip().lower() for tag in str(raw_tags).split(',') if tag.strip()]
+
+
+class QuestionBankSnapshot:
+    """
+    An immutable, fully indexed view of one version of the question CSV.
+    Rows are validated once here, so every row in the indexes can be served as-is.
+    """
+    def __init__(self, questions: list, mtime: float = None):
+        self.questions = [q for q in questions if all(q.get(field) for field in REQUIRED_FIELDS)]
+        self.mtime = mtime
+        self.by_difficulty = {}
+        self.by_tag = {}
+        self.by_difficulty_and_tag = {}
+        for question in self.questions:
+            level = question.get('difficulty_level')
+            self.by_difficulty.setdefault(level, []).append(question)
+            for tag in _split_tags(question.get('tags')):
+                self.by_tag.setdefault(tag, []).append(question)
+                self.by_difficulty_and_tag.setdefault((level, tag), []).append(question)
+
+    def candidates(self, difficulty_level: int = None, tag: str = None) -> list:
+        if tag is not None:
+            tag = tag.strip().lower()
+            if difficulty_level is None:
+                return self.by_tag.get(tag, [])
+            return self.by_difficulty_and_tag.get((difficulty_level, tag), [])
+        if difficulty_level is None:
+            return self.questions
+        return self.by_difficulty.get(difficulty_level, [])
+
+
+class QuestionBank:
+    """
+    Question bank engine backed by a CSV file.
+    Draws are O(1) random picks from the per-difficulty/per-tag indexes of the current snapshot.
+    The CSV is read on first use (or by an explicit load()), not at construction, to keep process start-up fast.
+    When the CSV changes on disk, a new snapshot is built on a background thread and swapped in
+    atomically; requests keep using the previous snapshot until then, so a reload never blocks them.
+    """
+    def __init__(self, csv_path: str, reload_interval: float = 5.0):
+        self.csv_path = csv_path
+        self.reload_interval = reload_interval
+        self._reload_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._snapshot = None
+
+    @property
+    def snapshot(self) -> QuestionBankSnapshot:
+        return self._snapshot or self.load()
+
+    def load(self) -> QuestionBankSnapshot:
+        """ Loads the CSV if no snapshot exists yet; concurrent first callers share one load. """
+        with self._load_lock:
+            if self._snapshot is None:
+                self._snapshot = self._load()
+            return self._snapshot
+
+    def _load(self) -> QuestionBankSnapshot:
+        try:
+            mtime = os.path.getmtime(self.csv_path)
+            rows = read_question_csv(self.csv_path)
+            snapshot = QuestionBankSnapshot(rows, mtime=mtime)
+            log_event(logger, logging.INFO, "question_bank_loaded", questions=len(snapshot.questions), invalid_rows=len(rows) - len(snapshot.questions))
+            return snapshot
+        except FileNotFoundError:
+            log_event(logger, logging.ERROR, "question_bank_missing", path=self.csv_path)
+            return QuestionBankSnapshot([])
+
+    def reload(self) -> QuestionBankSnapshot:
+        """ Rebuilds the indexes from the CSV and swaps them in. """
+        snapshot = self._load()
+        if snapshot.questions or not self.snapshot.questions:
+            self._snapshot = snapshot
+        return self._snapshot
+
+    def _background_reload(self):
+        try:
+            self.reload()
+        except Exception as e:
+            log_event(logger, logging.ERROR, "question_bank_reload_failed", error=str(e), detail="Keeping the previous questions.")
+        finally:
+            self._reload_lock.release()
+
+    def reload_if_changed(self):
+        """
+        Checks the CSV's modification time (at most once per reload_interval) and, if it changed,
+        starts a background reload. Never waits for the reload itself.
+        """
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval:
+            return
+        self._last_check = now
+        try:
+            mtime = os.path.getmtime(self.csv_path)
+        except OSError:
+            return
+        if self._snapshot is None or mtime == self._snapshot.mtime or not self._reload_lock.acquire(blocking=False):
+            return
+        threading.Thread(target=self._background_reload, daemon=True).start()
+
+    def candidates(self, difficulty_level: int = None, tag: str = None) -> list:
+        """ All valid questions for the given level and/or tag in the current snapshot. """
+        self.reload_if_changed()
+        return self.snapshot.candidates(difficulty_level, tag)
+
+    def sample(self, difficulty_level: int = None, tag: str = None):
+        """ Returns a random valid question for the given level and/or tag, or None if there is none. """
+        self.reload_if_changed()
+        candidates = self.snapshot.candidates(difficulty_level, tag)
+        if not candidates:
+            return None
+        return random.choice(candidates)
@@ -0,0 +1,83 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from logs import get_logger, log_event
+
+logger = get_logger("question_prefetch")
+
+
+class QuestionPrefetcher:
+    """
+    Keeps a bounded buffer of already generated and parsed questions for each difficulty level.
+    Requests pop from the buffer instantly; every pop schedules background generation to top the
+    buffer back up, so the LLM round trip happens off the request path.
+    """
+    def __init__(self, generate_fn, levels=(1, 2, 3, 4), buffer_size: int = 5, workers: int = 2, retry_backoff: float = 10.0):
+        self.generate_fn = generate_fn  # generate_fn(difficulty_level) -> question dict, raises on failure
+        self.levels = tuple(levels)
+        self.buffer_size = buffer_size
+        self.workers = workers
+        self.retry_backoff = retry_backoff
+        self._buffers = {level: deque() for level in self.levels}
+        self._pending = {level: 0 for level in self.levels}
+        self._retry_after = {level: 0.0 for level in self.levels}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._stopped = False
+
+    def start(self):
+        """ Starts filling every level's buffer in the background. """
+        self._stopped = False
+        for level in self.levels:
+            self._schedule_refill(level)
+
+    def stop(self):
+        self._stopped = True
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._pending = {level: 0 for level in self.levels}
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def buffered(self, difficulty_level: int) -> int:
+        return len(self._buffers.get(difficulty_level, ()))
+
+    def pop(self, difficulty_level: int):
+        """ Returns a prefetched question for the level, or None if its buffer is currently empty. """
+        level = max(self.levels[0], min(self.levels[-1], difficulty_level))
+        with self._lock:
+            buffer = self._buffers[level]
+            question = buffer.popleft() if buffer else None
+        self._schedule_refill(level)
+        return question
+
+    def _schedule_refill(self, level: int):
+        if self._stopped:
+            return
+        with self._lock:
+            if time.monotonic() < self._retry_after[level]:
+                return
+            missing = self.buffer_size - len(self._buffers[level]) - self._pending[level]
+            if missing <= 0:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="question-prefetch")
+            self._pending[level] += missing
+            for _ in range(missing):
+                self._executor.submit(self._fill_one, level)
+
+    def _fill_one(self, level: int):
+        question = None
+        try:
+            question = self.generate_fn(level)
+        except Exception as e:
+            log_event(logger, logging.WARNING, "prefetch_failed", difficulty_level=level, error=str(e), backoff_seconds=self.retry_backoff)
+        with self._lock:
+            self._pending[level] = max(0, self._pending[level] - 1)
+            if question:
+                if len(self._buffers[level]) < self.buffer_size:
+                    self._buffers[level].append(question)
+            else:
+                self._retry_after[level] = time.monotonic() + self.retry_backoff
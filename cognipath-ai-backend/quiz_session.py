@@ -0,0 +1,56 @@
+from collections import deque
+
+import crud
+
+
+class QuizSession:
+    """
+    In-memory learner state for one WebSocket quiz session (see /ws/quiz in main.py).
+    Progress, fingerprint and the current session's recent (correct, ability) history are read once when the session opens; every answer
+    then updates them here, and only writes go to the database. While a session is open it is the authoritative
+    copy of the learner's state, so answers sent over HTTP at the same time would be overwritten.
+    """
+    def __init__(self, user_id: int, progress, fp, history: list):
+        self.user_id = user_id
+        self.progress = progress
+        self.fp = fp
+        # Only the newest crud.HISTORY_WINDOW answers are kept, like the per-answer reads of the HTTP flow.
+        self.history = deque(history, maxlen=crud.HISTORY_WINDOW)
+        self.abilities = deque((h.ability for h in self.history), maxlen=crud.HISTORY_WINDOW)
+
+    def reset(self, initial_mastery: float, item_sampler: dict = None, session_id: int = None):
+        """ Mirrors async_crud.open_session for the in-memory copy: a new session starts with no history. """
+        self.history.clear()
+        self.abilities.clear()
+        if self.progress is not None:
+            self.progress.mastery = initial_mastery
+            self.progress.item_sampler = item_sampler
+            self.progress.session_id = session_id
+
+    def start_difficulty(self, difficulty: int = None) -> int:
+        """ Same rule as /start: the requested level, else the last ability, else level 1. """
+        if difficulty is not None:
+            return max(1, min(4, int(difficulty)))
+        if self.progress is not None and self.progress.ability > 0:
+            return max(1, int(round(self.progress.ability * 4)))
+        return 1
+
+    def apply_answer(self, was_correct: bool, difficulty: int, time_taken: float, adaptive_engine, diagnostic_agent, item_id: str = None):
+        """ Applies one answer in memory. Returns (history row to persist, result dict like crud.apply_submission). """
+        history_entry, result = crud.apply_answer(self.user_id, self.progress, self.fp, self.history, was_correct, difficulty, time_taken, adaptive_engine, diagnostic_agent, item_id)
+        self.history.append(history_entry)
+        self.abilities.append(history_entry.ability)
+        result["abilities"] = list(self.abilities)
+        return history_entry, result
+
+    def state(self) -> dict:
+        progress = self.progress
+        return {
+            "ability": progress.ability if progress else None,
+            "mastery": progress.mastery if progress else None,
+            "current_difficulty": progress.current_difficulty if progress else None,
+            "questions_answered": progress.questions_answered if progress else 0,
+            "correct_answers": progress.correct_answers if progress else 0,
+            "fingerprint": {"concentration": self.fp.concentration, "comprehension": self.fp.comprehension,
+                            "retention": self.fp.retention, "application": self.fp.application} if self.fp else None,
+        }
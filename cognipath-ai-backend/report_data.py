@@ -0,0 +1,78 @@
+"""
+Report data for charts drawn by the client: the four cognitive fingerprint scores and the learner's ability
+trajectory, downsampled to at most `points` values. Served by /reports/data as JSON or as a packed array of
+little-endian float32 (the fingerprint scores in FINGERPRINT_KEYS order, then the trajectory).
+
+Every representation has a strong ETag derived from the report's content address (report_cache_key, the
+same hash that names rendered PNGs) plus the representation's parameters, so a client holding the current
+report gets a 304 with no body.
+"""
+import os
+import struct
+
+from report_renderer import report_cache_key
+
+FINGERPRINT_KEYS = ("concentration", "comprehension", "retention", "application")
+TRAJECTORY_POINTS = int(os.getenv("REPORT_TRAJECTORY_POINTS", "100"))
+MAX_TRAJECTORY_POINTS = 1000
+FORMATS = {"json": "application/json", "f32": "application/octet-stream"}
+
+
+def fingerprint_values(fp) -> dict:
+    """ The scores of a CognitiveFingerprint row (or None) as a plain dict. """
+    if fp is None:
+        return None
+    return {key: getattr(fp, key) for key in FINGERPRINT_KEYS}
+
+
+def downsample_trajectory(abilities: list, max_points: int) -> list:
+    """
+    At most max_points values, evenly spaced over the trajectory and always keeping the first and last one.
+    Point i of the result is answer round(i * (length - 1) / (max_points - 1)), so the client can place the points
+    from the original length alone.
+    """
+    n = len(abilities)
+    if n <= max_points:
+        return list(abilities)
+    if max_points < 2:
+        return list(abilities[-1:])
+    span = max_points - 1
+    return [abilities[(i * (n - 1) + span // 2) // span] for i in range(max_points)]
+
+
+def report_key(fingerprint: dict, abilities: list) -> str:
+    return report_cache_key(fingerprint or {}, abilities)
+
+
+def etag(key: str, points: int, fmt: str) -> str:
+    return f'"{key}-{points}-{fmt}"'
+
+
+def etag_matches(if_none_match: str, current: str) -> bool:
+    """ If-None-Match uses the weak comparison: W/ prefixes are ignored, and * matches any current representation. """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
+
+
+def build_report_data(fingerprint: dict, abilities: list, max_points: int = TRAJECTORY_POINTS) -> dict:
+    points = downsample_trajectory(abilities, max_points)
+    return {
+        "fingerprint": {key: round(float(fingerprint[key]), 4) for key in FINGERPRINT_KEYS} if fingerprint else None,
+        "trajectory": {"length": len(abilities), "abilities": [round(float(ability), 4) for ability in points]},
+    }
+
+
+def pack_report_data(fingerprint: dict, abilities: list, max_points: int = TRAJECTORY_POINTS) -> bytes:
+    """ The f32 representation; a learner without a fingerprint gets NaN scores. """
+    points = downsample_trajectory(abilities, max_points)
+    scores = [float(fingerprint[key]) for key in FINGERPRINT_KEYS] if fingerprint else [float("nan")] * len(FINGERPRINT_KEYS)
+    return struct.pack(f"<{len(scores) + len(points)}f", *scores, *points)
@@ -0,0 +1,257 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from logs import get_logger, log_event
+import metrics
+
+logger = get_logger("report_renderer")
+
+REPORTS_DIR = "static/reports"
+
+
+class RendererBusy(Exception):
+    """ Raised when the render queue is full and a new job could not be admitted in time. """
+
+
+def report_cache_key(fingerprint_data: dict, abilities: list) -> str:
+    """
+    Content address of a report: a hash of the fingerprint values and the ability history.
+    Values are rounded well below what the charts can show, so float noise does not defeat the cache.
+    """
+    payload = {
+        "fingerprint": sorted((key, round(float(value), 4)) for key, value in fingerprint_data.items()),
+        "abilities": [round(float(ability), 4) for ability in abilities],
+    }
+    return hashlib.sha256(json.dumps(payload, separators=(",", ":")).encode()).hexdigest()[:32]
+
+
+def _init_worker():
+    # Pay the matplotlib/seaborn import cost once per worker, not on the first report.
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot
+    import seaborn
+
+
+def render_report_png(filepath: str, fingerprint_data: dict, abilities: list) -> str:
+    """
+    Draws the fingerprint bar chart and the learning trajectory into a PNG.
+    Runs inside a worker process, so pyplot's global state is never shared between requests.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.style.use('dark_background')
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
+
+    fp_keys = [k.capitalize() for k in fingerprint_data.keys()]
+    fp_values = list(fingerprint_data.values())
+    sns.barplot(x=fp_keys, y=fp_values, hue=fp_keys, ax=ax1, palette="viridis_r", legend=False)
+    ax1.set_title('Cognitive Fingerprint'); ax1.set_ylabel('Score'); ax1.set_ylim(0, 1)
+
+    if abilities:
+        ax2.plot(range(len(abilities)), abilities, marker='o', linestyle='-', color='#61dafb')
+        ax2.set_title('Learning Trajectory'); ax2.set_xlabel('Questions Answered'); ax2.set_ylabel('Estimated Ability'); ax2.set_ylim(0, 1)
+    else:
+        ax2.text(0.5, 0.5, 'Answer questions to see your trajectory.', ha='center', va='center', color='gray')
+
+    plt.tight_layout()
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    # Write to a temporary name first so a half-written PNG is never served.
+    tmp_path = f"{filepath}.{os.getpid()}.tmp"
+    fig.savefig(tmp_path, format="png"); plt.close(fig)
+    os.replace(tmp_path, filepath)
+    return filepath
+
+
+class ReportRenderer:
+    """
+    Renders report PNGs on a process pool, off the request path.
+    Reports are content-addressed: identical fingerprint/trajectory inputs map to the same file,
+    which is reused instead of re-rendered. The directory is kept bounded by file count, total size
+    and age (oldest files go first; a cache hit refreshes a file's age).
+    At most max_pending jobs are queued or running; beyond that, submit() waits up to
+    queue_timeout seconds for a slot and then raises RendererBusy.
+    """
+    def __init__(self, output_dir: str = REPORTS_DIR, workers: int = 2, max_pending: int = 16,
+                 queue_timeout: float = 0.5, max_tracked_jobs: int = 1000, max_files: int = 5000,
+                 max_bytes: int = 500 * 1024 * 1024, max_age_seconds: float = 7 * 24 * 3600,
+                 eviction_interval: float = 60.0):
+        self.output_dir = output_dir
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.max_tracked_jobs = max_tracked_jobs
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.eviction_interval = eviction_interval
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._jobs = OrderedDict()  # job_id -> Future, oldest first
+        self._lock = threading.Lock()
+        self._eviction_lock = threading.Lock()
+        self._last_eviction = 0.0
+        self._executor = None
+        self._stats = {"hits": 0, "misses": 0, "inflight_hits": 0, "evicted_files": 0, "evicted_bytes": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # "spawn" keeps worker processes from inheriting the web server's threads and locks.
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker)
+            return self._executor
+
+    def start(self):
+        """ Spawns the worker processes up front so the first report does not pay for it. """
+        self._get_executor().submit(os.getpid)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _filepath(self, job_id: str) -> str:
+        return os.path.join(self.output_dir, f"report_{job_id}.png")
+
+    def _url(self, job_id: str) -> str:
+        return f"/{self._filepath(job_id)}"
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._lock:
+            self._stats[stat] += amount
+
+    def submit(self, fingerprint_data: dict, abilities: list) -> str:
+        """
+        Returns the job id (the report's content hash) immediately. An existing or in-flight report for
+        the same inputs is reused; otherwise a render is queued. Raises RendererBusy under backpressure.
+        """
+        job_id = report_cache_key(fingerprint_data, abilities)
+        filepath = self._filepath(job_id)
+        with self._lock:
+            future = self._jobs.get(job_id)
+        if future is not None and not future.done():
+            self._count("inflight_hits")
+            metrics.REPORT_REQUESTS.inc("inflight_hit")
+            return job_id
+        try:
+            os.utime(filepath)  # Refreshes the file's age for eviction; fails if it does not exist yet.
+            self._count("hits")
+            metrics.REPORT_REQUESTS.inc("hit")
+            return job_id
+        except FileNotFoundError:
+            pass
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise RendererBusy(f"{self.max_pending} reports are already waiting to be rendered")
+        queued_at = time.perf_counter()
+        try:
+            future = self._get_executor().submit(render_report_png, filepath, dict(fingerprint_data), list(abilities))
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._render_done(queued_at))
+        with self._lock:
+            self._jobs[job_id] = future
+            self._jobs.move_to_end(job_id)
+            while len(self._jobs) > self.max_tracked_jobs:
+                self._jobs.popitem(last=False)
+        self._count("misses")
+        metrics.REPORT_REQUESTS.inc("render")
+        self._maybe_evict()
+        return job_id
+
+    def _render_done(self, queued_at: float):
+        self._slots.release()
+        metrics.REPORT_RENDER_SECONDS.observe(time.perf_counter() - queued_at)
+
+    def job_future(self, job_id: str):
+        """ The render's Future while the job is tracked, else None (the report was cached or is long done). """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> dict:
+        """ Returns the job's state: "pending", "done", "failed" or "unknown". """
+        if not re.fullmatch(r"[A-Za-z0-9_]+", job_id):
+            return {"job_id": job_id, "status": "unknown"}
+        with self._lock:
+            future = self._jobs.get(job_id)
+        url = self._url(job_id)
+        if future is None:
+            # The job may have been queued by another worker process; the file on disk is the source of truth.
+            state = "done" if os.path.exists(self._filepath(job_id)) else "unknown"
+        elif not future.done():
+            state = "pending"
+        elif future.exception() is not None:
+            state = "failed"
+        else:
+            state = "done"
+        result = {"job_id": job_id, "status": state}
+        if state in ("pending", "done"):
+            result.update({"fingerprint_chart_url": url, "trajectory_chart_url": url})
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending_jobs"] = sum(1 for future in self._jobs.values() if not future.done())
+        lookups = stats["hits"] + stats["inflight_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["inflight_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def _maybe_evict(self):
+        now = time.monotonic()
+        if now - self._last_eviction < self.eviction_interval or not self._eviction_lock.acquire(blocking=False):
+            return
+        self._last_eviction = now
+        threading.Thread(target=self._evict_in_background, daemon=True).start()
+
+    def _evict_in_background(self):
+        try:
+            self.evict()
+        except Exception as e:
+            log_event(logger, logging.ERROR, "report_eviction_failed", error=str(e))
+        finally:
+            self._eviction_lock.release()
+
+    def evict(self):
+        """ Deletes reports that are too old, then the oldest ones until the count and size limits hold. """
+        with self._lock:
+            pending = {self._filepath(job_id) for job_id, future in self._jobs.items() if not future.done()}
+        try:
+            entries = [entry for entry in os.scandir(self.output_dir)
+                       if entry.name.startswith("report_") and entry.name.endswith(".png") and entry.path not in pending]
+        except FileNotFoundError:
+            return
+        files = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()  # Oldest first.
+
+        cutoff = time.time() - self.max_age_seconds
+        total_bytes = sum(size for _, size, _ in files)
+        remaining = len(files)
+        for mtime, size, path in files:
+            if mtime >= cutoff and remaining <= self.max_files and total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            remaining -= 1
+            total_bytes -= size
+            self._count("evicted_files")
+            self._count("evicted_bytes", size)
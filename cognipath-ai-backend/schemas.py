@@ -21,6 +21,7 @@ class UserProgressBase(BaseModel):
     correct_answers: int
     # FIX: Add the 'ability' field to the schema
     ability: float
+    mastery: Optional[float] = None
 
 class UserProgressResponse(UserProgressBase):
     id: int
@@ -70,7 +71,19 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    # Carried in the token's "uid" claim so hot paths can skip the email -> user lookup.
+    # None for tokens issued before the claim existed.
+    user_id: Optional[int] = None
     
+# --- Cohort Analytics Schemas ---
+class CohortGroupUpdate(BaseModel):
+    emails: List[EmailStr]
+
+class CohortGroupResponse(BaseModel):
+    group: str
+    members: int
+    unknown_emails: List[str]
+
 # --- Shareable Report Schemas ---
 class ShareableReport(BaseModel):
     id: uuid.UUID
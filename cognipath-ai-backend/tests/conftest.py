@@ -0,0 +1,68 @@
+"""
+The backend modules import each other as top-level modules and database.py reads DATABASE_URL at import time,
+so the backend directory goes on sys.path and the app is pointed at a throwaway SQLite database before any
+test imports them. Relative paths (data/) resolve against the backend directory.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='cognipath-test-'), 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
+
+
+def wait_for(condition, timeout: float = 5.0):
+    """ Polls condition() until it is true; fails the test after timeout seconds. For background threads and pools. """
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def on_teardown():
+    """ on_teardown(fn) registers fn (e.g. gateway.shutdown) to run after the test, newest first. """
+    callbacks = []
+    yield callbacks.append
+    for callback in reversed(callbacks):
+        callback()
+
+
+@pytest.fixture
+def db():
+    """ A session on freshly created tables, dropped again after the test. """
+    import models
+    from database import SessionLocal, engine
+    models.Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        models.Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def make_learners(db, monkeypatch):
+    """ make_learners(count) registers learners (without bcrypt) and opens a session for each; returns the users. """
+    import auth, crud, schemas
+    monkeypatch.setattr(auth, "get_password_hash", lambda password: "not-a-real-hash")
+    created = []
+    def make(count: int) -> list:
+        users = []
+        for _ in range(count):
+            n = len(created)
+            user = crud.create_user(db, schemas.UserCreate(email=f"learner{n}@example.com", name=f"Learner {n}", password="pw", education_level="test"))
+            crud.open_session(db, user.id)
+            created.append(user)
+            users.append(user)
+        return users
+    return make
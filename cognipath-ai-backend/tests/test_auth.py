@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import auth, schemas
+
+
+def test_admin_routes_require_an_allow_listed_account(monkeypatch):
+    monkeypatch.setattr(auth, "ADMIN_EMAILS", frozenset({"ops@example.com"}))
+
+    admin = asyncio.run(auth.get_current_admin(schemas.TokenData(email="Ops@Example.com", user_id=1)))
+    assert admin.user_id == 1
+
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(auth.get_current_admin(schemas.TokenData(email="learner@example.com", user_id=2)))
+    assert rejected.value.status_code == 403
+
+
+@pytest.mark.parametrize("path", ["/db/pool/stats", "/auth/password-hasher/stats", "/auth/token-cache/stats", "/llm/stats", "/hints/cache/stats"])
+def test_operations_stats_are_limited_to_admins(make_learners, monkeypatch, path):
+    import main
+    monkeypatch.setattr(auth, "ADMIN_EMAILS", frozenset({"learner0@example.com"}))
+    admin, learner = make_learners(2)
+    client = TestClient(main.app)
+
+    def get(user=None):
+        headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': user.email, 'uid': user.id})}"} if user else {}
+        return client.get(path, headers=headers).status_code
+
+    assert (get(), get(learner), get(admin)) == (401, 403, 200)
@@ -0,0 +1,72 @@
+import random
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from ai_models.bkt_model import BKTModel
+from ai_models.irt_model import IRTModel
+
+
+def make_histories(learners: int, max_history: int, seed: int):
+    rng = random.Random(seed)
+    lengths = [rng.randint(0, max_history) for _ in range(learners)]
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    correct = np.array([rng.random() < 0.6 for _ in range(offsets[-1])], dtype=bool)
+    difficulties = np.array([rng.randint(1, 4) for _ in range(offsets[-1])], dtype=np.int64)
+    item_keys = [IRTModel.item_key(rng.randint(1, 40)) if rng.random() < 0.8 else None for _ in range(offsets[-1])]
+    return correct, difficulties, item_keys, offsets
+
+
+def calibrated_model(seed: int) -> IRTModel:
+    rng = random.Random(seed)
+    irt = IRTModel()
+    parameters = {IRTModel.level_key(level): rng.uniform(-1, 1) for level in (1, 3)}
+    parameters.update({IRTModel.item_key(item): rng.uniform(-2, 2) for item in range(1, 40, 2)})
+    irt.load_parameters(parameters)
+    return irt
+
+
+@pytest.mark.parametrize("irt", [IRTModel(), calibrated_model(0)], ids=["nominal", "calibrated"])
+def test_update_ability_batch_matches_scalar(irt):
+    correct, difficulties, item_keys, _ = make_histories(1, 500, seed=1)
+    abilities = np.random.default_rng(2).uniform(0.05, 0.95, len(correct))
+
+    batch = irt.update_ability_batch(abilities, correct, difficulties, item_keys=item_keys)
+
+    scalar = [irt.update_ability(float(a), bool(c), int(d), item_key=k) for a, c, d, k in zip(abilities, correct, difficulties, item_keys)]
+    np.testing.assert_allclose(batch, scalar, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("irt", [IRTModel(), calibrated_model(3)], ids=["nominal", "calibrated"])
+def test_replay_abilities_batch_matches_scalar(irt):
+    correct, difficulties, item_keys, offsets = make_histories(50, 60, seed=4)
+
+    batch = irt.replay_abilities_batch(correct, difficulties, offsets, item_keys=item_keys)
+
+    scalar = []
+    for i in range(len(offsets) - 1):
+        ability = 0.5
+        for j in range(offsets[i], offsets[i + 1]):
+            ability = irt.update_ability(ability, bool(correct[j]), int(difficulties[j]), item_key=item_keys[j])
+        scalar.append(ability)
+    np.testing.assert_allclose(batch, scalar, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("irt", [IRTModel(), calibrated_model(5)], ids=["nominal", "calibrated"])
+def test_next_item_difficulty_batch_matches_scalar(irt):
+    abilities = np.concatenate([np.linspace(0.0, 1.0, 101), [0.125, 0.375, 0.625, 0.875]])
+
+    batch = irt.get_next_item_difficulty_batch(abilities)
+
+    assert batch.tolist() == [irt.get_next_item_difficulty(float(a)) for a in abilities]
+
+
+def test_bkt_mastery_batch_matches_scalar():
+    bkt = BKTModel()
+    correct, _, _, offsets = make_histories(50, 60, seed=6)
+
+    batch = bkt.get_mastery_probability_batch(correct, offsets)
+
+    scalar = [bkt.get_mastery_probability([SimpleNamespace(correct=bool(c)) for c in correct[offsets[i]:offsets[i + 1]]]) for i in range(len(offsets) - 1)]
+    np.testing.assert_allclose(batch, scalar, rtol=0, atol=1e-12)
@@ -0,0 +1,54 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import agents, crud, models
+from ai_models.bkt_model import BKTModel
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_update_matches_replay(seed):
+    rng = random.Random(seed)
+    bkt = BKTModel(p_init=rng.uniform(0.05, 0.5), p_transit=rng.uniform(0.01, 0.3), p_slip=rng.uniform(0.01, 0.3), p_guess=rng.uniform(0.01, 0.3))
+    answers = [rng.random() < 0.6 for _ in range(rng.randint(0, 300))]
+
+    mastery = bkt.p_L
+    for correct in answers:
+        mastery = bkt.update(mastery, correct)
+
+    replayed = bkt.get_mastery_probability([SimpleNamespace(correct=correct) for correct in answers])
+    assert abs(mastery - replayed) < 1e-12
+
+
+def test_backfill_after_incremental_submissions_finds_no_mismatches(db, make_learners):
+    rng = random.Random(0)
+    adaptive_engine, diagnostic_agent = agents.AdaptiveEngine(), agents.DiagnosticAgent()
+    users = make_learners(5)
+    for _ in range(40):
+        for user in users:
+            crud.record_submission(db, email=user.email, user_id=user.id, was_correct=rng.random() < 0.6, difficulty=rng.randint(1, 4),
+                                   time_taken=rng.uniform(5, 60), adaptive_engine=adaptive_engine, diagnostic_agent=diagnostic_agent)
+
+    assert crud.backfill_user_mastery(db, adaptive_engine.bkt_model, only_missing=False) == []
+
+
+def test_missing_mastery_is_backfilled_from_the_complete_history(db, make_learners, monkeypatch):
+    monkeypatch.setattr(crud, "HISTORY_WINDOW", 5)
+    rng = random.Random(1)
+    adaptive_engine, diagnostic_agent = agents.AdaptiveEngine(), agents.DiagnosticAgent()
+    user, = make_learners(1)
+    progress = crud.get_user_progress(db, user.id)
+    answers = [rng.random() < 0.5 for _ in range(30)]
+    # Rows written before mastery was stored: more of them than the per-answer read window.
+    db.add_all(models.UserHistory(user_id=user.id, session_id=progress.session_id, correct=correct, difficulty=2, ability=0.5) for correct in answers)
+    db.commit()
+    assert progress.mastery is None
+
+    crud.record_submission(db, email=user.email, user_id=user.id, was_correct=True, difficulty=2, time_taken=10,
+                           adaptive_engine=adaptive_engine, diagnostic_agent=diagnostic_agent)
+
+    bkt = adaptive_engine.bkt_model
+    expected = bkt.update(bkt.get_mastery_probability([SimpleNamespace(correct=correct) for correct in answers]), True)
+    assert abs(crud.get_user_progress(db, user.id).mastery - expected) < 1e-12
+    assert crud.backfill_user_mastery(db, bkt, only_missing=False) == []
@@ -0,0 +1,49 @@
+import threading
+
+import models
+from analytics import CohortAnalytics
+from conftest import wait_for
+
+
+def add_answer(db, user, history_id: int, correct: bool, difficulty: int = 2):
+    db.add(models.UserHistory(id=history_id, user_id=user.id, correct=int(correct), difficulty=difficulty, ability=0.5))
+    db.commit()
+
+
+def level_counts(report: dict) -> dict:
+    return {level["difficulty"]: (level["answers"], level["correct"]) for level in report["accuracy_by_difficulty"]}
+
+
+def test_rows_committed_after_a_higher_id_are_counted_once(db, make_learners):
+    user, = make_learners(1)
+    analytics = CohortAnalytics(refresh_seconds=0, id_lookback=100)
+    add_answer(db, user, 10, correct=True)
+    assert level_counts(analytics.cohort_report(db, education_level="test")) == {2: (1, 1)}
+
+    # Id 12 commits first, id 11 (allocated earlier, by a slower transaction) after it has been seen.
+    add_answer(db, user, 12, correct=False)
+    assert level_counts(analytics.cohort_report(db, education_level="test")) == {2: (2, 1)}
+    add_answer(db, user, 11, correct=True)
+    assert level_counts(analytics.cohort_report(db, education_level="test")) == {2: (3, 2)}
+    assert level_counts(analytics.cohort_report(db, education_level="test")) == {2: (3, 2)}
+
+    # Ids further back than the lookback are not re-read; a full rebuild agrees with the incremental counts.
+    add_answer(db, user, 500, correct=True)
+    analytics.cohort_report(db, education_level="test")
+    assert analytics._snapshot.history.floor == 400 and analytics._snapshot.history.recent == {500}
+    assert level_counts(CohortAnalytics().cohort_report(db, education_level="test")) == {2: (4, 3)}
+
+
+def test_full_rebuild_runs_off_the_request_thread(db, make_learners):
+    make_learners(2)
+    analytics = CohortAnalytics(full_refresh_seconds=0)
+    analytics.cohort_report(db, education_level="test")
+    rebuild_threads = []
+    build = analytics._build
+    analytics._build = lambda session: rebuild_threads.append(threading.current_thread()) or build(session)
+
+    report = analytics.cohort_report(db, education_level="test")
+
+    assert report["learners"] == 2
+    wait_for(lambda: analytics.stats()["full_refreshes"] == 2)
+    assert rebuild_threads and threading.current_thread() not in rebuild_threads
@@ -0,0 +1,73 @@
+import random
+import time
+
+from sqlalchemy import func, select
+
+import agents, crud, models
+from history_retention import run_retention
+
+
+def answer(db, user, rng: random.Random, count: int, engine: agents.AdaptiveEngine):
+    for _ in range(count):
+        crud.record_submission(db, email=user.email, user_id=user.id, was_correct=rng.random() < 0.6, difficulty=rng.randint(1, 4),
+                               time_taken=rng.uniform(5, 60), adaptive_engine=engine, diagnostic_agent=agents.DiagnosticAgent())
+
+
+def history_rows(db, table, user_id: int) -> list:
+    return db.execute(select(table.id, table.correct, table.difficulty, table.ability, table.item_id, table.session_id)
+                      .filter(table.user_id == user_id).order_by(table.id)).all()
+
+
+def answer_totals(db, user_id: int) -> dict:
+    """ (answers, correct) per level over live history, archive and rollups, as cohort analytics counts them. """
+    totals = {}
+    for query in crud.answer_count_queries(up_to_id=10 ** 9):
+        for row_user_id, difficulty, answers, correct in db.execute(query):
+            if row_user_id == user_id:
+                level = totals.setdefault(difficulty, [0, 0])
+                level[0] += answers
+                level[1] += correct
+    return totals
+
+
+def test_archived_sessions_leave_user_history_and_keep_their_ids(db, make_learners):
+    rng, engine = random.Random(0), agents.AdaptiveEngine()
+    user, = make_learners(1)
+    old_session = crud.get_user_progress(db, user.id).session_id
+    answer(db, user, rng, 12, engine)
+    old_rows = history_rows(db, models.UserHistory, user.id)
+    current_session = crud.open_session(db, user.id)
+    answer(db, user, rng, 5, engine)
+    db.query(models.LearningSession).filter(models.LearningSession.id == old_session).update({models.LearningSession.started_at: 0})
+    db.commit()
+
+    assert crud.archive_sessions(db, started_before=time.time()) == 1
+
+    live = history_rows(db, models.UserHistory, user.id)
+    assert {row.session_id for row in live} == {current_session} and len(live) == 5
+    assert history_rows(db, models.UserHistoryArchive, user.id) == old_rows
+    assert db.get(models.LearningSession, old_session).archived_at is not None
+    # The current session is never archived, however old; a second run finds nothing left to do.
+    db.query(models.LearningSession).update({models.LearningSession.started_at: 0})
+    db.commit()
+    assert crud.archive_sessions(db, started_before=time.time()) == 0
+
+
+def test_retention_rollups_preserve_per_user_totals(db, make_learners, monkeypatch):
+    monkeypatch.setattr(crud, "HISTORY_WINDOW", 10)
+    rng, engine = random.Random(1), agents.AdaptiveEngine()
+    users = make_learners(3)
+    for user, count in zip(users, (40, 25, 8)):
+        answer(db, user, rng, count, engine)
+    before = {user.id: answer_totals(db, user.id) for user in users}
+    mastery_before = {user.id: crud.get_user_progress(db, user.id).mastery for user in users}
+
+    removed = run_retention(db, keep_last=15, bkt_model=engine.bkt_model)
+
+    assert removed == {users[0].id: 25, users[1].id: 10}
+    for user, kept in zip(users, (15, 15, 8)):
+        live = db.scalar(select(func.count()).select_from(models.UserHistory).filter(models.UserHistory.user_id == user.id))
+        assert live == kept
+        assert answer_totals(db, user.id) == before[user.id]
+        assert crud.get_user_progress(db, user.id).mastery == mastery_before[user.id]
+    assert run_retention(db, keep_last=15, bkt_model=engine.bkt_model) == {}
@@ -0,0 +1,66 @@
+from ai_models.irt_model import IRTModel
+from item_selection import ItemSelector, SeededPermutation
+
+ITEMS = [{"id": n} for n in range(16)]
+
+
+def draw(selector: ItemSelector, state: dict, count: int, ability: float = None, items: list = ITEMS) -> list:
+    return [selector.select(1, items, ability, state)["id"] for _ in range(count)]
+
+
+def test_no_repeats_within_a_pass():
+    selector = ItemSelector(IRTModel())
+    for seed in range(50):
+        state = ItemSelector.new_state(seed=seed)
+        first_pass, second_pass = draw(selector, state, len(ITEMS)), draw(selector, state, len(ITEMS))
+        assert sorted(first_pass) == sorted(second_pass) == [item["id"] for item in ITEMS]
+
+
+def test_orders_differ_across_seeds_and_passes():
+    selector = ItemSelector(IRTModel())
+    orders = set()
+    for seed in range(50):
+        state = ItemSelector.new_state(seed=seed)
+        first_pass, second_pass = draw(selector, state, len(ITEMS)), draw(selector, state, len(ITEMS))
+        assert first_pass != second_pass  # An exhausted level is reshuffled, not replayed
+        orders.add(tuple(first_pass))
+    assert len(orders) == 50
+
+
+def test_orders_are_not_rotations():
+    selector = ItemSelector(IRTModel())
+    for seed in range(50):
+        order = draw(selector, ItemSelector.new_state(seed=seed), len(ITEMS))
+        steps = {(b - a) % len(ITEMS) for a, b in zip(order, order[1:])}
+        assert len(steps) > 1
+
+
+def test_calibrated_selection_does_not_repeat_and_prefers_informative_items():
+    irt = IRTModel()
+    irt.load_parameters({IRTModel.item_key(item["id"]): item["id"] / 16 for item in ITEMS})
+    selector = ItemSelector(irt, top_k=3)
+    state = ItemSelector.new_state(seed=1)
+
+    first = draw(selector, state, 1, ability=0.5)[0]
+    rest = draw(selector, state, len(ITEMS) - 1, ability=0.5)
+
+    assert first in (7, 8, 9)  # Among the top_k nearest to the ability
+    assert sorted([first] + rest) == [item["id"] for item in ITEMS]
+
+
+def test_seeded_permutation_is_a_bijection_for_any_size():
+    for n in (1, 2, 3, 15, 16, 17, 1000, 20011):
+        assert sorted(SeededPermutation(n, "7:1:0")[i] for i in range(n)) == list(range(n))
+
+
+def test_state_stays_small_for_large_banks():
+    items = [{"id": n} for n in range(20000)]
+    selector = ItemSelector(IRTModel())
+    state = ItemSelector.new_state(seed=3)
+
+    served = draw(selector, state, 500, items=items)
+
+    assert len(set(served)) == 500
+    level_state = state["levels"]["1"]
+    assert set(level_state) == {"n", "round", "position", "served"}
+    assert len(level_state["served"]) <= 4 * (20000 // 8 // 3 + 1)  # base64 of the n/8-byte bitset
@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.stub_llm import StubModel
+from conftest import wait_for
+from hint_cache import HintCache
+from llm_gateway import LLMGateway, LLMTimeout, LLMUnavailable
+
+HINT_PROMPT = "Provide a short, one-sentence hint. Question: What is 10% of 50?"
+
+
+@pytest.fixture
+def make_gateway(on_teardown):
+    def make(model, **kwargs):
+        gateway = LLMGateway(model, **kwargs)
+        on_teardown(gateway.shutdown)
+        return gateway
+    return make
+
+
+def test_call_past_its_deadline_raises_timeout(make_gateway):
+    gateway = make_gateway(StubModel(delay=1.0), timeout=0.05)
+
+    start = time.perf_counter()
+    with pytest.raises(LLMTimeout):
+        gateway.generate_content(HINT_PROMPT)
+
+    assert time.perf_counter() - start < 0.5
+    assert gateway.stats()["latency_seconds"]["timeout"]["count"] == 1
+
+
+def test_circuit_opens_after_repeated_failures_and_recovers_through_half_open(make_gateway):
+    model = StubModel(delay=0)
+    model.failing = True
+    gateway = make_gateway(model, failure_threshold=2, reset_timeout=0.1)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            gateway.generate_content(HINT_PROMPT)
+    assert gateway.breaker.state == "open" and not gateway.healthy
+    with pytest.raises(LLMUnavailable):
+        gateway.generate_content(HINT_PROMPT)
+    assert model.calls == 2  # Refused without calling the model
+
+    # After reset_timeout a single trial goes through; a failing trial re-opens the circuit.
+    time.sleep(0.12)
+    assert gateway.breaker.state == "half_open"
+    with pytest.raises(RuntimeError):
+        gateway.generate_content(HINT_PROMPT)
+    assert gateway.breaker.state == "open"
+
+    time.sleep(0.12)
+    model.failing = False
+    assert gateway.generate_content(HINT_PROMPT).text
+    assert gateway.breaker.state == "closed"
+    assert gateway.stats()["short_circuited"] == 1
+
+
+def test_call_is_rejected_when_every_slot_is_busy(make_gateway):
+    model = StubModel(delay=0.5)
+    gateway = make_gateway(model, max_concurrency=1, acquire_timeout=0.05)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        running = executor.submit(gateway.generate_content, HINT_PROMPT)
+        wait_for(lambda: model.calls == 1)
+        with pytest.raises(LLMUnavailable):
+            gateway.generate_content(HINT_PROMPT)
+        assert running.result().text
+
+    assert model.calls == 1
+    assert gateway.stats()["rejected_busy"] == 1
+    assert gateway.breaker.state == "closed"  # A busy gateway is not the model's fault
+
+
+def test_concurrent_misses_for_one_question_make_a_single_llm_call(make_gateway):
+    model = StubModel(delay=0)
+    gateway = make_gateway(model)
+    release = threading.Event()
+
+    def generate(question_text: str) -> str:
+        release.wait(5)
+        return gateway.generate_content(f"Question: {question_text}").text
+
+    cache = HintCache(generate)
+    callers = 8
+    # Copies differing only in case and whitespace normalize to the same key.
+    questions = [("What is 10%  of 50?" if n % 2 else "what is 10% of 50?") for n in range(callers)]
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        futures = [executor.submit(cache.get, question) for question in questions]
+        wait_for(lambda: cache.stats()["coalesced"] == callers - 1)
+        release.set()
+        hints = [future.result() for future in futures]
+
+    assert model.calls == 1
+    assert len(set(hints)) == 1
+    assert cache.stats()["generated"] == 1
+    assert cache.get("What is 10% of 50?") == hints[0] and model.calls == 1
+
+
+def test_miss_racing_a_finished_leader_uses_its_hint():
+    calls = []
+    cache = HintCache(lambda question_text: calls.append(question_text) or "hint")
+    cache.get("What is 10% of 50?")
+    lookup = cache._cache.get
+    # The first lookup misses as if it ran just before the leader cached its hint.
+    misses = iter([True])
+    cache._cache.get = lambda key, default=None: None if next(misses, False) else lookup(key, default)
+
+    assert cache.get("What is 10% of 50?") == "hint"
+    assert len(calls) == 1
@@ -0,0 +1,41 @@
+import pytest
+
+import agents
+from benchmarks.stub_llm import StubModel
+from conftest import wait_for
+
+
+@pytest.fixture
+def make_agent(monkeypatch, on_teardown):
+    monkeypatch.setenv("QUESTION_PREFETCH_SIZE", "2")
+    def make(model):
+        agent = agents.CurriculumAgent(model=model)
+        on_teardown(agent.model.shutdown)
+        on_teardown(agent.prefetcher.stop)
+        return agent
+    return make
+
+
+def test_questions_are_served_from_the_prefetch_buffer(make_agent):
+    model = StubModel(delay=0)
+    agent = make_agent(model)
+    agent.prefetcher.start()
+    wait_for(lambda: all(agent.prefetcher.buffered(level) == 2 for level in (1, 2, 3, 4)))
+    calls_before = model.calls
+
+    question = agent.generate_content(3)
+
+    assert question["id"].startswith("generated_") and question["difficulty_level"] == 3
+    # Serving did not wait for the model; the refill happens in the background.
+    wait_for(lambda: agent.prefetcher.buffered(3) == 2)
+    assert model.calls == calls_before + 1
+
+
+def test_an_empty_buffer_falls_back_to_the_question_bank(make_agent):
+    model = StubModel(delay=0)
+    agent = make_agent(model)
+
+    question = agent.generate_content(2)
+
+    assert not str(question["id"]).startswith("generated_")
+    assert question["difficulty_level"] == 2
@@ -0,0 +1,48 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import auth
+
+
+@pytest.fixture
+def quiz(make_learners):
+    import main
+    user, = make_learners(1)
+    token = auth.create_access_token({"sub": user.email, "uid": user.id})
+    # No lifespan: the session only needs the database and the CSV bank, which loads on first use.
+    with TestClient(main.app).websocket_connect("/ws/quiz") as websocket:
+        websocket.send_json({"type": "auth", "token": token})
+        assert websocket.receive_json()["type"] == "ready"
+        yield websocket
+
+
+def answer(question: dict, **fields) -> dict:
+    return {"type": "answer", "user_answer": "a", "correct_answer": question["correct_answer"], "time_taken": 5,
+            "difficulty_level": question["difficulty_level"], "question_id": question["id"], **fields}
+
+
+@pytest.mark.parametrize("message", [
+    {"type": "start", "difficulty": "three"},
+    {"type": "start", "difficulty": 9},
+    {"type": "start", "difficulty": [1]},
+])
+def test_malformed_start_gets_an_error_and_the_session_continues(quiz, message):
+    quiz.send_json(message)
+    assert quiz.receive_json()["type"] == "error"
+
+    quiz.send_json({"type": "start", "difficulty": "3"})  # Numeric strings are accepted
+    question = quiz.receive_json()
+    assert question["type"] == "question" and question["question"]["difficulty_level"] == 3
+
+
+def test_malformed_answer_gets_an_error_and_the_session_continues(quiz):
+    quiz.send_json({"type": "start"})
+    question = quiz.receive_json()["question"]
+
+    for message in (answer(question, time_taken="slow"), answer(question, difficulty_level=None), {"type": "answer"}, ["answer"]):
+        quiz.send_json(message)
+        assert quiz.receive_json()["type"] == "error"
+
+    quiz.send_json(answer(question))
+    result = quiz.receive_json()
+    assert result["type"] == "result" and result["state"]["questions_answered"] == 1
@@ -0,0 +1,15 @@
+import gzip
+import json
+
+import crud
+
+
+def test_shared_report_body_carries_chart_data_not_png_urls(db, make_learners):
+    # The body is served as immutable for a year, longer than a rendered PNG stays cached.
+    user, = make_learners(1)
+
+    report = crud.create_shareable_report(db, user.id)
+
+    report_data = json.loads(gzip.decompress(report.body))["report_data"]
+    assert "fingerprint" in report_data
+    assert not [key for key in report_data if key.endswith("_url")]
@@ -0,0 +1,37 @@
+import random
+
+from sqlalchemy import select
+
+import agents, crud, models
+
+
+def learner_state(db, user_id: int) -> tuple:
+    db.expire_all()
+    progress = crud.get_user_progress(db, user_id)
+    fp = crud.get_cognitive_fingerprint(db, user_id)
+    history = db.execute(
+        select(models.UserHistory.correct, models.UserHistory.difficulty, models.UserHistory.ability, models.UserHistory.item_id)
+        .filter(models.UserHistory.user_id == user_id).order_by(models.UserHistory.id)
+    ).all()
+    return (
+        (progress.current_difficulty, progress.ability, progress.mastery, progress.questions_answered, progress.correct_answers),
+        (fp.concentration, fp.comprehension, fp.retention, fp.application),
+        [tuple(row) for row in history],
+    )
+
+
+def test_batch_submission_matches_submitting_one_by_one(db, make_learners):
+    rng = random.Random(0)
+    adaptive_engine, diagnostic_agent = agents.AdaptiveEngine(), agents.DiagnosticAgent()
+    answers = [(rng.random() < 0.6, rng.randint(1, 4), rng.uniform(5, 60), str(rng.randint(1, 80))) for _ in range(60)]
+    one_by_one, batched = make_learners(2)
+
+    for was_correct, difficulty, time_taken, item_id in answers:
+        single = crud.record_submission(db, email=one_by_one.email, user_id=one_by_one.id, was_correct=was_correct, difficulty=difficulty,
+                                        time_taken=time_taken, adaptive_engine=adaptive_engine, diagnostic_agent=diagnostic_agent, item_id=item_id)
+    batch = crud.record_submissions(db, email=batched.email, user_id=batched.id, answers=answers,
+                                    adaptive_engine=adaptive_engine, diagnostic_agent=diagnostic_agent)
+
+    assert learner_state(db, one_by_one.id) == learner_state(db, batched.id)
+    assert {key: single[key] for key in ("ability", "mastery", "next_difficulty", "fingerprint", "abilities")} == \
+           {key: batch[key] for key in ("ability", "mastery", "next_difficulty", "fingerprint", "abilities")}
@@ -117,13 +117,14 @@ function QuizPage({ user, token, onLogout, refreshUser }) {
                 user_answer: selectedOption, 
                 correct_answer: question.correct_answer, 
                 time_taken: timeTaken,
-                difficulty_level: question.difficulty_level 
+                difficulty_level: question.difficulty_level,
+                question_id: question.id != null ? String(question.id) : null
             });
             
             const data = response.data;
             setFeedback(data.feedback); 
             setIsCorrect(data.is_correct);
-            localStorage.setItem('latest_report', JSON.stringify(data.report));
+            if (data.report?.data_url || data.report?.fingerprint_chart_url) localStorage.setItem('latest_report', JSON.stringify(data.report));
 
             setTimeout(() => {
                 setQuestion(data.next_question);
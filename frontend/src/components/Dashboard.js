@@ -1,4 +1,5 @@
-import React from 'react';
+import React, { useState, useEffect } from 'react';
+import { TrajectoryChart } from './ReportCharts';
 import './Dashboard.css';
 
 const StatBar = ({ label, score, color }) => {
@@ -16,28 +17,32 @@ const StatBar = ({ label, score, color }) => {
     );
 };
 
-const Dashboard = ({ progress, fingerprint, latestReport }) => {
+const Dashboard = ({ progress, fingerprint, api }) => {
+    const [reportData, setReportData] = useState(null);
+    const questionsAnswered = progress?.questions_answered;
+
+    // Charts are drawn here from /reports/data; the browser revalidates it with its ETag, so an unchanged report costs a 304.
+    useEffect(() => {
+        if (!api) return;
+        api.get('/reports/data')
+            .then((response) => setReportData(response.data))
+            .catch((error) => console.error('Could not load report data', error));
+    }, [api, questionsAnswered]);
+
     if (!progress || !fingerprint) return <div className="dashboard-container">Loading dashboard...</div>;
 
     const accuracy = progress.questions_answered > 0 ? ((progress.correct_answers / progress.questions_answered) * 100).toFixed(1) : 0;
-    const fingerprintUrl = latestReport ? `${"http://127.0.0.1:8000"}${latestReport.fingerprint_chart_url}` : null;
-    const trajectoryUrl = latestReport ? `${"http://127.0.0.1:8000"}${latestReport.trajectory_chart_url}` : null;
+    const scores = reportData?.fingerprint || fingerprint;
 
     return (
         <div className="dashboard-container">
             <div className="dashboard-grid">
                 <div className="dashboard-section">
                     <h4>Cognitive Fingerprint</h4>
-                    {fingerprintUrl ? (
-                         <img src={fingerprintUrl} alt="Cognitive Fingerprint Chart" className="report-chart" />
-                    ) : (
-                        <>
-                        <StatBar label="Comprehension" score={fingerprint.comprehension} color="#61dafb" />
-                        <StatBar label="Application" score={fingerprint.application} color="#28a745" />
-                        <StatBar label="Concentration" score={fingerprint.concentration} color="#ffc107" />
-                        <StatBar label="Retention" score={fingerprint.retention} color="#dc3545" />
-                        </>
-                    )}
+                    <StatBar label="Comprehension" score={scores.comprehension} color="#61dafb" />
+                    <StatBar label="Application" score={scores.application} color="#28a745" />
+                    <StatBar label="Concentration" score={scores.concentration} color="#ffc107" />
+                    <StatBar label="Retention" score={scores.retention} color="#dc3545" />
                 </div>
                 <div className="dashboard-section">
                     <h4>Overall Progress</h4>
@@ -52,9 +57,7 @@ const Dashboard = ({ progress, fingerprint, latestReport }) => {
                             <span className="metric-value">{progress.current_difficulty}</span><span className="metric-label">Current Level</span>
                         </div>
                     </div>
-                     {trajectoryUrl && (
-                        <img src={trajectoryUrl} alt="Learning Trajectory Chart" className="report-chart trajectory-chart" />
-                    )}
+                     {reportData && <TrajectoryChart trajectory={reportData.trajectory} />}
                 </div>
             </div>
         </div>
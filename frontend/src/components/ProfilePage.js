@@ -122,7 +122,7 @@ const ProfilePage = ({ user, onLogout, navigateToQuiz, refreshUser, api, onNavig
                 
                 {/* Full-width Dashboard at the bottom */}
                 <div className="profile-card dashboard-wrapper">
-                    <Dashboard progress={user.progress} fingerprint={user.fingerprint} latestReport={latestReport} />
+                    <Dashboard progress={user.progress} fingerprint={user.fingerprint} api={api} />
                     {latestReport && (
                         <button className="share-report-btn" onClick={handleShareReport}>
                             Share Latest Report
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useParams } from 'react-router-dom';
 import axios from 'axios';
+import { FingerprintChart, TrajectoryChart } from './ReportCharts';
 import './PublicReportPage.css';
 
 const PublicReportPage = () => {
@@ -11,7 +12,7 @@ const PublicReportPage = () => {
     useEffect(() => {
         const fetchReport = async () => {
             try {
-                const response = await axios.get(`http://127.0.0.1:8000/reports/public/${reportId}`);
+                const response = await axios.get(`http://127.0.0.1:8000/reports/share/${reportId}`);
                 setReport(response.data);
             } catch (err) {
                 setError('Could not find or load the requested report.');
@@ -28,9 +29,8 @@ const PublicReportPage = () => {
         return <div className="public-report-container"><div className="report-card"><h1>Loading Report...</h1></div></div>;
     }
     
-    const API_URL = 'http://127.0.0.1:8000';
-    const fingerprintUrl = `${API_URL}${report.report_data.fingerprint_chart_url}`;
-    const trajectoryUrl = `${API_URL}${report.report_data.trajectory_chart_url}`;
+    // Charts are drawn from the report data; chart URLs in older shared reports may point at evicted PNGs, so they are ignored.
+    const { fingerprint, trajectory } = report.report_data;
 
     return (
         <div className="public-report-container">
@@ -45,12 +45,12 @@ const PublicReportPage = () => {
                 <div className="charts-container">
                     <div className="chart-wrapper">
                         <h3>Cognitive Fingerprint</h3>
-                        <img src={fingerprintUrl} alt="Cognitive Fingerprint Chart" />
+                        <FingerprintChart fingerprint={fingerprint} />
                     </div>
-                    {report.report_data.trajectory_chart_url && (
+                    {trajectory && (
                         <div className="chart-wrapper">
                             <h3>Learning Trajectory</h3>
-                            <img src={trajectoryUrl} alt="Learning Trajectory Chart" />
+                            <TrajectoryChart trajectory={trajectory} />
                         </div>
                     )}
                 </div>
@@ -64,12 +64,13 @@ const QuizPage = ({ user, token, onLogout, refreshUser }) => {
                 correct_answer: question.correct_answer,
                 time_taken: timeTaken,
                 difficulty_level: question.difficulty_level, 
+                question_id: question.id != null ? String(question.id) : null,
             });
             const data = response.data;
             setFeedback(data.feedback); 
             setIsCorrect(data.is_correct);
             // Save the latest report to local storage for the dashboard to pick up
-            localStorage.setItem('latest_report', JSON.stringify(data.report));
+            if (data.report?.data_url || data.report?.fingerprint_chart_url) localStorage.setItem('latest_report', JSON.stringify(data.report));
 
             setTimeout(() => {
                 if (data.next_question.error) {
@@ -0,0 +1,48 @@
+import React from 'react';
+import './ReportCharts.css';
+
+const FINGERPRINT_BARS = [
+    { key: 'comprehension', label: 'Comprehension', color: '#61dafb' },
+    { key: 'application', label: 'Application', color: '#28a745' },
+    { key: 'concentration', label: 'Concentration', color: '#ffc107' },
+    { key: 'retention', label: 'Retention', color: '#dc3545' },
+];
+
+// Cognitive fingerprint scores (0-1) as an SVG bar chart.
+export const FingerprintChart = ({ fingerprint }) => {
+    if (!fingerprint) return null;
+    const width = 400, height = 200, barWidth = 60, gap = (width - FINGERPRINT_BARS.length * barWidth) / (FINGERPRINT_BARS.length + 1);
+    return (
+        <svg className="report-svg" viewBox={`0 0 ${width} ${height + 40}`} role="img" aria-label="Cognitive Fingerprint Chart">
+            {FINGERPRINT_BARS.map(({ key, label, color }, i) => {
+                const score = fingerprint[key] ?? 0;
+                const x = gap + i * (barWidth + gap);
+                return (
+                    <g key={key}>
+                        <rect x={x} y={height * (1 - score)} width={barWidth} height={height * score} fill={color} rx="4" />
+                        <text x={x + barWidth / 2} y={height * (1 - score) - 6} className="report-svg-value">{Math.round(score * 100)}%</text>
+                        <text x={x + barWidth / 2} y={height + 20} className="report-svg-label">{label}</text>
+                    </g>
+                );
+            })}
+        </svg>
+    );
+};
+
+// The ability trajectory as an SVG line. Points are downsampled evenly over `length` answers by the server.
+export const TrajectoryChart = ({ trajectory }) => {
+    if (!trajectory || trajectory.abilities.length === 0) {
+        return <p className="report-svg-empty">Answer questions to see your trajectory.</p>;
+    }
+    const width = 400, height = 200, pad = 10;
+    const { abilities, length } = trajectory;
+    const step = abilities.length > 1 ? (width - 2 * pad) / (abilities.length - 1) : 0;
+    const points = abilities.map((ability, i) => `${pad + i * step},${pad + (height - 2 * pad) * (1 - ability)}`).join(' ');
+    return (
+        <svg className="report-svg" viewBox={`0 0 ${width} ${height + 30}`} role="img" aria-label="Learning Trajectory Chart">
+            <line x1={pad} y1={height - pad} x2={width - pad} y2={height - pad} className="report-svg-axis" />
+            <polyline points={points} fill="none" stroke="#61dafb" strokeWidth="2" />
+            <text x={width / 2} y={height + 20} className="report-svg-label">Questions Answered ({length})</text>
+        </svg>
+    );
+};